@@ -31,11 +31,9 @@ class ChangeVoiceChannel(DiscordCore):
                 event_id=f"{self.plugin_base.get_plugin_id()}::{VOICE_CHANNEL_SELECT}",
                 callback=self._update_display,
                 )
+        self.render_warm_state(VOICE_CHANNEL_SELECT, self._update_display)
 
     def _update_display(self, *args, **kwargs):
-        if not self.backend:
-            self.show_error()
-            return
         self.hide_error()
         value = args[1]
         self._current_channel = value.get("channel_id", None) if value else None
@@ -6,8 +6,6 @@ from .DiscordCore import DiscordCore
 from src.backend.PluginManager.EventAssigner import EventAssigner
 from src.backend.PluginManager.InputBases import Input
 
-from GtkHelper.GenerativeUI.EntryRow import EntryRow
-
 from ..discordrpc.commands import VOICE_SETTINGS_UPDATE
 
 
@@ -20,7 +18,7 @@ class Deafen(DiscordCore):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.has_configuration = False
-        self._deafened: bool = False
+        self._deafened: bool = None  # None until live state arrives
         self.icon_keys = [Icons.DEAFEN, Icons.UNDEAFEN]
         self.current_icon = self.get_icon(Icons.DEAFEN)
         self.icon_name = Icons.DEAFEN
@@ -31,6 +29,7 @@ class Deafen(DiscordCore):
                 event_id=f"{self.plugin_base.get_plugin_id()}::{VOICE_SETTINGS_UPDATE}",
                 callback=self._update_display,
                 )
+        self.render_warm_state(VOICE_SETTINGS_UPDATE, self._update_display)
 
     def create_event_assigners(self):
         self.event_manager.add_event_assigner(
@@ -43,6 +42,10 @@ class Deafen(DiscordCore):
         )
 
     def _on_toggle(self, _):
+        if self._deafened is None:
+            log.warning("Deafen state not known yet, ignoring toggle")
+            self.show_error(3)
+            return
         try:
             self.backend.set_deafen(not self._deafened)
         except Exception as ex:
@@ -50,14 +53,12 @@ class Deafen(DiscordCore):
             self.show_error(3)
 
     def _update_display(self, *args, **kwargs):
-        if not self.backend:
-            self.show_error()
-            return
-        else:
-            self.hide_error()
+        self.hide_error()
         data = args[1]
-        self._deafened = data.get("deaf", False)
-        icon = Icons.DEAFEN if self._deafened else Icons.UNDEAFEN
+        deafened = data.get("deaf", False)
+        if args[0] is not None:
+            self._deafened = deafened
+        icon = Icons.DEAFEN if deafened else Icons.UNDEAFEN
         self.icon_name = Icons(icon)
         self.current_icon = self.get_icon(self.icon_name)
         self.display_icon()
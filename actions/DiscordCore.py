@@ -1,16 +1,15 @@
+from collections import Counter
+
 from loguru import logger as log
 from src.backend.PluginManager.ActionCore import ActionCore
-from src.backend.DeckManagement.InputIdentifier import InputEvent, Input
 from src.backend.PluginManager.PluginSettings.Asset import Color, Icon
 
-from gi.repository import Gtk, Adw
-import gi
-
-gi.require_version("Gtk", "4.0")
-gi.require_version("Adw", "1")
-
 
 class DiscordCore(ActionCore):
+    # Deck updates pushed vs. skipped because nothing visible changed,
+    # summed over every action instance
+    render_stats: Counter = Counter()
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -21,10 +20,12 @@ class DiscordCore(ActionCore):
         self.current_color: Color = None
         self.icon_name: str = ""
         self.color_name: str = ""
-        self.backend: "Backend" = self.plugin_base.backend
+        # What was last pushed to the deck, per slot ("icon", "color", label position)
+        self._rendered: dict = {}
 
         # Track registered callbacks for cleanup
-        self._registered_callbacks: list[tuple[str, callable]] = []
+        self._registered_callbacks: set[tuple[str, callable]] = set()
+        self._event_scopes: dict[str, tuple] = {}  # event -> (scope, callback)
 
         self.plugin_base.asset_manager.icons.add_listener(self._icon_changed)
         self.plugin_base.asset_manager.colors.add_listener(self._color_changed)
@@ -32,11 +33,30 @@ class DiscordCore(ActionCore):
         self.create_generative_ui()
         self.create_event_assigners()
 
+    @property
+    def backend(self) -> "Backend":
+        # Looked up on use: the backend may still be starting when actions load
+        return self.plugin_base.backend
+
     def on_ready(self):
         super().on_ready()
+        # The key was (re)drawn from scratch, so nothing is on it yet
+        self._rendered.clear()
         self.display_icon()
         self.display_color()
 
+    def render_warm_state(self, name: str, callback: callable):
+        """Render from the last known state until live state arrives.
+
+        ``callback`` gets the event name as its first argument once the state
+        is live for this session, and None while it is only the persisted
+        snapshot, which must not drive what a key press does.
+        """
+        warm_state = self.plugin_base.warm_state
+        data = warm_state.get(name)
+        if data:
+            callback(None if warm_state.is_stale(name) else name, data)
+
     def create_generative_ui(self):
         pass
 
@@ -45,31 +65,78 @@ class DiscordCore(ActionCore):
 
     def register_backend_callback(self, key: str, callback: callable):
         """Register a callback and track it for cleanup."""
-        self.backend.register_callback(key, callback)
-        self._registered_callbacks.append((key, callback))
         self.plugin_base.add_callback(key, callback)
+        self._registered_callbacks.add((key, callback))
+
+    def set_event_scope(self, event: str, scope, callback: callable):
+        """Receive ``event`` only for ``scope`` (e.g. a channel id); None stops it."""
+        current = self._event_scopes.get(event)
+        if current == (scope, callback):
+            return
+        # Add before removing, so the backend's interest in ``event`` never
+        # drops to zero (and unsubscribes) in between
+        if scope is not None:
+            self.plugin_base.add_routed_callback(event, scope, callback)
+            self._event_scopes[event] = (scope, callback)
+        else:
+            self._event_scopes.pop(event, None)
+        if current is not None:
+            self.plugin_base.remove_routed_callback(event, *current)
 
     def cleanup_callbacks(self):
         """Unregister all tracked callbacks to prevent memory leaks."""
         for key, callback in self._registered_callbacks:
-            self.backend.unregister_callback(key, callback)
             self.plugin_base.remove_callback(key, callback)
         self._registered_callbacks.clear()
-
-    def __del__(self):
-        """Clean up callbacks when action is destroyed."""
-        try:
-            self.cleanup_callbacks()
-        except (AttributeError, RuntimeError):
-            # Object may be partially initialized or backend already destroyed
-            pass
+        for event, (scope, callback) in self._event_scopes.items():
+            self.plugin_base.remove_routed_callback(event, scope, callback)
+        self._event_scopes.clear()
+
+    def on_remove(self):
+        """Give back callbacks and backend state when the action leaves its key.
+
+        Not done from ``__del__``: unregistering can reach the backend over
+        rpyc, which must not happen inside a finalizer. Actions dropped
+        without ``on_remove`` still let go of their callbacks, as those are
+        held weakly.
+        """
+        super().on_remove()
+        self.cleanup_callbacks()
+
+    def _needs_render(self, slot, value) -> bool:
+        """Record ``value`` for ``slot``; False if the deck already shows it."""
+        if slot in self._rendered and self._rendered[slot] == value:
+            self.render_stats["suppressed"] += 1
+            return False
+        self._rendered[slot] = value
+        self.render_stats["issued"] += 1
+        return True
 
     def display_icon(self):
         if not self.current_icon:
             return
-        _, rendered = self.current_icon.get_values()
+        if not self._needs_render("icon", self.icon_name):
+            return
+        rendered = self.plugin_base.get_rendered_icon(
+            self.icon_name, self.current_icon, self._key_image_size()
+        )
         if rendered:
             self.set_media(image=rendered)
+        else:
+            self._rendered.pop("icon", None)
+
+    def _key_image_size(self) -> tuple[int, int]:
+        """Pixel size of this deck's key images, or None if it can't be told yet."""
+        try:
+            return tuple(self.deck_controller.get_key_image_size())
+        except (AttributeError, TypeError):
+            return None
+
+    def display_label(self, position: str, text: str):
+        """Set the top, center or bottom label if its text changed."""
+        if not self._needs_render(position, text):
+            return
+        getattr(self, f"set_{position}_label")(text)
 
     def _icon_changed(self, event: str, key: str, asset: Icon):
         if not key in self.icon_keys:
@@ -78,17 +145,22 @@ class DiscordCore(ActionCore):
             return
         self.current_icon = asset
         self.icon_name = key
+        # Same key, new image
+        self._rendered.pop("icon", None)
         self.display_icon()
 
     def display_color(self):
         if not self.current_color:
             return
         color = self.current_color.get_values()
+        if not self._needs_render("color", tuple(color)):
+            return
         try:
             self.set_background_color(color)
         except (RuntimeError, AttributeError) as ex:
             # Sometimes we try to call this too early, and it leads to
             # console errors, but no real impact. Ignoring this for now
+            self._rendered.pop("color", None)
             log.debug(
                 f"Failed to set background color (action may not be ready yet): {ex}"
             )
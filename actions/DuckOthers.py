@@ -0,0 +1,123 @@
+import threading
+from enum import StrEnum
+
+from loguru import logger as log
+
+from .DiscordCore import DiscordCore
+from src.backend.PluginManager.EventAssigner import EventAssigner
+from src.backend.PluginManager.InputBases import Input
+
+from GtkHelper.GenerativeUI.EntryRow import EntryRow
+
+from ..roster import DUCK_STATE
+
+DEFAULT_DUCK_VOLUME = 20
+
+
+class Icons(StrEnum):
+    DUCKED = "voice-inactive"
+    NOT_DUCKED = "voice-active"
+
+
+class DuckOthers(DiscordCore):
+    """Turns everyone in the voice channel down, except the users listed.
+
+    The first press saves each user's volume and applies the target volume;
+    the second press restores the saved volumes.
+    """
+
+    # Ducking is shared by every DuckOthers key, so presses are applied one at a time
+    _toggle_lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.has_configuration = True
+        self._ducking: bool = False
+        self.icon_keys = [Icons.DUCKED, Icons.NOT_DUCKED]
+        self.current_icon = self.get_icon(Icons.NOT_DUCKED)
+        self.icon_name = Icons.NOT_DUCKED
+
+    def on_ready(self):
+        super().on_ready()
+        # Ducking state lives in the backend, which may still be starting
+        self.register_backend_callback(DUCK_STATE, self._on_duck_state)
+        self.plugin_base.when_backend_ready(self._update_display)
+
+    def create_generative_ui(self):
+        self._exclude_row = EntryRow(
+            action_core=self,
+            var_name="duck_others.exclude",
+            default_value="",
+            title="duck-others-exclude",
+            auto_add=False,
+            complex_var_name=True,
+        )
+        self._volume_row = EntryRow(
+            action_core=self,
+            var_name="duck_others.volume",
+            default_value=str(DEFAULT_DUCK_VOLUME),
+            title="duck-others-volume",
+            auto_add=False,
+            complex_var_name=True,
+        )
+
+    def get_config_rows(self):
+        return [self._exclude_row._widget, self._volume_row._widget]
+
+    def create_event_assigners(self):
+        self.event_manager.add_event_assigner(
+            EventAssigner(
+                id="toggle-duck",
+                ui_label="toggle-duck",
+                default_event=Input.Key.Events.DOWN,
+                callback=self._on_toggle,
+            )
+        )
+
+    def _excluded_users(self) -> list[str]:
+        value = self._exclude_row.get_value() or ""
+        return [user_id.strip() for user_id in value.split(",") if user_id.strip()]
+
+    def _duck_volume(self) -> int:
+        try:
+            return int(self._volume_row.get_value())
+        except (TypeError, ValueError):
+            return DEFAULT_DUCK_VOLUME
+
+    def _on_toggle(self, _):
+        # Ducking waits for a GET_CHANNEL reply; keep that off the input thread
+        self.plugin_base.thread_pool.submit(self._toggle)
+
+    def _toggle(self):
+        with self._toggle_lock:
+            try:
+                if self.backend.is_ducking():
+                    applied = self.backend.restore_ducked()
+                else:
+                    applied = self.backend.duck_users(
+                        self._duck_volume(), self._excluded_users()
+                    )
+            except Exception as ex:
+                log.error(ex)
+                applied = False
+        if applied:
+            self._update_display()
+        else:
+            self.show_error(3)
+
+    def _on_duck_state(self, data: dict):
+        """The backend started or stopped ducking, maybe from another key."""
+        self._show_ducking(bool((data or {}).get("ducking")))
+
+    def _update_display(self):
+        if not self.backend:
+            self.show_error()
+            return
+        self.hide_error()
+        self._show_ducking(self.backend.is_ducking())
+
+    def _show_ducking(self, ducking: bool):
+        self._ducking = ducking
+        self.icon_name = Icons.DUCKED if self._ducking else Icons.NOT_DUCKED
+        self.current_icon = self.get_icon(self.icon_name)
+        self.display_icon()
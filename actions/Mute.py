@@ -6,8 +6,6 @@ from .DiscordCore import DiscordCore
 from src.backend.PluginManager.EventAssigner import EventAssigner
 from src.backend.PluginManager.InputBases import Input
 
-from GtkHelper.GenerativeUI.EntryRow import EntryRow
-
 from ..discordrpc.commands import VOICE_SETTINGS_UPDATE
 
 
@@ -20,7 +18,7 @@ class Mute(DiscordCore):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.has_configuration = False
-        self._muted: bool = False
+        self._muted: bool = None  # None until live state arrives
         self.icon_keys = [Icons.MUTE, Icons.UNMUTE]
         self.current_icon = self.get_icon(Icons.MUTE)
         self.icon_name = Icons.MUTE
@@ -31,6 +29,7 @@ class Mute(DiscordCore):
                 event_id=f"{self.plugin_base.get_plugin_id()}::{VOICE_SETTINGS_UPDATE}",
                 callback=self._update_display,
                 )
+        self.render_warm_state(VOICE_SETTINGS_UPDATE, self._update_display)
 
     def create_event_assigners(self):
         self.event_manager.add_event_assigner(
@@ -61,6 +60,10 @@ class Mute(DiscordCore):
         )
 
     def _on_toggle(self, _):
+        if self._muted is None:
+            log.warning("Mute state not known yet, ignoring toggle")
+            self.show_error(3)
+            return
         try:
             self.backend.set_mute(not self._muted)
         except Exception as ex:
@@ -82,17 +85,13 @@ class Mute(DiscordCore):
             self.show_error(3)
 
     def _update_display(self, *args, **kwargs):
-        if not self.backend:
-            self.show_error()
-            return
-        else:
-            self.hide_error()
+        self.hide_error()
         data = args[1]
-        self._muted = data.get("mute", False)
-        deaf = data.get("deaf", False)
-        if deaf:
-            self._muted = True
-        icon = Icons.MUTE if self._muted else Icons.UNMUTE
+        # Deafening mutes too
+        muted = data.get("mute", False) or data.get("deaf", False)
+        if args[0] is not None:
+            self._muted = muted
+        icon = Icons.MUTE if muted else Icons.UNMUTE
         self.icon_name = Icons(icon)
         self.current_icon = self.get_icon(self.icon_name)
         self.display_icon()
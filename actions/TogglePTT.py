@@ -23,7 +23,7 @@ class TogglePTT(DiscordCore):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.has_configuration = False
-        self._mode: str = ActivityMethod.PTT
+        self._mode: str = None  # None until live state arrives
         self.icon_keys = [Icons.VOICE, Icons.PTT]
         self.current_icon = self.get_icon(Icons.VOICE)
         self.icon_name = Icons.VOICE
@@ -35,6 +35,7 @@ class TogglePTT(DiscordCore):
                 event_id=f"{self.plugin_base.get_plugin_id()}::{VOICE_SETTINGS_UPDATE}",
                 callback=self._update_display,
                 )
+        self.render_warm_state(VOICE_SETTINGS_UPDATE, self._update_display)
 
     def create_event_assigners(self):
         self.event_manager.add_event_assigner(
@@ -47,6 +48,10 @@ class TogglePTT(DiscordCore):
         )
 
     def _on_toggle(self, _):
+        if self._mode is None:
+            log.warning("Voice mode not known yet, ignoring toggle")
+            self.show_error(3)
+            return
         new = (
             ActivityMethod.PTT if self._mode == ActivityMethod.VA else ActivityMethod.VA
         )
@@ -57,14 +62,12 @@ class TogglePTT(DiscordCore):
             self.show_error(3)
 
     def _update_display(self, *args, **kwargs):
-        if not self.backend:
-            self.show_error()
-            return
-        else:
-            self.hide_error()
+        self.hide_error()
         data = args[1]
-        self._mode = data["mode"]["type"]
-        icon = Icons.PTT if self._mode == ActivityMethod.PTT else Icons.VOICE
+        mode = data["mode"]["type"]
+        if args[0] is not None:
+            self._mode = mode
+        icon = Icons.PTT if mode == ActivityMethod.PTT else Icons.VOICE
         self.icon_name = Icons(icon)
         self.current_icon = self.get_icon(self.icon_name)
         self.display_icon()
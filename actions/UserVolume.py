@@ -1,16 +1,74 @@
+import threading
+import time
+
 from loguru import logger as log
 
 from .DiscordCore import DiscordCore
 from src.backend.PluginManager.EventAssigner import EventAssigner
 from src.backend.PluginManager.InputBases import Input
 
-from ..discordrpc.commands import (
-    VOICE_STATE_CREATE,
-    VOICE_STATE_DELETE,
-    VOICE_STATE_UPDATE,
-    VOICE_CHANNEL_SELECT,
-    GET_CHANNEL,
-)
+from ..discordrpc import codec
+from ..discordrpc.commands import VOICE_CHANNEL_SELECT, GET_CHANNEL
+from ..discordrpc.constants import VOLUME_SEND_INTERVAL
+from ..roster import ROSTER_UPDATE, ROSTER_ADD, ROSTER_UPDATE_USER, ROSTER_REMOVE, ROSTER_RESET
+
+
+class VolumeCoalescer:
+    """Rate-limits per-user volume commands while a dial is spinning.
+
+    The latest requested volume is kept per user and sent at most once per
+    ``interval`` seconds. A tick arriving inside the interval schedules one
+    trailing send, so the final value always reaches Discord.
+    """
+
+    def __init__(self, send: callable, interval: float = VOLUME_SEND_INTERVAL):
+        self._send = send
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._targets: dict[str, int] = {}  # user_id -> volume not sent yet
+        self._last_send: dict[str, float] = {}  # user_id -> time of last send
+        self._timers: dict[str, threading.Timer] = {}
+
+    def submit(self, user_id: str, volume: int):
+        with self._lock:
+            self._targets[user_id] = volume
+            if user_id in self._timers:
+                # A trailing send is already scheduled and will pick this up
+                return
+            wait = self._last_send.get(user_id, 0) + self.interval - time.monotonic()
+            if wait > 0:
+                timer = threading.Timer(wait, self._flush_user, args=[user_id])
+                timer.daemon = True
+                self._timers[user_id] = timer
+                timer.start()
+                return
+        self._flush_user(user_id)
+
+    def is_pending(self, user_id: str) -> bool:
+        with self._lock:
+            return user_id in self._targets
+
+    def flush(self):
+        """Send every pending volume immediately."""
+        with self._lock:
+            timers = list(self._timers.values())
+            users = list(self._targets)
+        for timer in timers:
+            timer.cancel()
+        for user_id in users:
+            self._flush_user(user_id)
+
+    def _flush_user(self, user_id: str):
+        with self._lock:
+            self._timers.pop(user_id, None)
+            volume = self._targets.pop(user_id, None)
+            if volume is None:
+                return
+            self._last_send[user_id] = time.monotonic()
+        try:
+            self._send(user_id, volume)
+        except Exception as ex:
+            log.error(f"Failed to set user volume: {ex}")
 
 
 class UserVolume(DiscordCore):
@@ -31,14 +89,18 @@ class UserVolume(DiscordCore):
         self.has_configuration = False
 
         # Current state
-        self._users: list = []  # List of user dicts [{id, username, nick, volume, muted}, ...]
-        self._current_user_index: int = 0
+        # Mirror of the backend roster: {user_id: {id, username, nick, volume, muted}}
+        self._users: dict[str, dict] = {}
+        self._roster_version: int = 0
+        self._selected_user_id: str = None
         self._current_channel_id: str = None
+        self._subscribed_channel_id: str = None  # Channel we hold voice state subscriptions for
         self._current_channel_name: str = ""
         self._in_voice_channel: bool = False
 
         # Volume adjustment step (percentage points per dial tick)
         self.VOLUME_STEP = 5
+        self._volume_coalescer = VolumeCoalescer(self._send_user_volume)
 
     def on_ready(self):
         super().on_ready()
@@ -47,15 +109,15 @@ class UserVolume(DiscordCore):
                 event_id=f"{self.plugin_base.get_plugin_id()}::{VOICE_CHANNEL_SELECT}",
                 callback=self._on_voice_channel_select,
                 )
-        self.plugin_base.connect_to_event(
-                event_id=f"{self.plugin_base.get_plugin_id()}::{GET_CHANNEL}",
-                callback=self._on_get_channel,
-                )
 
-        # Initialize display
+        # Show the last known channel and users until live state arrives
+        self._render_warm_state()
         self._update_display()
 
         # Request current voice channel state (in case we're already in a channel)
+        self.plugin_base.when_backend_ready(self._request_voice_channel)
+
+    def _request_voice_channel(self):
         self.backend.request_current_voice_channel()
 
     def create_event_assigners(self):
@@ -111,25 +173,31 @@ class UserVolume(DiscordCore):
         """Cycle to next user in voice channel."""
         if not self._users:
             return
-        self._current_user_index = (self._current_user_index + 1) % len(self._users)
+        user_ids = list(self._users)
+        if self._selected_user_id in self._users:
+            index = user_ids.index(self._selected_user_id) + 1
+        else:
+            index = 0
+        self._selected_user_id = user_ids[index % len(user_ids)]
         self._update_display()
 
     def _adjust_volume(self, delta: int):
         """Adjust current user's volume by delta."""
-        if not self._users or self._current_user_index >= len(self._users):
+        user = self._users.get(self._selected_user_id)
+        if user is None:
             return
 
-        user = self._users[self._current_user_index]
         current_volume = user.get("volume", 100)
         new_volume = max(0, min(200, current_volume + delta))
 
-        try:
-            if self.backend.set_user_volume(user["id"], new_volume):
-                user["volume"] = new_volume
-                self._update_display()
-        except Exception as ex:
-            log.error(f"Failed to set user volume: {ex}")
-            self.show_error(3)
+        # Show the new volume right away; the command itself is coalesced
+        user["volume"] = new_volume
+        self._update_display()
+        self._volume_coalescer.submit(user["id"], new_volume)
+
+    def _send_user_volume(self, user_id: str, volume: int):
+        if not self.backend.set_user_volume(user_id, volume):
+            log.warning(f"UserVolume[{id(self)}]: volume for {user_id} not applied")
 
     # === Discord Event Callbacks ===
 
@@ -138,177 +206,119 @@ class UserVolume(DiscordCore):
         data = args[1]
         try:
             if data is None or data.get("channel_id") is None:
+                self._volume_coalescer.flush()
                 # Left voice channel - unsubscribe from previous channel
-                if self._current_channel_id:
-                    self.backend.unsubscribe_voice_states(self._current_channel_id)
+                self._subscribe_voice_states(None)
+                self._route_channel_events(None)
                 self._in_voice_channel = False
                 self._current_channel_id = None
                 self._current_channel_name = ""
                 self._users.clear()
-                self._current_user_index = 0
-                self.backend.clear_voice_channel_users()
+                self._selected_user_id = None
             else:
                 # Joined voice channel
                 new_channel_id = data.get("channel_id")
 
-                # If switching channels, unsubscribe from old channel first
                 if self._current_channel_id and self._current_channel_id != new_channel_id:
-                    self.backend.unsubscribe_voice_states(self._current_channel_id)
-                    self._users.clear()
-                    self._current_user_index = 0
+                    self._volume_coalescer.flush()
 
                 self._in_voice_channel = True
                 self._current_channel_id = new_channel_id
                 self._current_channel_name = data.get("name", "Voice")
 
-                # Register frontend callbacks for voice state events
-                self.plugin_base.add_callback(VOICE_STATE_CREATE, self._on_voice_state_create)
-                self.plugin_base.add_callback(VOICE_STATE_DELETE, self._on_voice_state_delete)
-                self.plugin_base.add_callback(VOICE_STATE_UPDATE, self._on_voice_state_update)
+                # The backend keeps the roster; listen for this channel's deltas
+                self._route_channel_events(self._current_channel_id)
 
                 # Subscribe to voice state events via backend (with channel_id)
-                self.backend.subscribe_voice_states(self._current_channel_id)
+                self._subscribe_voice_states(self._current_channel_id)
 
                 # Fetch initial user list
                 self.backend.get_channel(self._current_channel_id)
+                self._load_roster()
 
             self._update_display()
         except Exception as ex:
             log.error(f"UserVolume[{id(self)}]: Error in _on_voice_channel_select: {ex}")
 
-    def _on_get_channel(self, *args, **kwargs):
-        """Handle GET_CHANNEL response with initial user list."""
-        data = args[1]
-        if not data:
-            return
+    def _subscribe_voice_states(self, channel_id: str):
+        """Move this action's voice state subscription to ``channel_id``.
 
-        # Check if this is for our current channel
-        channel_id = data.get("id")
-        if channel_id != self._current_channel_id:
+        The backend reference-counts subscriptions, so each action holds at
+        most one and only changes it when the channel really changes.
+        """
+        if channel_id == self._subscribed_channel_id:
             return
-
-        # Update channel name if available
+        if self._subscribed_channel_id:
+            self.backend.unsubscribe_voice_states(self._subscribed_channel_id)
+        if channel_id:
+            self.backend.subscribe_voice_states(channel_id)
+        self._subscribed_channel_id = channel_id
+
+    def cleanup_callbacks(self):
+        """Also give back the voice state subscription this action holds."""
+        super().cleanup_callbacks()
+        if self._subscribed_channel_id and self.backend:
+            self._subscribe_voice_states(None)
+
+    def _route_channel_events(self, channel_id: str):
+        """Receive GET_CHANNEL replies and roster deltas for ``channel_id`` only."""
+        self.set_event_scope(GET_CHANNEL, channel_id, self._on_get_channel)
+        self.set_event_scope(ROSTER_UPDATE, channel_id, self._on_roster_update)
+
+    def _on_get_channel(self, data: dict):
+        """Handle GET_CHANNEL response; the users arrive as roster deltas."""
         if data.get("name"):
             self._current_channel_name = data.get("name")
+            self._update_display()
 
-        # Process voice_states array
-        voice_states = data.get("voice_states", [])
-        current_user_id = self.backend.current_user_id
-
-        for vs in voice_states:
-            user_data = vs.get("user", {})
-            user_id = user_data.get("id")
-
-            if not user_id:
-                continue
-
-            # Filter out self
-            if user_id == current_user_id:
-                continue
-
-            user_info = {
-                "id": user_id,
-                "username": user_data.get("username", "Unknown"),
-                "nick": vs.get("nick"),
-                "volume": vs.get("volume", 100),
-                "muted": vs.get("mute", False),
-            }
-
-            # Add if not already present (idempotent)
-            if not any(u["id"] == user_id for u in self._users):
-                self._users.append(user_info)
-
-            # Update backend cache
-            self.backend.update_voice_channel_user(
-                user_id,
-                user_info["username"],
-                user_info["nick"],
-                user_info["volume"],
-                user_info["muted"]
-            )
-
-        self._update_display()
-
-    def _on_voice_state_create(self, data: dict):
-        """Handle user joining voice channel."""
-        if not data:
-            return
-
-        user_data = data.get("user", {})
-        user_id = user_data.get("id")
-        if not user_id:
-            return
-
-        # Filter out self
-        if user_id == self.backend.current_user_id:
+    def _render_warm_state(self):
+        warm_state = self.plugin_base.warm_state
+        channel = warm_state.get(VOICE_CHANNEL_SELECT)
+        if not channel or not channel.get("channel_id"):
             return
-
-        user_info = {
-            "id": user_id,
-            "username": user_data.get("username", "Unknown"),
-            "nick": data.get("nick"),
-            "volume": data.get("volume", 100),
-            "muted": data.get("mute", False),
-        }
-
-        # Add to local list (avoid duplicates)
-        if not any(u["id"] == user_id for u in self._users):
-            self._users.append(user_info)
-
-        # Update backend cache
-        self.backend.update_voice_channel_user(
-            user_id,
-            user_info["username"],
-            user_info["nick"],
-            user_info["volume"],
-            user_info["muted"]
+        self._in_voice_channel = True
+        self._current_channel_id = channel["channel_id"]
+        self._current_channel_name = channel.get("name", "Voice")
+        roster = warm_state.get(ROSTER_UPDATE)
+        if roster and roster.get("channel_id") == self._current_channel_id:
+            self._users = {user["id"]: user for user in roster["users"]}
+
+    def _save_warm_roster(self):
+        self.plugin_base.warm_state.update(
+            ROSTER_UPDATE,
+            {
+                "channel_id": self._current_channel_id,
+                "users": [dict(user) for user in self._users.values()],
+            },
         )
 
-        self._update_display()
-
-    def _on_voice_state_delete(self, data: dict):
-        """Handle user leaving voice channel."""
-        if not data:
-            return
-
-        user_data = data.get("user", {})
-        user_id = user_data.get("id")
-        if not user_id:
-            return
-
-        # Remove from local list
-        self._users = [u for u in self._users if u["id"] != user_id]
-
-        # Adjust current index if needed
-        if self._current_user_index >= len(self._users):
-            self._current_user_index = max(0, len(self._users) - 1)
-
-        # Update backend cache
-        self.backend.remove_voice_channel_user(user_id)
-
-        self._update_display()
-
-    def _on_voice_state_update(self, data: dict):
-        """Handle user voice state change (volume, mute, etc)."""
-        if not data:
-            return
+    def _load_roster(self):
+        """Replace the local roster with the backend's current snapshot."""
+        snapshot = codec.loads(self.backend.get_roster_snapshot())
+        self._users = {user["id"]: user for user in snapshot["users"]}
+        self._roster_version = snapshot["version"]
+        self._save_warm_roster()
 
-        user_data = data.get("user", {})
-        user_id = user_data.get("id")
-        if not user_id:
+    def _on_roster_update(self, delta: dict):
+        """Apply a roster delta published by the backend."""
+        if not delta or delta["version"] <= self._roster_version:
             return
-
-        # Find and update user
-        for user in self._users:
-            if user["id"] == user_id:
-                if "volume" in data:
-                    user["volume"] = data.get("volume")
-                if "mute" in data:
-                    user["muted"] = data.get("mute")
-                if "nick" in data:
-                    user["nick"] = data.get("nick")
-                break
-
+        if delta["since"] != self._roster_version:
+            # Missed some changes; start over from a snapshot
+            self._load_roster()
+        else:
+            for op, user_id, entry in delta["changes"]:
+                if op == ROSTER_RESET:
+                    self._users.clear()
+                elif op == ROSTER_REMOVE:
+                    self._users.pop(user_id, None)
+                elif op == ROSTER_ADD or op == ROSTER_UPDATE_USER:
+                    if self._volume_coalescer.is_pending(user_id) and user_id in self._users:
+                        # Keep the volume the dial is still sending
+                        entry["volume"] = self._users[user_id]["volume"]
+                    self._users[user_id] = entry
+            self._roster_version = delta["version"]
+            self._save_warm_roster()
         self._update_display()
 
     # === Display ===
@@ -316,25 +326,24 @@ class UserVolume(DiscordCore):
     def _update_display(self):
         """Update the dial display with current user info."""
         if not self._in_voice_channel or not self._users:
-            self.set_top_label("Not in voice" if not self._in_voice_channel else self._current_channel_name[:12])
-            self.set_center_label("")
-            self.set_bottom_label("No users" if self._in_voice_channel else "")
+            self.display_label("top", "Not in voice" if not self._in_voice_channel else self._current_channel_name[:12])
+            self.display_label("center", "")
+            self.display_label("bottom", "No users" if self._in_voice_channel else "")
             return
 
         # Truncate channel name for space
         channel_display = self._current_channel_name[:12] if len(self._current_channel_name) > 12 else self._current_channel_name
-        self.set_top_label(channel_display)
+        self.display_label("top", channel_display)
 
-        if self._current_user_index < len(self._users):
-            user = self._users[self._current_user_index]
-            display_name = user.get("nick") or user.get("username", "Unknown")
-            volume = user.get("volume", 100)
+        if self._selected_user_id not in self._users:
+            # Selected user left; fall back to the first one
+            self._selected_user_id = next(iter(self._users))
+        user = self._users[self._selected_user_id]
+        display_name = user.get("nick") or user.get("username", "Unknown")
+        volume = user.get("volume", 100)
 
-            # Truncate name for display
-            display_name = display_name[:10] if len(display_name) > 10 else display_name
+        # Truncate name for display
+        display_name = display_name[:10] if len(display_name) > 10 else display_name
 
-            self.set_center_label(display_name)
-            self.set_bottom_label(f"{volume}%")
-        else:
-            self.set_center_label("")
-            self.set_bottom_label("No selection")
+        self.display_label("center", display_name)
+        self.display_label("bottom", f"{volume}%")
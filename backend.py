@@ -1,10 +1,52 @@
-import json
+import os
+import threading
+from collections import Counter
+from datetime import datetime
 
 from streamcontroller_plugin_tools import BackendBase
 
 from loguru import logger as log
 
-from discordrpc import AsyncDiscord, commands
+from discordrpc import AsyncDiscord, AioDiscordClient, DiscordNotOpened, Frame, codec, commands
+from discordrpc.sockets import SOCKET_DISCONNECTED
+from discordrpc.supervisor import ConnectionSupervisor
+from discordrpc.oauth import TOKEN_URL, TokenManager
+from discordrpc.metrics import CommandMetrics
+from discordrpc.constants import RPC_REQUEST_TIMEOUT
+from event_batcher import EventBatcher
+from roster import VoiceRoster, DUCK_STATE, ROSTER_UPDATE
+from exporter import MetricsExporter
+from subscriptions import SubscriptionRegistry
+from request_cache import RequestCoalescer
+
+# Subscriptions held for the lifetime of the backend
+STATIC_SUBSCRIPTIONS = (
+    commands.VOICE_SETTINGS_UPDATE,
+    commands.VOICE_CHANNEL_SELECT,
+    commands.GET_CHANNEL,
+)
+
+# Per-channel events behind subscribe_voice_states
+VOICE_STATE_EVENTS = (
+    commands.VOICE_STATE_CREATE,
+    commands.VOICE_STATE_DELETE,
+    commands.VOICE_STATE_UPDATE,
+)
+
+# DISPATCH events the backend handles itself to keep the roster current
+ROSTER_EVENTS = {
+    commands.VOICE_CHANNEL_SELECT,
+    commands.VOICE_STATE_CREATE,
+    commands.VOICE_STATE_UPDATE,
+    commands.VOICE_STATE_DELETE,
+}
+
+# Selects the IPC client implementation; "asyncio" runs all socket I/O and
+# event callbacks on a single event loop thread.
+TRANSPORTS = {"thread": AsyncDiscord, "asyncio": AioDiscordClient}
+TRANSPORT_ENV = "DISCORD_RPC_TRANSPORT"
+# Overrides the OAuth token endpoint, e.g. with a local stand-in for testing
+TOKEN_URL_ENV = "DISCORD_RPC_TOKEN_URL"
 
 
 class Backend(BackendBase):
@@ -14,74 +56,387 @@ class Backend(BackendBase):
         self.client_secret: str = None
         self.access_token: str = None
         self.refresh_token: str = None
-        self.discord_client: AsyncDiscord = None
+        self._tokens: TokenManager = None
+        self._token_refreshed: bool = False  # Access token came from a refresh not yet accepted
+        self.discord_client: AsyncDiscord | AioDiscordClient = None
         self._is_authed: bool = False
         self._current_voice_channel: str = None
         self._is_reconnecting: bool = False
-        self._voice_channel_users: dict = {}  # {user_id: {username, nick, volume, muted}}
+        self._connect_lock = threading.Lock()
+        self._supervisor = ConnectionSupervisor(self._connect_client)
+        self._roster = VoiceRoster()
+        self._roster_published: int = 0  # Roster version last sent to the frontend
+        self._roster_lock = threading.Lock()
         self._current_user_id: str = None  # Current user's ID (for filtering)
-
-    def discord_callback(self, code, event):
-        if code == 0:
+        # DISPATCH events the frontend consumes, with a count of consumers
+        self._event_interest: Counter = Counter(
+            {commands.VOICE_SETTINGS_UPDATE: 1, commands.VOICE_CHANNEL_SELECT: 1}
+        )
+        self.stats: Counter = Counter()
+        # Counters of clients replaced since startup, so totals survive reconnects
+        self._retired_client_stats: Counter = Counter()
+        self._stats_lock = threading.Lock()
+        self._command_metrics = CommandMetrics()
+        self._subscriptions = SubscriptionRegistry()
+        for event in STATIC_SUBSCRIPTIONS:
+            self._subscriptions.acquire(event)
+        self._event_batcher = EventBatcher(self._deliver_events)
+        self._requests = RequestCoalescer()
+        # Ducking: volumes to restore per user, the volume applied and who is spared
+        self._duck_lock = threading.RLock()
+        self._ducked: dict[str, int] = None  # None while not ducking
+        self._duck_volume: int = 0
+        self._duck_exclude: set[str] = set()
+        self._duck_spared: set[str] = set()  # Given a volume by hand while ducked
+        self._duck_channel: str = None  # Channel we hold voice state subscriptions for
+        self._duck_published: bool = False  # Ducking state last sent to the frontend
+        self._exporter = MetricsExporter(self._collect_metrics)
+
+    def discord_callback(self, code, frame: Frame):
+        if code == SOCKET_DISCONNECTED:
+            log.warning("Lost connection to Discord, reconnecting in the background")
+            self._is_authed = False
+            self._requests.reset()
+            self._supervisor.kick()
             return
-        try:
-            event = json.loads(event)
-        except Exception as ex:
-            log.error(f"failed to parse discord event: {ex}")
+        if code == 0 or frame is None:
             return
-        resp_code = (
-            event.get("data").get("code", 0) if event.get("data") is not None else 0
-        )
-        if resp_code in [4006, 4009]:
-            if not self.refresh_token:
-                self.setup_client()
+        if frame.evt == commands.ERROR:
+            resp_code = (frame.data or {}).get("code", 0)
+            if resp_code in [4006, 4009]:
+                self._refresh_access()
                 return
-            try:
-                token_resp = self.discord_client.refresh(self.refresh_token)
-            except Exception as ex:
-                log.error(f"failed to refresh token {ex}")
-                self._update_tokens("", "")
-                self.setup_client()
-                return
-            access_token = token_resp.get("access_token")
-            refresh_token = token_resp.get("refresh_token")
-            self._update_tokens(access_token, refresh_token)
-            self.discord_client.authenticate(self.access_token)
-            return
-        match event.get("cmd"):
+        match frame.cmd:
             case commands.AUTHORIZE:
-                auth_code = event.get("data").get("code")
-                token_resp = self.discord_client.get_access_token(auth_code)
-                self.access_token = token_resp.get("access_token")
-                self.refresh_token = token_resp.get("refresh_token")
-                self.discord_client.authenticate(self.access_token)
-                self.frontend.save_access_token(self.access_token)
-                self.frontend.save_refresh_token(self.refresh_token)
+                # The token exchange is an HTTP round trip; keep it off this thread
+                auth_code = frame.data.get("code")
+                self._tokens.exchange_code(auth_code).add_done_callback(
+                    self._on_token_exchanged
+                )
             case commands.AUTHENTICATE:
                 self.frontend.on_auth_callback(True)
                 self._is_authed = True
+                self._token_refreshed = False
                 # Capture current user ID for filtering in UserVolume
-                data = event.get("data", {})
+                data = frame.data or {}
+                self._tokens.set_expiry(self._parse_expiry(data.get("expires")))
                 user = data.get("user", {})
-                self._register_callbacks()
+                self._replay_subscriptions()
                 self._current_user_id = user.get("id")
+                # Subscriptions only report changes, so fetch what they missed
+                self.discord_client.get_voice_settings()
                 self._get_current_voice_channel()
             case commands.DISPATCH:
-                evt = event.get("evt")
-                self.frontend.trigger_event(evt, event.get("data"))
+                self._on_dispatch(frame)
+            case commands.GET_VOICE_SETTINGS:
+                # Same payload as the live event, so consumers need no special case
+                if frame.evt != commands.ERROR:
+                    self._forward_event(commands.VOICE_SETTINGS_UPDATE, frame)
             case commands.GET_SELECTED_VOICE_CHANNEL:
-                self._current_voice_channel = (
-                    event.get("data").get("channel_id") if event.get("data") else None
-                )
-                self.frontend.trigger_event(commands.VOICE_CHANNEL_SELECT, event.get("data"))
+                if frame.evt != commands.ERROR:
+                    self._on_selected_voice_channel(frame)
             case commands.GET_CHANNEL:
-                self.frontend.trigger_event(commands.GET_CHANNEL, event.get("data"))
+                if frame.evt != commands.ERROR:
+                    args = {"channel_id": (frame.data or {}).get("id")}
+                    self._requests.store(commands.GET_CHANNEL, args, frame)
+                self._load_roster(frame.data)
+                self._duck_newcomers()
+                self._forward_event(commands.GET_CHANNEL, frame)
+
+    def _on_dispatch(self, frame: Frame):
+        evt = frame.evt
+        match evt:
+            case commands.VOICE_CHANNEL_SELECT:
+                self._requests.invalidate()
+                self._set_voice_channel(frame.data)
+            case commands.VOICE_STATE_CREATE | commands.VOICE_STATE_UPDATE:
+                self._requests.invalidate(commands.GET_CHANNEL)
+                self._update_roster_user(frame.data)
+                if evt == commands.VOICE_STATE_CREATE:
+                    self._duck_newcomers()
+            case commands.VOICE_STATE_DELETE:
+                self._requests.invalidate(commands.GET_CHANNEL)
+                user = (frame.data or {}).get("user") or {}
+                if self._roster.remove(user.get("id")):
+                    self._publish_roster()
+        if evt in self._event_interest:
+            self._forward_event(evt, frame)
+
+    # Voice channel roster
+
+    def _on_selected_voice_channel(self, frame: Frame):
+        """Adopt a GET_SELECTED_VOICE_CHANNEL reply and pass it on.
+
+        The reply is the whole channel object (``id``, ``voice_states``, ...)
+        or null, not VOICE_CHANNEL_SELECT's ``channel_id``. The roster is
+        loaded from it and the frontend gets a VOICE_CHANNEL_SELECT shaped
+        payload, like the live event.
+        """
+        channel = frame.data or {}
+        selected = {
+            "channel_id": channel.get("id"),
+            "guild_id": channel.get("guild_id"),
+            "name": channel.get("name"),
+        }
+        self._set_voice_channel(selected)
+        self._load_roster(channel)
+        event = Frame(
+            frame.op,
+            codec.dumps({
+                "cmd": commands.DISPATCH,
+                "evt": commands.VOICE_CHANNEL_SELECT,
+                "data": selected,
+                "nonce": None,
+            }),
+        )
+        self._requests.store(commands.GET_SELECTED_VOICE_CHANNEL, None, event)
+        self._forward_event(commands.VOICE_CHANNEL_SELECT, event)
+
+    def _set_voice_channel(self, data: dict):
+        channel_id = data.get("channel_id") if data else None
+        self._current_voice_channel = channel_id
+        if channel_id != self._roster.channel_id:
+            self._roster.reset(channel_id)
+            self._publish_roster()
+            with self._duck_lock:
+                if self._ducked is not None:
+                    # Keep watching for newcomers in whichever channel we are in
+                    self._watch_duck_channel(channel_id)
+
+    def _roster_fields(self, voice_state: dict) -> tuple[str, dict]:
+        user = voice_state.get("user") or {}
+        fields = {"username": user["username"]} if "username" in user else {}
+        for field, key in (("nick", "nick"), ("volume", "volume"), ("muted", "mute")):
+            if key in voice_state:
+                fields[field] = voice_state[key]
+        return user.get("id"), fields
+
+    def _update_roster_user(self, voice_state: dict):
+        if not voice_state:
+            return
+        user_id, fields = self._roster_fields(voice_state)
+        # The current user is never part of the roster
+        if not user_id or user_id == self._current_user_id:
+            return
+        if self._roster.upsert(user_id, **fields):
+            self._publish_roster()
 
-    def _update_tokens(self, access_token: str = "", refresh_token: str = ""):
+    def _load_roster(self, channel: dict):
+        """Sync the roster with a GET_CHANNEL reply for the current channel."""
+        if not channel or channel.get("id") != self._roster.channel_id:
+            return
+        present = set()
+        changed = False
+        for voice_state in channel.get("voice_states", []):
+            user_id, fields = self._roster_fields(voice_state)
+            if not user_id or user_id == self._current_user_id:
+                continue
+            present.add(user_id)
+            changed |= self._roster.upsert(user_id, **fields)
+        for user_id in self._roster.users().keys() - present:
+            changed |= self._roster.remove(user_id)
+        if changed:
+            self._publish_roster()
+
+    def _publish_roster(self):
+        """Send the frontend every roster change it has not seen yet."""
+        with self._roster_lock:
+            if ROSTER_UPDATE not in self._event_interest:
+                # Consumers load a snapshot when they start listening
+                self._roster_published = self._roster.version
+                return
+            delta = self._roster.delta(self._roster_published)
+            if delta is None:
+                # Too far behind for a delta; consumers reload the snapshot
+                delta = {
+                    "since": None,
+                    "version": self._roster.version,
+                    "channel_id": self._roster.channel_id,
+                    "changes": [],
+                }
+            self._roster_published = delta["version"]
+            # Deltas build on each other, so they are never collapsed
+            self._event_batcher.add(ROSTER_UPDATE, codec.dumps({"data": delta}))
+
+    def get_roster_snapshot(self) -> bytes:
+        """Current roster, encoded so it crosses to the frontend as one value."""
+        return codec.dumps(self._roster.snapshot())
+
+    # OAuth tokens
+
+    def _on_tokens(self, access_token: str, refresh_token: str, expires_at: float):
         self.access_token = access_token
         self.refresh_token = refresh_token
         self.frontend.save_access_token(access_token)
         self.frontend.save_refresh_token(refresh_token)
+        self.frontend.save_token_expiry(expires_at)
+
+    def _on_token_exchanged(self, future):
+        if future.exception() is not None:
+            log.error(f"failed to get access token {future.exception()}")
+            self.frontend.on_auth_callback(False, str(future.exception()))
+            return
+        if self._ensure_connected():
+            self.discord_client.authenticate(future.result())
+
+    def _parse_expiry(self, expires: str) -> float:
+        try:
+            return datetime.fromisoformat(expires).timestamp() if expires else 0
+        except ValueError:
+            return 0
+
+    def _refresh_access(self):
+        if not self.refresh_token or self._token_refreshed:
+            # Nothing to refresh with, or Discord rejected the refreshed token too
+            self._reauthorize()
+            return
+        self._tokens.refresh().add_done_callback(self._on_token_refreshed)
+
+    def _on_token_refreshed(self, future):
+        if future.exception() is not None:
+            log.error(f"failed to refresh token {future.exception()}")
+            self._reauthorize()
+            return
+        self._token_refreshed = True
+        if self._ensure_connected():
+            self.discord_client.authenticate(future.result())
+
+    def _reauthorize(self):
+        """Drop the rejected tokens and start over with AUTHORIZE.
+
+        The new connection comes from the supervisor, so a Discord that keeps
+        failing us is retried with backoff rather than in a tight loop.
+        """
+        log.info("Access token rejected, asking Discord to authorize again")
+        self._token_refreshed = False
+        self._update_tokens("", "")
+        with self._connect_lock:
+            if self.discord_client is not None:
+                self._retire_client()
+        self._supervisor.kick()
+
+    def _wants_frame(self, frame: Frame) -> bool:
+        """Drop DISPATCH events nothing consumes, before they are parsed."""
+        if frame.cmd != commands.DISPATCH:
+            return True
+        return frame.evt in self._event_interest or frame.evt in ROSTER_EVENTS
+
+    def _forward_event(self, event: str, frame: Frame):
+        """Queue an event for the frontend as the raw frame bytes.
+
+        The frontend decodes the frame itself, so the payload is neither
+        re-serialized here nor proxied field by field over the connection.
+        Events are batched, and a newer event with the same collapse key
+        replaces an older one still waiting in the batch.
+        """
+        self._event_batcher.add(event, frame.raw, self._collapse_key(event, frame))
+
+    def _collapse_key(self, event: str, frame: Frame):
+        match event:
+            case commands.VOICE_SETTINGS_UPDATE | commands.VOICE_CHANNEL_SELECT:
+                return event
+            case commands.VOICE_STATE_UPDATE:
+                user = (frame.data or {}).get("user") or {}
+                return (event, user.get("id"))
+            case commands.SPEAKING_START | commands.SPEAKING_STOP:
+                return (event, (frame.data or {}).get("user_id"))
+            case commands.GET_CHANNEL:
+                return (event, (frame.data or {}).get("id"))
+        return None
+
+    def _deliver_events(self, events: tuple):
+        with self._stats_lock:
+            self.stats["events_forwarded"] += len(events)
+            self.stats["bytes_forwarded"] += sum(len(frame) for _, frame in events)
+        self.frontend.trigger_events(events)
+
+    def add_event_interest(self, event: str):
+        """Called by the frontend when it starts consuming an event."""
+        self._event_interest[event] += 1
+
+    def remove_event_interest(self, event: str):
+        if self._event_interest[event] <= 1:
+            self._event_interest.pop(event, None)
+        else:
+            self._event_interest[event] -= 1
+
+    def get_stats(self) -> dict:
+        """Counters for frames parsed, dropped and forwarded to the frontend."""
+        with self._stats_lock:
+            sources = [self.stats, self._retired_client_stats, self._event_batcher.stats, self._requests.stats]
+            if self.discord_client:
+                sources.append(self.discord_client.stats)
+            if self._tokens:
+                sources.append(self._tokens.stats)
+            # Other threads keep counting while we read; dict() copies each
+            # Counter in one step, where iterating it could see a new key
+            snapshots = [dict(source) for source in sources]
+        stats = Counter()
+        for snapshot in snapshots:
+            stats.update(snapshot)
+        return dict(stats)
+
+    def get_command_latency(self) -> dict:
+        """Round-trip latency histograms per RPC command since startup."""
+        return self._command_metrics.snapshot()
+
+    def _collect_metrics(self) -> tuple[dict, dict, dict]:
+        gauges = {
+            "event_queue_depth": len(self._event_batcher),
+            "connected": int(bool(self.discord_client and self.discord_client.is_connected())),
+            "authenticated": int(self._is_authed),
+            "voice_channel_users": len(self._roster),
+        }
+        return self.get_stats(), gauges, self.get_command_latency()
+
+    def configure_metrics(self, path: str, interval: float = None):
+        """Write metrics to ``path`` every ``interval`` seconds; an empty path stops."""
+        self._exporter.configure(path, interval)
+
+    def _update_tokens(self, access_token: str = "", refresh_token: str = ""):
+        self._tokens.set_tokens(access_token, refresh_token)
+        self._on_tokens(access_token, refresh_token, 0)
+
+    def _connect_client(self):
+        """Replace the Discord client with a freshly connected one.
+
+        Raises ``DiscordNotOpened`` when Discord isn't running. Called both
+        directly and from the connection supervisor's thread.
+        """
+        with self._connect_lock:
+            if self.discord_client is not None:
+                if self.discord_client.is_connected():
+                    return
+                self._retire_client()
+            transport = os.environ.get(TRANSPORT_ENV, "thread")
+            client_class = TRANSPORTS.get(transport, AsyncDiscord)
+            client = client_class(
+                self.client_id, self.client_secret, metrics=self._command_metrics
+            )
+            client.frame_filter = self._wants_frame
+            try:
+                client.connect(self.discord_callback)
+            except Exception:
+                client.disconnect()
+                raise
+            with self._stats_lock:
+                if self.stats["connects"]:
+                    self.stats["reconnects"] += 1
+                self.stats["connects"] += 1
+            self.discord_client = client
+            if not self.access_token:
+                client.authorize()
+            else:
+                client.authenticate(self.access_token)
+
+    def _retire_client(self):
+        self._is_authed = False
+        self._requests.reset()
+        self.discord_client.disconnect()
+        # Move its counters in one step, so get_stats never counts them twice
+        with self._stats_lock:
+            self._retired_client_stats.update(self.discord_client.stats)
+            self.discord_client = None
 
     def setup_client(self):
         if self._is_reconnecting:
@@ -89,18 +444,17 @@ class Backend(BackendBase):
             return
         try:
             self._is_reconnecting = True
-            self.discord_client = AsyncDiscord(self.client_id, self.client_secret)
-            self.discord_client.connect(self.discord_callback)
-            if not self.access_token:
-                self.discord_client.authorize()
-            else:
-                self.discord_client.authenticate(self.access_token)
+            if self.discord_client is not None:
+                # Credentials may have changed; start over with a new client
+                self._retire_client()
+            self._connect_client()
+        except DiscordNotOpened as ex:
+            self.frontend.on_auth_callback(False, str(ex))
+            log.info("Discord is not running, will connect once it starts")
+            self._supervisor.kick()
         except Exception as ex:
             self.frontend.on_auth_callback(False, str(ex))
             log.error("failed to setup discord client: {0}", ex)
-            if self.discord_client:
-                self.discord_client.disconnect()
-            self.discord_client = None
         finally:
             self._is_reconnecting = False
 
@@ -110,6 +464,7 @@ class Backend(BackendBase):
         client_secret: str,
         access_token: str = "",
         refresh_token: str = "",
+        token_expires_at: float = 0,
     ):
         if None in (client_id, client_secret) or "" in (client_id, client_secret):
             self.frontend.on_auth_callback(
@@ -120,21 +475,48 @@ class Backend(BackendBase):
         self.client_secret = client_secret
         self.access_token = access_token
         self.refresh_token = refresh_token
+        self._token_refreshed = False
+        if self._tokens is not None:
+            self._tokens.close()
+        self._tokens = TokenManager(
+            client_id,
+            client_secret,
+            self._on_tokens,
+            token_url=os.environ.get(TOKEN_URL_ENV, TOKEN_URL),
+        )
+        self._tokens.set_tokens(access_token, refresh_token, token_expires_at)
         self.setup_client()
 
     def is_authed(self) -> bool:
         return self._is_authed
 
-    def _register_callbacks(self):
-        self.discord_client.subscribe(commands.VOICE_SETTINGS_UPDATE)
-        self.discord_client.subscribe(commands.VOICE_CHANNEL_SELECT)
-        self.discord_client.subscribe(commands.GET_CHANNEL)
+    def _replay_subscriptions(self):
+        """Send every live subscription; a new session starts with none."""
+        for event, args in self._subscriptions.active():
+            self.discord_client.subscribe(event, args)
+
+    def _has_session(self) -> bool:
+        client = self.discord_client
+        return self._is_authed and client is not None and client.is_connected()
+
+    def _subscribe(self, event: str, args: dict = None):
+        # Without a session the subscription is sent by the next replay
+        if self._subscriptions.acquire(event, args) and self._has_session():
+            self.discord_client.subscribe(event, args)
+
+    def _unsubscribe(self, event: str, args: dict = None):
+        if self._subscriptions.release(event, args) and self._has_session():
+            self.discord_client.unsubscribe(event, args)
 
     def _ensure_connected(self) -> bool:
-        """Ensure client is connected, trigger reconnection if needed."""
+        """Ensure client is connected, trigger reconnection if needed.
+
+        Never connects on the caller's thread; a key press only nudges the
+        connection supervisor.
+        """
         if self.discord_client is None or not self.discord_client.is_connected():
-            if not self._is_reconnecting:
-                self.setup_client()
+            if self.client_id and self.client_secret:
+                self._supervisor.kick()
             return False
         return True
 
@@ -185,7 +567,22 @@ class Backend(BackendBase):
                 "Discord client not connected, cannot get current voice channel"
             )
             return
-        self.discord_client.get_selected_voice_channel()
+        self._coalesced_request(
+            commands.GET_SELECTED_VOICE_CHANNEL,
+            None,
+            self.discord_client.get_selected_voice_channel,
+            commands.VOICE_CHANNEL_SELECT,
+        )
+
+    def _coalesced_request(self, command: str, args: dict, send: callable, event: str):
+        """Send ``command`` unless an identical request is in flight or cached.
+
+        Joined requests are answered by the pending reply; a cached reply is
+        forwarded again as ``event``, just as a fresh one would be.
+        """
+        cached = self._requests.request(command, args, send)
+        if cached is not None:
+            self._forward_event(event, cached)
 
     def request_current_voice_channel(self):
         """Public method to request current voice channel state (dispatches to callbacks)."""
@@ -199,8 +596,14 @@ class Backend(BackendBase):
             log.warning("Discord client not connected, cannot set user volume")
             return False
         self.discord_client.set_user_voice_settings(user_id, volume=volume)
-        if user_id in self._voice_channel_users:
-            self._voice_channel_users[user_id]["volume"] = volume
+        self._requests.invalidate(commands.GET_CHANNEL)
+        with self._duck_lock:
+            if self._ducked is not None:
+                # An explicit volume wins: not restored, and not ducked again
+                self._ducked.pop(user_id, None)
+                self._duck_spared.add(user_id)
+        if user_id in self._roster and self._roster.upsert(user_id, volume=volume):
+            self._publish_roster()
         return True
 
     def set_user_mute(self, user_id: str, muted: bool) -> bool:
@@ -209,68 +612,202 @@ class Backend(BackendBase):
             log.warning("Discord client not connected, cannot set user mute")
             return False
         self.discord_client.set_user_voice_settings(user_id, mute=muted)
-        if user_id in self._voice_channel_users:
-            self._voice_channel_users[user_id]["muted"] = muted
+        self._requests.invalidate(commands.GET_CHANNEL)
+        if user_id in self._roster and self._roster.upsert(user_id, muted=muted):
+            self._publish_roster()
         return True
 
     def update_voice_channel_user(self, user_id: str, username: str, nick: str = None,
                                    volume: int = 100, muted: bool = False):
         """Track a user in the current voice channel."""
-        self._voice_channel_users[user_id] = {
-            "username": username,
-            "nick": nick,
-            "volume": volume,
-            "muted": muted
-        }
+        if self._roster.upsert(
+            user_id, username=username, nick=nick, volume=volume, muted=muted
+        ):
+            self._publish_roster()
 
     def remove_voice_channel_user(self, user_id: str):
         """Remove a user from tracking when they leave."""
-        self._voice_channel_users.pop(user_id, None)
+        if self._roster.remove(user_id):
+            self._publish_roster()
 
     def clear_voice_channel_users(self):
         """Clear all tracked users (when leaving voice channel)."""
-        self._voice_channel_users.clear()
+        self._roster.reset(self._roster.channel_id)
+        self._publish_roster()
 
     def get_voice_channel_users(self) -> dict:
         """Get a copy of the current voice channel users."""
-        return self._voice_channel_users.copy()
+        return self._roster.users()
 
     def get_channel(self, channel_id: str) -> bool:
         """Fetch channel information including voice states."""
         if not self._ensure_connected():
             log.warning("Discord client not connected, cannot get channel")
             return False
-        self.discord_client.get_channel(channel_id)
+        client = self.discord_client
+        self._coalesced_request(
+            commands.GET_CHANNEL,
+            {"channel_id": channel_id},
+            lambda: client.get_channel(channel_id),
+            commands.GET_CHANNEL,
+        )
         return True
 
-    def subscribe_voice_states(self, channel_id: str) -> bool:
-        """Subscribe to voice state events for a specific channel."""
+    # Ducking
+
+    def duck_users(self, volume: int, exclude: list[str] = None) -> bool:
+        """Drop every member of the voice channel except ``exclude`` to ``volume``.
+
+        The members and their volumes come from a fresh GET_CHANNEL reply,
+        so nobody is missed when the roster was never loaded. The volumes in
+        effect are saved for ``restore_ducked``. All commands are queued back
+        to back, so they leave as one burst of frames. Users joining before
+        the restore are ducked as they arrive. Returns False when not in a
+        voice channel or the channel can't be fetched.
+        """
         if not self._ensure_connected():
-            log.warning("Discord client not connected, cannot subscribe to voice states")
+            log.warning("Discord client not connected, cannot duck users")
+            return False
+        channel_id = self._current_voice_channel
+        if not channel_id:
+            log.warning("Not in a voice channel, nobody to duck")
+            return False
+        try:
+            channel = self.discord_client.get_channel(channel_id).result(RPC_REQUEST_TIMEOUT)
+        except Exception as ex:
+            log.error(f"failed to fetch voice channel {channel_id} for ducking: {ex}")
             return False
+        members = {}
+        for voice_state in (channel or {}).get("voice_states", []):
+            user_id, fields = self._roster_fields(voice_state)
+            if user_id and user_id != self._current_user_id:
+                members[user_id] = fields.get("volume", 100)
+        volume = max(0, min(200, volume))
+        with self._duck_lock:
+            if self._ducked is None:
+                self._ducked = {}
+            self._duck_volume = volume
+            self._duck_exclude = set(exclude or ())
+            self._duck_spared = set()
+            for user_id in self._duck_exclude & self._ducked.keys():
+                # Spared from now on; give them their volume back
+                self._apply_user_volumes({user_id: self._ducked.pop(user_id)})
+            volumes = {}
+            for user_id, current in members.items():
+                if user_id in self._duck_exclude:
+                    continue
+                self._ducked.setdefault(user_id, current)
+                volumes[user_id] = volume
+            if not self._ducked:
+                # Nobody to turn down or restore, so this is not ducking
+                self._ducked = None
+                self._publish_duck_state()
+                return True
+            self._watch_duck_channel(channel_id)
+            self._publish_duck_state()
+            if volumes:
+                with self._stats_lock:
+                    self.stats["users_ducked"] += len(volumes)
+                self._apply_user_volumes(volumes)
+        return True
+
+    def restore_ducked(self) -> bool:
+        """Give every ducked user back the volume saved by ``duck_users``."""
+        with self._duck_lock:
+            if self._ducked is None:
+                return True
+            if not self._ensure_connected():
+                log.warning("Discord client not connected, cannot restore ducked users")
+                return False
+            # Per-user volumes outlive the channel, so users who left are restored too
+            self._apply_user_volumes(self._ducked)
+            self._ducked = None
+            self._duck_exclude = set()
+            self._duck_spared = set()
+            self._watch_duck_channel(None)
+            self._publish_duck_state()
+        return True
+
+    def is_ducking(self) -> bool:
+        return self._ducked is not None
+
+    def _publish_duck_state(self):
+        """Tell every DuckOthers key when ducking starts or stops."""
+        ducking = self.is_ducking()
+        if ducking == self._duck_published:
+            return
+        self._duck_published = ducking
+        if DUCK_STATE in self._event_interest:
+            self._event_batcher.add(DUCK_STATE, codec.dumps({"data": {"ducking": ducking}}), DUCK_STATE)
+
+    def _duck_newcomers(self):
+        """Duck roster members who are not ducked, excluded or spared yet."""
+        with self._duck_lock:
+            if self._ducked is None or not self._has_session():
+                return
+            volumes = {}
+            for user_id, user in self._roster.users().items():
+                if user_id in self._ducked or user_id in self._duck_exclude:
+                    continue
+                if user_id in self._duck_spared:
+                    continue
+                self._ducked[user_id] = user.get("volume", 100)
+                volumes[user_id] = self._duck_volume
+            if volumes:
+                with self._stats_lock:
+                    self.stats["users_ducked"] += len(volumes)
+                self._apply_user_volumes(volumes)
+
+    def _apply_user_volumes(self, volumes: dict[str, int]):
+        for user_id, volume in volumes.items():
+            self.discord_client.set_user_voice_settings(user_id, volume=volume)
+        self._requests.invalidate(commands.GET_CHANNEL)
+        changed = False
+        for user_id, volume in volumes.items():
+            if user_id in self._roster:
+                changed |= self._roster.upsert(user_id, volume=volume)
+        if changed:
+            self._publish_roster()
+
+    def _watch_duck_channel(self, channel_id: str):
+        if channel_id == self._duck_channel:
+            return
+        if self._duck_channel:
+            self.unsubscribe_voice_states(self._duck_channel)
+        if channel_id:
+            self.subscribe_voice_states(channel_id)
+        self._duck_channel = channel_id
+
+    def subscribe_voice_states(self, channel_id: str) -> bool:
+        """Subscribe to voice state events for a specific channel.
+
+        Subscriptions are shared: each call must be matched by one
+        ``unsubscribe_voice_states`` for the same channel.
+        """
         args = {"channel_id": channel_id}
-        self.discord_client.subscribe(commands.VOICE_STATE_CREATE, args)
-        self.discord_client.subscribe(commands.VOICE_STATE_DELETE, args)
-        self.discord_client.subscribe(commands.VOICE_STATE_UPDATE, args)
+        for event in VOICE_STATE_EVENTS:
+            self._subscribe(event, args)
         return True
 
     def unsubscribe_voice_states(self, channel_id: str) -> bool:
         """Unsubscribe from voice state events for a specific channel."""
-        if not self._ensure_connected():
-            return False
         args = {"channel_id": channel_id}
-        self.discord_client.unsubscribe(commands.VOICE_STATE_CREATE, args)
-        self.discord_client.unsubscribe(commands.VOICE_STATE_DELETE, args)
-        self.discord_client.unsubscribe(commands.VOICE_STATE_UPDATE, args)
+        for event in VOICE_STATE_EVENTS:
+            self._unsubscribe(event, args)
         return True
 
     def close(self):
+        self._supervisor.stop()
+        if self._tokens is not None:
+            self._tokens.close()
         if self.discord_client:
             try:
                 self.discord_client.disconnect()
             except Exception as ex:
                 log.error(f"Error disconnecting Discord client: {ex}")
             self.discord_client = None
+        self._event_batcher.close()
+        self._exporter.close()
         self._is_authed = False
 
 
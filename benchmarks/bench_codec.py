@@ -0,0 +1,76 @@
+"""Encode/decode cost per JSON codec backend over Discord payload fixtures.
+
+Every backend ``discordrpc.codec`` can pick (orjson, msgspec, stdlib json)
+that is importable here is timed on each payload in ``fixtures/``: decode
+from the frame bytes and encode back to bytes, as the wire path does.
+"""
+
+import glob
+import json
+import os
+import timeit
+
+import harness
+
+from discordrpc import codec
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def available_backends() -> dict:
+    """(dumps, loads) per importable backend, configured as in codec.py."""
+    backends = {
+        "json": (
+            lambda obj: json.dumps(obj, separators=(",", ":")).encode("UTF-8"),
+            json.loads,
+        ),
+    }
+    try:
+        import orjson
+
+        backends["orjson"] = (orjson.dumps, orjson.loads)
+    except ImportError:
+        pass
+    try:
+        import msgspec
+
+        backends["msgspec"] = (msgspec.json.Encoder().encode, msgspec.json.Decoder().decode)
+    except ImportError:
+        pass
+    return backends
+
+
+def time_call(function, argument, budget: float) -> float:
+    """Best seconds per call, sized so each repeat takes about ``budget``/5."""
+    timer = timeit.Timer(lambda: function(argument))
+    number, _ = timer.autorange()
+    number = max(1, int(number * budget / 5 / 0.2))
+    return min(timer.repeat(repeat=5, number=number)) / number
+
+
+def main():
+    def configure(parser):
+        parser.add_argument("--budget", type=float, default=1.0, help="seconds per measurement")
+
+    args = harness.parse_args(__doc__.splitlines()[0], configure)
+    backends = available_backends()
+    results = {"selected": codec.BACKEND, "backends": sorted(backends), "fixtures": {}}
+    for path in sorted(glob.glob(os.path.join(FIXTURES, "*.json"))):
+        with open(path, "rb") as f:
+            raw = f.read().strip()
+        payload = json.loads(raw)
+        entry = {"bytes": len(raw)}
+        for name, (dumps, loads) in backends.items():
+            decode = time_call(loads, raw, args.budget)
+            encode = time_call(dumps, payload, args.budget)
+            entry[name] = {
+                "decode_us": decode * 1e6,
+                "encode_us": encode * 1e6,
+                "decode_mb_per_sec": len(raw) / decode / 1e6,
+            }
+        results["fixtures"][os.path.basename(path)] = entry
+    harness.report("codec", results, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Fan-out cost of channel-scoped events: EventRouter vs. broadcasting.
+
+Actions are spread evenly over a number of voice channels and listen for
+ROSTER_UPDATE, as UserVolume does. Events for random channels are then
+delivered two ways:
+
+* routed: each action registers with ``EventRouter`` for its channel, so an
+  event only reaches the actions in that channel;
+* broadcast: every action registers with one ``CallbackRegistry`` key and
+  drops events for other channels itself, as before the router existed.
+
+Reported per action count: microseconds per event and callbacks woken per
+event.
+"""
+
+import random
+import time
+
+import harness
+
+from callbacks import CallbackRegistry, EventRouter
+
+ROSTER_UPDATE = "ROSTER_UPDATE"
+
+
+class Action:
+    def __init__(self, channel_id: str):
+        self.channel_id = channel_id
+        self.woken = 0
+        self.handled = 0
+
+    def on_routed(self, data: dict):
+        self.woken += 1
+        self.handled += 1
+
+    def on_broadcast(self, data: dict):
+        self.woken += 1
+        if data.get("channel_id") != self.channel_id:
+            return
+        self.handled += 1
+
+
+def events(channels: int, count: int) -> list[dict]:
+    rng = random.Random(0)
+    return [{"channel_id": str(rng.randrange(channels)), "version": i} for i in range(count)]
+
+
+def run(dispatch: callable, payloads: list[dict], repeat: int) -> float:
+    """Best seconds to dispatch every payload once."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for data in payloads:
+            dispatch(data)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure(actions: int, channels: int, payloads: list[dict], repeat: int) -> dict:
+    members = [Action(str(index % channels)) for index in range(actions)]
+
+    router = EventRouter({ROSTER_UPDATE: lambda data: data.get("channel_id")})
+    for action in members:
+        router.add(ROSTER_UPDATE, action.channel_id, action.on_routed)
+
+    registry = CallbackRegistry()
+    for action in members:
+        registry.add(ROSTER_UPDATE, action.on_broadcast)
+
+    def broadcast(data: dict):
+        for callback in registry.get(ROSTER_UPDATE):
+            callback(data)
+
+    results = {}
+    for name, dispatch in (
+        ("routed", lambda data: router.dispatch(ROSTER_UPDATE, data)),
+        ("broadcast", broadcast),
+    ):
+        for action in members:
+            action.woken = action.handled = 0
+        seconds = run(dispatch, payloads, repeat)
+        results[name] = {
+            "us_per_event": seconds / len(payloads) * 1e6,
+            "events_per_sec": len(payloads) / seconds,
+            "callbacks_per_event": sum(a.woken for a in members) / repeat / len(payloads),
+            "handled_per_event": sum(a.handled for a in members) / repeat / len(payloads),
+        }
+    results["speedup"] = results["broadcast"]["us_per_event"] / results["routed"]["us_per_event"]
+    return results
+
+
+def main():
+    def configure(parser):
+        parser.add_argument(
+            "--actions", type=int, nargs="+", default=[100, 250, 1000], help="registered actions"
+        )
+        parser.add_argument("--channels", type=int, default=25, help="voice channels they are spread over")
+        parser.add_argument("--events", type=int, default=20000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    args = harness.parse_args(__doc__.splitlines()[0], configure)
+    payloads = events(args.channels, args.events)
+    results = {
+        "channels": args.channels,
+        "events": args.events,
+        "actions": {
+            str(count): measure(count, args.channels, payloads, args.repeat) for count in args.actions
+        },
+    }
+    harness.report("event_router", results, args)
+
+
+if __name__ == "__main__":
+    main()
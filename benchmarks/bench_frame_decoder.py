@@ -0,0 +1,116 @@
+"""Throughput of the incremental IPC frame decoder.
+
+Two workloads, each fed to ``FrameDecoder`` in socket-sized chunks and
+also read through ``UnixPipe.read_frames`` from a real socket pair:
+
+* small: back-to-back ~400 byte VOICE_STATE_UPDATE frames, as in a voice state storm;
+* large: GET_CHANNEL replies of several hundred KB, spanning many reads.
+"""
+
+import socket
+import threading
+import time
+
+import harness
+
+from discordrpc import commands
+from discordrpc.asyncdiscord import OP_FRAME
+from discordrpc.constants import SOCKET_BUFFER_SIZE
+from discordrpc.sockets import FrameDecoder, UnixPipe, encode_frame
+from tests.mock_discord import make_channel, make_user, make_voice_state
+
+
+def small_frames(count: int) -> list[bytes]:
+    return [
+        encode_frame(
+            {
+                "cmd": commands.DISPATCH,
+                "evt": commands.VOICE_STATE_UPDATE,
+                "data": make_voice_state(make_user(str(1300000000000000000 + i), f"member{i}")),
+                "nonce": None,
+            },
+            OP_FRAME,
+        )
+        for i in range(count)
+    ]
+
+
+def large_frames(count: int, members: int) -> list[bytes]:
+    channel = make_channel("2000", "Stage", members=members)
+    return [
+        encode_frame(
+            {"cmd": commands.GET_CHANNEL, "evt": None, "nonce": str(i), "data": channel},
+            OP_FRAME,
+        )
+        for i in range(count)
+    ]
+
+
+def decode_chunks(stream: bytes, chunk: int, repeat: int) -> float:
+    """Seconds per pass of feeding ``stream`` to a decoder ``chunk`` bytes at a time."""
+    best = float("inf")
+    for _ in range(repeat):
+        decoder = FrameDecoder()
+        start = time.perf_counter()
+        for offset in range(0, len(stream), chunk):
+            decoder.feed(stream[offset : offset + chunk])
+        best = min(best, time.perf_counter() - start)
+        assert decoder.pending() == 0
+    return best
+
+
+def read_socket(stream: bytes, frames: int) -> float:
+    """Seconds for ``UnixPipe.read_frames`` to take every frame off a socket pair."""
+    writer, reader = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+    pipe = UnixPipe()
+    pipe.socket = reader
+    sender = threading.Thread(target=writer.sendall, args=(stream,))
+    received = 0
+    start = time.perf_counter()
+    sender.start()
+    while received < frames:
+        received += len(pipe.read_frames())
+    elapsed = time.perf_counter() - start
+    sender.join()
+    writer.close()
+    reader.close()
+    return elapsed
+
+
+def workload(frames: list[bytes], repeat: int) -> dict:
+    stream = b"".join(frames)
+    results = {
+        "frames": len(frames),
+        "bytes": len(stream),
+        "frame_bytes_mean": len(stream) / len(frames),
+    }
+    for label, seconds in (
+        ("decoder", decode_chunks(stream, SOCKET_BUFFER_SIZE, repeat)),
+        ("socket", min(read_socket(stream, len(frames)) for _ in range(repeat))),
+    ):
+        results[label] = {
+            "seconds": seconds,
+            "frames_per_sec": len(frames) / seconds,
+            "mb_per_sec": len(stream) / seconds / 1e6,
+        }
+    return results
+
+
+def main():
+    def configure(parser):
+        parser.add_argument("--small", type=int, default=100000, help="number of small frames")
+        parser.add_argument("--large", type=int, default=50, help="number of GET_CHANNEL frames")
+        parser.add_argument("--members", type=int, default=1000, help="voice states per GET_CHANNEL")
+        parser.add_argument("--repeat", type=int, default=5)
+
+    args = harness.parse_args(__doc__.splitlines()[0], configure)
+    results = {
+        "chunk_bytes": SOCKET_BUFFER_SIZE,
+        "small": workload(small_frames(args.small), args.repeat),
+        "large": workload(large_frames(args.large, args.members), args.repeat),
+    }
+    harness.report("frame_decoder", results, args)
+
+
+if __name__ == "__main__":
+    main()
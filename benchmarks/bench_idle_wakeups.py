@@ -0,0 +1,103 @@
+"""Idle wakeups/sec of the client's poll thread, before and after the selector loop.
+
+"before" reproduces the original poll loop: a blocking ``recv`` with a
+0.1 s socket timeout, looping on every timeout to check ``polling``.
+"after" is ``AsyncDiscord``'s selector loop with its wake-up pipe. Both
+sit connected to the mock Discord server with nothing to do; wakeups are
+the poll thread's context switches as counted by the kernel. The time
+from asking the loop to stop until its thread has exited is reported too.
+"""
+
+import socket
+import threading
+import time
+
+import harness
+
+from discordrpc import AsyncDiscord
+from discordrpc.asyncdiscord import OP_HANDSHAKE
+from discordrpc.sockets import UnixPipe
+from tests.mock_discord import MockDiscord
+
+LEGACY_SELECT_TIMEOUT = 0.1  # SOCKET_SELECT_TIMEOUT before the selector loop
+
+
+class LegacyPoller:
+    """The timeout-driven poll loop the selector loop replaced."""
+
+    def __init__(self):
+        self.pipe = UnixPipe()
+        self.polling = False
+        self.thread: threading.Thread = None
+
+    def connect(self):
+        self.pipe.connect()
+        self.pipe.send({"v": "1", "client_id": "client-id"}, OP_HANDSHAKE)
+        self.pipe.receive()
+        self.pipe.socket.settimeout(LEGACY_SELECT_TIMEOUT)
+        self.polling = True
+        self.thread = threading.Thread(target=self._poll, name="legacy-poll")
+        self.thread.start()
+
+    def _poll(self):
+        while self.polling:
+            try:
+                self.pipe.socket.recv(65536)
+            except socket.timeout:
+                continue
+        self.pipe.disconnect()
+
+    def disconnect(self):
+        self.polling = False
+
+
+def measure(connect: callable, idle: float) -> dict:
+    with MockDiscord():
+        client, thread = connect()
+        time.sleep(0.2)
+        wakeups = harness.thread_wakeups(thread.native_id)
+        cpu = harness.thread_cpu_seconds(thread.native_id)
+        time.sleep(idle)
+        wakeups = harness.thread_wakeups(thread.native_id) - wakeups
+        cpu = harness.thread_cpu_seconds(thread.native_id) - cpu
+        start = time.perf_counter()
+        client.disconnect()
+        returned = time.perf_counter() - start
+        thread.join()
+        stopped = time.perf_counter() - start
+    return {
+        "idle_seconds": idle,
+        "wakeups": wakeups,
+        "wakeups_per_sec": wakeups / idle,
+        "cpu_seconds": cpu,
+        "disconnect_return_ms": returned * 1000,
+        "thread_exit_ms": stopped * 1000,
+    }
+
+
+def connect_legacy():
+    poller = LegacyPoller()
+    poller.connect()
+    return poller, poller.thread
+
+
+def connect_selector():
+    client = AsyncDiscord("client-id", "secret")
+    client.connect(lambda code, frame: None)
+    return client, client._poll_thread
+
+
+def main():
+    def configure(parser):
+        parser.add_argument("--idle", type=float, default=10, help="seconds to sit idle")
+
+    args = harness.parse_args(__doc__.splitlines()[0], configure)
+    results = {
+        "before": measure(connect_legacy, args.idle),
+        "after": measure(connect_selector, args.idle),
+    }
+    harness.report("idle_wakeups", results, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""End-to-end latency and throughput of the backend's RPC pipeline.
+
+Runs the real ``Backend`` against the mock Discord server, with the
+StreamController frontend replaced by stub hooks, once per transport:
+
+* mute round trip: ``Backend.set_mute`` -> socket -> Discord ->
+  VOICE_SETTINGS_UPDATE -> ``trigger_events`` -> the Mute action's update,
+  one key press at a time, ``--press-interval`` apart;
+* event throughput: a DISPATCH stream pushed as fast as possible through
+  the poll loop, ``discord_callback`` and ``trigger_events``, reporting
+  events/sec and per-event latency.
+
+Each transport runs in a fresh process, so neither inherits the other's
+state.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import harness
+
+# Keys of backend.TRANSPORTS; backend.py is only imported in the child
+TRANSPORTS = ("asyncio", "thread")
+
+
+def measure(transport: str, presses: int, press_interval: float, events: int) -> dict:
+    from discordrpc import commands
+    from tests.mock_discord import MockDiscord
+
+    frontend = harness.StubFrontend()
+    frontend.record = False
+    with MockDiscord() as discord:
+        backend = harness.make_backend(frontend)
+        os.environ[sys.modules["backend"].TRANSPORT_ENV] = transport
+        backend.update_client_credentials("client-id", "secret", "token")
+        if not frontend.authed.wait(10):
+            raise RuntimeError("backend never authenticated against the mock server")
+        discord.wait_for_command(commands.SUBSCRIBE, count=3)
+        time.sleep(0.2)
+
+        # Key press -> VOICE_SETTINGS_UPDATE -> display update
+        seen = threading.Condition()
+        shown = {}
+
+        def update_display(data):
+            with seen:
+                shown["mute"] = data.get("mute")
+                shown["at"] = time.perf_counter()
+                seen.notify_all()
+
+        frontend.on(commands.VOICE_SETTINGS_UPDATE, update_display)
+        round_trips = []
+        muted = False
+        for _ in range(presses):
+            time.sleep(press_interval)
+            muted = not muted
+            start = time.perf_counter()
+            backend.set_mute(muted)
+            with seen:
+                if not seen.wait_for(lambda: shown.get("mute") == muted, 5):
+                    raise RuntimeError("no VOICE_SETTINGS_UPDATE for a mute press")
+                round_trips.append((shown["at"] - start) * 1000)
+
+        # Sustained DISPATCH throughput; distinct users so nothing collapses
+        backend.add_event_interest(commands.SPEAKING_START)
+        delivered = threading.Event()
+        latencies = []
+
+        def on_speaking(data):
+            latencies.append((time.perf_counter_ns() - data["sent_ns"]) / 1e6)
+            if len(latencies) >= events:
+                delivered.set()
+
+        frontend.on(commands.SPEAKING_START, on_speaking)
+        start = time.perf_counter()
+        discord.stream(
+            lambda i: (
+                commands.SPEAKING_START,
+                {"user_id": str(i), "channel_id": "2000", "sent_ns": time.perf_counter_ns()},
+            ),
+            count=events,
+            force=True,
+        )
+        if not delivered.wait(60):
+            raise RuntimeError(f"only {len(latencies)} of {events} events were delivered")
+        elapsed = time.perf_counter() - start
+        backend.close()
+
+    return {
+        "mute_round_trip_ms": harness.percentiles(round_trips),
+        "event_throughput": {
+            "events": events,
+            "seconds": elapsed,
+            "events_per_sec": events / elapsed,
+            "latency_ms": harness.percentiles(latencies),
+        },
+        "batch_window_ms": backend._event_batcher.window * 1000,
+    }
+
+
+def main():
+    def configure(parser):
+        parser.add_argument("--transport", choices=TRANSPORTS, action="append")
+        parser.add_argument("--presses", type=int, default=200)
+        parser.add_argument(
+            "--press-interval", type=float, default=0.05, help="seconds between key presses"
+        )
+        parser.add_argument("--events", type=int, default=20000)
+        parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+
+    args = harness.parse_args(__doc__.splitlines()[0], configure)
+    transports = args.transport or TRANSPORTS
+    if args.child:
+        print(json.dumps(measure(transports[0], args.presses, args.press_interval, args.events)))
+        return
+    results = {}
+    for transport in transports:
+        child = subprocess.run(
+            [
+                sys.executable,
+                __file__,
+                "--child",
+                "--transport",
+                transport,
+                "--presses",
+                str(args.presses),
+                "--press-interval",
+                str(args.press_interval),
+                "--events",
+                str(args.events),
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        results[transport] = json.loads(child.stdout)
+    harness.report("rpc_pipeline", results, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Time the plugin frontend takes to load: import plus ``PluginTemplate()``.
+
+StreamController's ``src.backend`` modules, GtkHelper and GTK are replaced
+by the stand-ins in ``streamcontroller_stub``, so only the plugin's own
+work is measured. Each run is a fresh process, since a second import would
+be served from ``sys.modules``:
+
+* import: ``import main``, which pulls in the actions, settings and discordrpc;
+* init: ``PluginTemplate()`` returning, i.e. StreamController's startup path;
+* ready: until the backend is up and the interest collected meanwhile has
+  been announced; ``--launch-delay`` stands in for starting the process.
+"""
+
+import json
+import subprocess
+import sys
+import time
+
+import streamcontroller_stub
+
+
+def run_child(launch_delay: float):
+    # loguru is already loaded inside StreamController, so it isn't counted
+    import loguru  # noqa: F401
+
+    streamcontroller_stub.install()
+    streamcontroller_stub.PluginBase.launch_delay = launch_delay
+    start = time.perf_counter()
+    main = streamcontroller_stub.import_plugin()
+    imported = time.perf_counter()
+    plugin = main.PluginTemplate()
+    initialized = time.perf_counter()
+    while not plugin.backend_ready:
+        time.sleep(0.0005)
+    ready = time.perf_counter()
+    print(
+        json.dumps({
+            "import_ms": (imported - start) * 1000,
+            "init_ms": (initialized - imported) * 1000,
+            "ready_ms": (ready - imported) * 1000,
+            "modules": len(sys.modules),
+        })
+    )
+
+
+def main():
+    # The child must not import harness: its imports would be counted as cached
+    import harness
+
+    def configure(parser):
+        parser.add_argument("--runs", type=int, default=20)
+        parser.add_argument(
+            "--launch-delay", type=float, default=0.2, help="seconds the backend takes to start"
+        )
+
+    args = harness.parse_args(__doc__.splitlines()[0], configure)
+    samples: dict[str, list[float]] = {"import_ms": [], "init_ms": [], "ready_ms": []}
+    modules = 0
+    for _ in range(args.runs):
+        child = subprocess.run(
+            [sys.executable, __file__, "--child", str(args.launch_delay)],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        run = json.loads(child.stdout.splitlines()[-1])
+        for name, values in samples.items():
+            values.append(run[name])
+        modules = run["modules"]
+    results = {name: harness.percentiles(values) for name, values in samples.items()}
+    results.update({"runs": args.runs, "launch_delay": args.launch_delay, "modules_loaded": modules})
+    harness.report("startup", results, args)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        run_child(float(sys.argv[2]))
+    else:
+        main()
@@ -0,0 +1,101 @@
+"""Idle CPU and event latency of the threaded and asyncio IPC clients.
+
+Each client connects to the mock Discord server and authenticates, then:
+
+* sits idle for a while; the CPU time used by the process and by the
+  client's I/O thread (poll thread or event loop thread) is reported;
+* receives a paced DISPATCH stream and, separately, an unpaced burst; the
+  time from the server writing each event to the client's callback seeing
+  it is reported as p50/p95/p99.
+"""
+
+import threading
+import time
+
+import harness
+
+from discordrpc import AioDiscordClient, AsyncDiscord, commands
+from tests.mock_discord import MockDiscord
+
+CLIENTS = {"thread": AsyncDiscord, "asyncio": AioDiscordClient}
+
+
+def io_thread(client) -> threading.Thread:
+    if isinstance(client, AsyncDiscord):
+        return client._poll_thread
+    return client._thread
+
+
+def speaking(index: int) -> tuple[str, dict]:
+    return commands.SPEAKING_START, {"user_id": str(index), "sent_ns": time.perf_counter_ns()}
+
+
+class LatencyRecorder:
+    def __init__(self):
+        self.samples: list[float] = []
+        self.expected = 0
+        self.done = threading.Event()
+
+    def __call__(self, code, frame):
+        if frame is None or frame.evt != commands.SPEAKING_START:
+            return
+        self.samples.append((time.perf_counter_ns() - frame.data["sent_ns"]) / 1e6)
+        if len(self.samples) >= self.expected:
+            self.done.set()
+
+    def expect(self, count: int):
+        self.samples = []
+        self.expected = count
+        self.done.clear()
+
+
+def stream_latency(discord: MockDiscord, recorder: LatencyRecorder, rate: float, count: int) -> dict:
+    recorder.expect(count)
+    discord.stream(speaking, rate=rate, count=count, force=True)
+    if not recorder.done.wait(60):
+        raise RuntimeError(f"only {len(recorder.samples)} of {count} events arrived")
+    return harness.percentiles(recorder.samples)
+
+
+def measure(name: str, idle: float, rate: float, count: int) -> dict:
+    recorder = LatencyRecorder()
+    with MockDiscord() as discord:
+        client = CLIENTS[name]("client-id", "secret")
+        client.connect(recorder)
+        client.authenticate("token").result(5)
+        time.sleep(0.2)
+
+        thread = io_thread(client)
+        process_start = time.process_time()
+        thread_start = harness.thread_cpu_seconds(thread.native_id)
+        time.sleep(idle)
+        process_cpu = time.process_time() - process_start
+        thread_cpu = harness.thread_cpu_seconds(thread.native_id) - thread_start
+
+        results = {
+            "idle_seconds": idle,
+            "idle_cpu_percent": {
+                "process": process_cpu / idle * 100,
+                "io_thread": thread_cpu / idle * 100,
+            },
+            "paced_latency_ms": stream_latency(discord, recorder, rate, count),
+            "paced_rate": rate,
+            "burst_latency_ms": stream_latency(discord, recorder, None, count),
+        }
+        client.disconnect()
+    return results
+
+
+def main():
+    def configure(parser):
+        parser.add_argument("--idle", type=float, default=10, help="seconds to measure idle CPU")
+        parser.add_argument("--rate", type=float, default=1000, help="events/sec of the paced stream")
+        parser.add_argument("--events", type=int, default=5000)
+
+    args = harness.parse_args(__doc__.splitlines()[0], configure)
+    results = {name: measure(name, args.idle, args.rate, args.events) for name in CLIENTS}
+    harness.report("transports", results, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Shared helpers for the benchmark scripts.
+
+Each script prints its results as JSON and can also write them to a file
+with ``--output``, so runs can be compared across releases.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from loguru import logger as log
+
+from tests.backend_stub import StubFrontend, make_backend  # noqa: F401  (re-exported)
+
+# Debug logging from the clients would dominate every measurement
+log.remove()
+log.add(sys.stderr, level="WARNING")
+
+
+def parse_args(description: str, configure: callable = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    if configure is not None:
+        configure(parser)
+    return parser.parse_args()
+
+
+def percentiles(samples: list[float]) -> dict:
+    """Nearest-rank p50/p95/p99 plus mean, min and max of ``samples``."""
+    if not samples:
+        return {"n": 0}
+    ordered = sorted(samples)
+
+    def rank(p: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+    return {
+        "n": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "min": ordered[0],
+        "p50": rank(50),
+        "p95": rank(95),
+        "p99": rank(99),
+        "max": ordered[-1],
+    }
+
+
+def environment() -> dict:
+    from discordrpc import codec
+
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "cpus": os.cpu_count(),
+        "codec": codec.BACKEND,
+    }
+
+
+def report(name: str, results: dict, args: argparse.Namespace):
+    document = {
+        "benchmark": name,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "environment": environment(),
+        "results": results,
+    }
+    text = json.dumps(document, indent=2, sort_keys=True)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="UTF-8") as f:
+            f.write(text + "\n")
+
+
+def thread_cpu_seconds(native_id: int) -> float:
+    """CPU time (user + system) a thread of this process has used so far."""
+    with open(f"/proc/self/task/{native_id}/stat", encoding="ascii") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    ticks = os.sysconf("SC_CLK_TCK")
+    return (int(fields[11]) + int(fields[12])) / ticks
+
+
+def thread_wakeups(native_id: int) -> int:
+    """Context switches of a thread so far; each sleep-then-run counts once."""
+    switches = 0
+    with open(f"/proc/self/task/{native_id}/status", encoding="ascii") as f:
+        for line in f:
+            if line.startswith(("voluntary_ctxt_switches", "nonvoluntary_ctxt_switches")):
+                switches += int(line.split()[1])
+    return switches
+
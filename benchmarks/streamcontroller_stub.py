@@ -0,0 +1,154 @@
+"""Load the plugin frontend outside StreamController.
+
+``main.py`` and the actions import StreamController's ``src.backend``
+modules, ``GtkHelper`` and GTK through ``gi``. ``install()`` puts stand-ins
+for all of them in ``sys.modules``: ``PluginBase`` implements the calls the
+plugin makes while loading and everything else accepts any use. The
+plugin is then imported as a package, as StreamController does.
+"""
+
+import importlib
+import os
+import sys
+import time
+import types
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = "discord_plugin"
+
+STUBBED_MODULES = (
+    "gi",
+    "gi.repository",
+    "GtkHelper",
+    "GtkHelper.GenerativeUI",
+    "GtkHelper.GenerativeUI.EntryRow",
+    "src",
+    "src.backend",
+    "src.backend.DeckManagement",
+    "src.backend.DeckManagement.ImageHelpers",
+    "src.backend.DeckManagement.InputIdentifier",
+    "src.backend.PluginManager",
+    "src.backend.PluginManager.ActionCore",
+    "src.backend.PluginManager.ActionHolder",
+    "src.backend.PluginManager.ActionInputSupport",
+    "src.backend.PluginManager.EventAssigner",
+    "src.backend.PluginManager.EventHolder",
+    "src.backend.PluginManager.InputBases",
+    "src.backend.PluginManager.PluginBase",
+    "src.backend.PluginManager.PluginSettings",
+    "src.backend.PluginManager.PluginSettings.Asset",
+)
+
+
+class _AnythingType(type):
+    def __getattr__(cls, name: str):
+        return Anything
+
+
+class Anything(metaclass=_AnythingType):
+    """Takes any arguments, attribute or call, and can be subclassed."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name: str):
+        return Anything()
+
+    def __call__(self, *args, **kwargs):
+        return Anything()
+
+
+class StubModule(types.ModuleType):
+    def __getattr__(self, name: str):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return Anything
+
+
+class StubBackend:
+    """The backend calls the frontend makes while it starts."""
+
+    def add_event_interest(self, event: str):
+        pass
+
+    def remove_event_interest(self, event: str):
+        pass
+
+    def is_authed(self) -> bool:
+        return False
+
+    def configure_metrics(self, path: str, interval: float = None):
+        pass
+
+    def update_client_credentials(self, *args):
+        pass
+
+
+class PluginBase:
+    """The parts of StreamController's ``PluginBase`` the plugin uses at load.
+
+    ``launch_backend`` sleeps for ``launch_delay`` seconds in place of
+    starting the backend process.
+    """
+
+    launch_delay: float = 0
+
+    def __init__(self, use_legacy_locale: bool = True):
+        self.PATH = REPO_ROOT
+        self.backend = None
+        self.locale_manager = Anything()
+        self.asset_manager = Anything()
+        self.action_holders: list = []
+        self.event_holders: dict = {}
+        self.icons: dict[str, str] = {}
+        self._settings: dict = {}
+
+    def register(self, **kwargs):
+        pass
+
+    def add_css_stylesheet(self, path: str):
+        pass
+
+    def add_icon(self, key: str, path: str):
+        self.icons[key] = path
+
+    def get_asset_path(self, name: str) -> str:
+        return os.path.join(self.PATH, "assets", name)
+
+    def add_action_holder(self, holder):
+        self.action_holders.append(holder)
+
+    def add_event_holders(self, holders: list):
+        for index, holder in enumerate(holders):
+            self.event_holders[index] = holder
+
+    def get_plugin_id(self) -> str:
+        return "com_imdevinc_StreamControllerDiscordPlugin"
+
+    def get_settings(self) -> dict:
+        return dict(self._settings)
+
+    def set_settings(self, settings: dict):
+        self._settings = settings
+
+    def launch_backend(self, backend_path: str, open_in_terminal: bool = False, venv_path: str = None):
+        time.sleep(self.launch_delay)
+        self.backend = StubBackend()
+
+
+def install():
+    for name in STUBBED_MODULES:
+        if name not in sys.modules:
+            module = StubModule(name)
+            module.__path__ = []
+            sys.modules[name] = module
+    sys.modules["src.backend.PluginManager.PluginBase"].PluginBase = PluginBase
+
+
+def import_plugin() -> types.ModuleType:
+    """Import ``main.py`` the way StreamController loads a plugin directory."""
+    if PACKAGE not in sys.modules:
+        package = types.ModuleType(PACKAGE)
+        package.__path__ = [REPO_ROOT]
+        sys.modules[PACKAGE] = package
+    return importlib.import_module(f"{PACKAGE}.main")
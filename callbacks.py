@@ -0,0 +1,156 @@
+import threading
+import weakref
+
+
+class CallbackRegistry:
+    """Frontend callbacks per event key, without duplicates or strong refs.
+
+    Bound methods are held through ``weakref.WeakMethod``, so registering
+    one never keeps its action alive; dead entries are dropped the next time
+    the key is dispatched. Adding the same callback twice is a no-op and
+    removal is O(1). ``on_first`` and ``on_empty`` are called with the key
+    when it gains its first callback and when it loses its last one.
+    """
+
+    def __init__(self, on_first: callable = None, on_empty: callable = None):
+        self._on_first = on_first
+        self._on_empty = on_empty
+        self._lock = threading.Lock()
+        self._callbacks: dict[str, dict] = {}  # key -> {identity: ref}
+
+    @staticmethod
+    def _identity(callback: callable):
+        owner = getattr(callback, "__self__", None)
+        if owner is None:
+            return callback
+        return (id(owner), callback.__func__)
+
+    @staticmethod
+    def _ref(callback: callable) -> callable:
+        if getattr(callback, "__self__", None) is None:
+            # Plain functions (and lambdas) would die at once if held weakly
+            return lambda: callback
+        return weakref.WeakMethod(callback)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._callbacks
+
+    def __iter__(self):
+        return iter(list(self._callbacks))
+
+    def add(self, key: str, callback: callable):
+        identity = self._identity(callback)
+        with self._lock:
+            refs = self._callbacks.get(key)
+            first = refs is None
+            if first:
+                refs = self._callbacks[key] = {}
+            ref = refs.get(identity)
+            # An id can be reused once its object is gone, so a dead entry
+            # under the same identity is replaced rather than kept
+            if ref is not None and ref() is not None:
+                return
+            refs[identity] = self._ref(callback)
+        if first and self._on_first is not None:
+            self._on_first(key)
+
+    def remove(self, key: str, callback: callable):
+        with self._lock:
+            refs = self._callbacks.get(key)
+            if refs is None or refs.pop(self._identity(callback), None) is None:
+                return
+            emptied = not refs
+            if emptied:
+                del self._callbacks[key]
+        if emptied and self._on_empty is not None:
+            self._on_empty(key)
+
+    def get(self, key: str) -> list[callable]:
+        """Live callbacks for ``key``, pruning any whose owner is gone."""
+        callbacks = []
+        with self._lock:
+            refs = self._callbacks.get(key)
+            if refs is None:
+                return callbacks
+            for identity, ref in list(refs.items()):
+                callback = ref()
+                if callback is None:
+                    del refs[identity]
+                else:
+                    callbacks.append(callback)
+            emptied = not refs
+            if emptied:
+                del self._callbacks[key]
+        if emptied and self._on_empty is not None:
+            self._on_empty(key)
+        return callbacks
+
+    def count(self, key: str) -> int:
+        return len(self.get(key))
+
+
+class EventRouter:
+    """Delivers events only to the callbacks registered for their scope.
+
+    ``scopes`` maps each routed event to a function returning the scope of
+    a given payload (a channel id, a user id, ...). Callbacks register for
+    an (event, scope) pair, so dispatching an event costs one lookup and
+    wakes only the matching callbacks. ``on_first`` and ``on_empty`` are
+    called per event, as for ``CallbackRegistry``.
+    """
+
+    def __init__(
+        self,
+        scopes: dict[str, callable],
+        on_first: callable = None,
+        on_empty: callable = None,
+    ):
+        self._scopes = scopes
+        self._on_first = on_first
+        self._on_empty = on_empty
+        self._lock = threading.Lock()
+        self._scope_counts: dict[str, int] = {}  # event -> scopes with callbacks
+        self._callbacks = CallbackRegistry(
+            on_first=self._scope_added, on_empty=self._scope_removed
+        )
+
+    def routes(self, event: str) -> bool:
+        return event in self._scopes
+
+    def events(self) -> list[str]:
+        """Routed events with at least one registered callback."""
+        with self._lock:
+            return list(self._scope_counts)
+
+    def add(self, event: str, scope, callback: callable):
+        self._callbacks.add((event, scope), callback)
+
+    def remove(self, event: str, scope, callback: callable):
+        self._callbacks.remove((event, scope), callback)
+
+    def dispatch(self, event: str, data) -> int:
+        """Call the callbacks for the event's scope; returns how many ran."""
+        scope = self._scopes[event](data or {})
+        callbacks = self._callbacks.get((event, scope))
+        for callback in callbacks:
+            callback(data)
+        return len(callbacks)
+
+    def _scope_added(self, key: tuple):
+        event = key[0]
+        with self._lock:
+            count = self._scope_counts.get(event, 0) + 1
+            self._scope_counts[event] = count
+        if count == 1 and self._on_first is not None:
+            self._on_first(event)
+
+    def _scope_removed(self, key: tuple):
+        event = key[0]
+        with self._lock:
+            count = self._scope_counts.get(event, 0) - 1
+            if count > 0:
+                self._scope_counts[event] = count
+            else:
+                self._scope_counts.pop(event, None)
+        if count <= 0 and self._on_empty is not None:
+            self._on_empty(event)
@@ -1,3 +1,20 @@
+import importlib
+
 from .exceptions import *
-from .asyncdiscord import AsyncDiscord
+from .frame import Frame
 from .commands import *
+
+# The clients pull in sockets and asyncio, which only the backend process
+# needs; the frontend just uses the commands and codec.
+_CLIENTS = {
+    "AsyncDiscord": ".asyncdiscord",
+    "AioDiscord": ".aiodiscord",
+    "AioDiscordClient": ".aiodiscord",
+}
+
+
+def __getattr__(name: str):
+    module = _CLIENTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module, __name__), name)
@@ -0,0 +1,343 @@
+import asyncio
+import threading
+import uuid
+from collections import Counter
+from concurrent.futures import Future
+
+from loguru import logger as log
+
+from .asyncdiscord import OP_HANDSHAKE, OP_FRAME
+from .sockets import (
+    FRAME_HEADER,
+    SOCKET_DISCONNECTED,
+    FrameError,
+    check_frame_length,
+    ipc_paths,
+    remember_ipc_path,
+)
+from . import codec
+from .commands import *
+from .exceptions import *
+from .constants import RPC_REQUEST_TIMEOUT
+from .pending import PendingRequests
+from .metrics import CommandMetrics
+from .frame import Frame
+
+CONNECT_TIMEOUT = 2
+HANDSHAKE_TIMEOUT = 5
+
+
+class AioDiscord:
+    """asyncio Discord IPC client.
+
+    Speaks the same protocol as ``AsyncDiscord`` over an asyncio stream:
+    reads are awaited in a single reader task, writes go through the stream
+    writer and commands are coroutines returning the reply's ``data``.
+    Everything must be called from the loop that ran ``connect``.
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        access_token: str = "",
+        metrics: CommandMetrics = None,
+    ):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.access_token = access_token
+        self._reader: asyncio.StreamReader = None
+        self._writer: asyncio.StreamWriter = None
+        self._reader_task: asyncio.Task = None
+        self.metrics = metrics if metrics is not None else CommandMetrics()
+        self._pending = PendingRequests(self.metrics)
+        # Optional predicate; frames it rejects are dropped before parsing
+        self.frame_filter: callable = None
+        self.stats: Counter = Counter()
+
+    def is_connected(self) -> bool:
+        return self._reader_task is not None and not self._reader_task.done()
+
+    async def _open(self):
+        for path in ipc_paths():
+            try:
+                streams = await asyncio.wait_for(
+                    asyncio.open_unix_connection(path), CONNECT_TIMEOUT
+                )
+            except (FileNotFoundError, ConnectionRefusedError):
+                continue
+            except Exception as ex:
+                log.error(f"failed to connect to socket {path}, trying next socket. {ex}")
+                continue
+            remember_ipc_path(path)
+            return streams
+        raise DiscordNotOpened
+
+    async def _write(self, payload: dict, op: int):
+        body = codec.dumps(payload)
+        self.stats["frames_out"] += 1
+        self.stats["bytes_out"] += FRAME_HEADER.size + len(body)
+        self._writer.write(FRAME_HEADER.pack(op, len(body)) + body)
+        await self._writer.drain()
+
+    async def _read(self) -> Frame:
+        header = await self._reader.readexactly(FRAME_HEADER.size)
+        op, length = FRAME_HEADER.unpack(header)
+        try:
+            check_frame_length(length)
+        except FrameError as ex:
+            raise RPCException(str(ex))
+        body = await self._reader.readexactly(length) if length else b""
+        return Frame(op, body)
+
+    async def connect(self, callback: callable):
+        self._reader, self._writer = await self._open()
+        try:
+            await self._handshake()
+        except BaseException:
+            self._writer.close()
+            self._reader = self._writer = None
+            raise
+        self._reader_task = asyncio.create_task(self._read_loop(callback))
+
+    async def _handshake(self):
+        await self._write({"v": "1", "client_id": self.client_id}, OP_HANDSHAKE)
+        try:
+            frame = await asyncio.wait_for(self._read(), HANDSHAKE_TIMEOUT)
+            data = frame.payload
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError) as ex:
+            log.error(f"no response from discord client. {ex}")
+            raise RPCException
+        except codec.DecodeError as ex:
+            log.error(f"invalid response. {ex}")
+            raise RPCException
+        if data.get("code") == 4000:
+            raise InvalidID
+        if data.get("cmd") != "DISPATCH" or data.get("evt") != "READY":
+            raise RPCException
+
+    async def _read_loop(self, callback: callable):
+        try:
+            while True:
+                try:
+                    frame = await self._read()
+                except (asyncio.IncompleteReadError, ConnectionError, RPCException) as ex:
+                    log.debug(f"discord connection closed: {ex}")
+                    break
+                self.stats["frames_in"] += 1
+                self.stats["bytes_in"] += len(frame)
+                try:
+                    if self.frame_filter is not None and not self.frame_filter(frame):
+                        self.stats["frames_dropped"] += 1
+                        self.stats["bytes_dropped"] += len(frame)
+                        continue
+                    nonce = frame.nonce
+                    if nonce:
+                        self._pending.resolve(nonce, frame)
+                    callback(frame.op, frame)
+                except codec.DecodeError as ex:
+                    self.stats["decode_errors"] += 1
+                    log.error(f"failed to parse discord event: {ex}")
+                if frame.parsed:
+                    self.stats["bytes_parsed"] += len(frame)
+        finally:
+            self._pending.fail_all(RPCException("disconnected from discord"))
+        callback(SOCKET_DISCONNECTED, None)
+
+    async def disconnect(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except OSError as ex:
+                log.debug(f"Socket close error: {ex}")
+            self._writer = None
+        self._pending.fail_all(RPCException("disconnected from discord"))
+
+    async def _send_rpc_command(
+        self,
+        command: str,
+        args: dict = None,
+        evt: str = None,
+        timeout: float = RPC_REQUEST_TIMEOUT,
+    ):
+        if self._writer is None:
+            raise RPCException("not connected to discord")
+        nonce = str(uuid.uuid4())
+        payload = {"cmd": command, "nonce": nonce}
+        if evt is not None:
+            payload["evt"] = evt
+            payload["args"] = args
+        elif args is not None:
+            payload["args"] = args
+        future = asyncio.wrap_future(self._pending.add(nonce, command))
+        await self._write(payload, OP_FRAME)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self._pending.fail(nonce, RPCTimeout(command))
+            raise RPCTimeout(command)
+
+    async def authorize(self):
+        payload = {"client_id": self.client_id, "scopes": ["rpc", "identify"]}
+        return await self._send_rpc_command(AUTHORIZE, payload, timeout=None)
+
+    async def authenticate(self, access_token: str = None):
+        if not access_token:
+            return await self.authorize()
+        self.access_token = access_token
+        payload = {"access_token": self.access_token}
+        return await self._send_rpc_command(AUTHENTICATE, payload)
+
+    async def subscribe(self, event: str, args: dict = None):
+        return await self._send_rpc_command(SUBSCRIBE, args, evt=event)
+
+    async def unsubscribe(self, event: str, args: dict = None):
+        return await self._send_rpc_command(UNSUBSCRIBE, args, evt=event)
+
+    async def set_voice_settings(self, settings):
+        return await self._send_rpc_command(SET_VOICE_SETTINGS, settings)
+
+    async def get_voice_settings(self):
+        return await self._send_rpc_command(GET_VOICE_SETTINGS)
+
+    async def select_voice_channel(self, channel_id: str, force: bool = False):
+        args = {"channel_id": channel_id, "force": force}
+        return await self._send_rpc_command(SELECT_VOICE_CHANNEL, args)
+
+    async def select_text_channel(self, channel_id: str):
+        args = {"channel_id": channel_id}
+        return await self._send_rpc_command(SELECT_TEXT_CHANNEL, args)
+
+    async def get_selected_voice_channel(self):
+        return await self._send_rpc_command(GET_SELECTED_VOICE_CHANNEL)
+
+    async def set_user_voice_settings(
+        self, user_id: str, volume: int = None, mute: bool = None
+    ):
+        args = {"user_id": user_id}
+        if volume is not None:
+            args["volume"] = max(0, min(200, volume))
+        if mute is not None:
+            args["mute"] = mute
+        return await self._send_rpc_command(SET_USER_VOICE_SETTINGS, args)
+
+    async def get_channel(self, channel_id: str):
+        return await self._send_rpc_command(GET_CHANNEL, {"channel_id": channel_id})
+
+
+class AioDiscordClient:
+    """Runs an ``AioDiscord`` on its own event loop thread.
+
+    Exposes the same synchronous interface as ``AsyncDiscord`` so the
+    backend can use either transport. Socket reads, writes and the event
+    callback all run on the one loop thread; callers on other threads only
+    schedule coroutines and get a ``concurrent.futures.Future`` back.
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        access_token: str = "",
+        metrics: CommandMetrics = None,
+    ):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self._client = AioDiscord(client_id, client_secret, access_token, metrics)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="discord-aio", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_forever()
+        finally:
+            # Let cancelled tasks finish before the loop and its fds go away
+            tasks = asyncio.all_tasks(self._loop)
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.close()
+
+    def _submit(self, coro) -> Future:
+        if self._loop.is_closed() or not self._thread.is_alive():
+            coro.close()
+            future = Future()
+            future.set_exception(RPCException("not connected to discord"))
+            return future
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def is_connected(self) -> bool:
+        return self._client.is_connected()
+
+    @property
+    def frame_filter(self) -> callable:
+        return self._client.frame_filter
+
+    @frame_filter.setter
+    def frame_filter(self, value: callable):
+        self._client.frame_filter = value
+
+    @property
+    def stats(self) -> Counter:
+        return self._client.stats
+
+    @property
+    def metrics(self) -> CommandMetrics:
+        return self._client.metrics
+
+    def connect(self, callback: callable):
+        self._submit(self._client.connect(callback)).result()
+
+    def disconnect(self):
+        """Disconnect, then stop the loop thread; the loop is closed as it exits."""
+        if not self._thread.is_alive():
+            return
+        future = self._submit(self._client.disconnect())
+        future.add_done_callback(
+            lambda _: self._loop.call_soon_threadsafe(self._loop.stop)
+        )
+        if threading.current_thread() is not self._thread:
+            self._thread.join()
+
+    def authorize(self) -> Future:
+        return self._submit(self._client.authorize())
+
+    def authenticate(self, access_token: str = None) -> Future:
+        return self._submit(self._client.authenticate(access_token))
+
+    def subscribe(self, event: str, args: dict = None) -> Future:
+        return self._submit(self._client.subscribe(event, args))
+
+    def unsubscribe(self, event: str, args: dict = None) -> Future:
+        return self._submit(self._client.unsubscribe(event, args))
+
+    def set_voice_settings(self, settings) -> Future:
+        return self._submit(self._client.set_voice_settings(settings))
+
+    def get_voice_settings(self) -> Future:
+        return self._submit(self._client.get_voice_settings())
+
+    def select_voice_channel(self, channel_id: str, force: bool = False) -> Future:
+        return self._submit(self._client.select_voice_channel(channel_id, force))
+
+    def select_text_channel(self, channel_id: str) -> Future:
+        return self._submit(self._client.select_text_channel(channel_id))
+
+    def get_selected_voice_channel(self) -> Future:
+        return self._submit(self._client.get_selected_voice_channel())
+
+    def set_user_voice_settings(
+        self, user_id: str, volume: int = None, mute: bool = None
+    ) -> Future:
+        return self._submit(
+            self._client.set_user_voice_settings(user_id, volume, mute)
+        )
+
+    def get_channel(self, channel_id: str) -> Future:
+        return self._submit(self._client.get_channel(channel_id))
@@ -1,15 +1,24 @@
+import os
 import uuid
-import json
+import selectors
 import threading
+from collections import Counter, deque
+from concurrent.futures import Future
 
-import requests
 from loguru import logger as log
 
-from .sockets import UnixPipe, SOCKET_BAD_BUFFER_SIZE, SOCKET_DISCONNECTED
-from socket import timeout
+from .sockets import (
+    UnixPipe,
+    encode_frame,
+    SOCKET_DISCONNECTED,
+)
+from . import codec
 from .commands import *
 from .exceptions import *
-from .constants import MAX_SOCKET_RETRY_ATTEMPTS
+from .constants import RPC_REQUEST_TIMEOUT
+from .pending import PendingRequests
+from .metrics import CommandMetrics
+from .frame import Frame
 
 
 OP_HANDSHAKE = 0
@@ -20,36 +29,94 @@ OP_PONG = 4
 
 
 class AsyncDiscord:
-    def __init__(self, client_id: str, client_secret: str, access_token: str = ""):
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        access_token: str = "",
+        metrics: CommandMetrics = None,
+    ):
         self.rpc = UnixPipe()
         self.client_id = client_id
         self.client_secret = client_secret
         self.access_token = access_token
         self.polling = False
-        self._session = requests.Session()  # Reuse HTTP connections
+        self.metrics = metrics if metrics is not None else CommandMetrics()
+        self._pending = PendingRequests(self.metrics)
+        # Optional predicate; frames it rejects are dropped before parsing
+        self.frame_filter: callable = None
+        self.stats: Counter = Counter()
+        self._poll_thread: threading.Thread = None
+        # Encoded frames waiting for the poll thread, which is the only writer
+        self._outbox: deque[bytes] = deque()
+        # Self-pipe used to wake the poll thread's selector from other threads
+        self._wake_r: int = -1
+        self._wake_w: int = -1
 
-    def _send_rpc_command(self, command: str, args: dict = None):
-        payload = {"cmd": command, "nonce": str(uuid.uuid4())}
-        if args is not None:
+    def _send_rpc_command(
+        self,
+        command: str,
+        args: dict = None,
+        evt: str = None,
+        timeout: float = RPC_REQUEST_TIMEOUT,
+    ) -> Future:
+        """Queue a command and return a future for its reply.
+
+        The frame is written by the poll thread together with anything else
+        queued at the time. The future resolves with the reply's ``data``,
+        or fails with ``RPCError``/``RPCTimeout``. Replies are still passed
+        to the connection callback as well.
+        """
+        if not self.polling:
+            raise RPCException("not connected to discord")
+        nonce = str(uuid.uuid4())
+        payload = {"cmd": command, "nonce": nonce}
+        if evt is not None:
+            # (un)subscribe frames always carry args, even when it is null
+            payload["evt"] = evt
+            payload["args"] = args
+        elif args is not None:
             payload["args"] = args
-        self.rpc.send(payload, OP_FRAME)
+        frame = encode_frame(payload, OP_FRAME)
+        future = self._pending.add(nonce, command, timeout)
+        self.stats["frames_out"] += 1
+        self.stats["bytes_out"] += len(frame)
+        self._outbox.append(frame)
+        self._wake()
+        return future
+
+    def _wake(self):
+        try:
+            os.write(self._wake_w, b"\0")
+        except (BlockingIOError, OSError):
+            # Pipe already full (a wakeup is pending) or closed
+            pass
 
     def is_connected(self):
         return self.polling
 
     def connect(self, callback: callable):
-        tries = 0
-        while tries < MAX_SOCKET_RETRY_ATTEMPTS:
-            try:
-                log.debug(
-                    f"Attempting to connect to socket, attempt {tries + 1}/{MAX_SOCKET_RETRY_ATTEMPTS}"
-                )
-                self.rpc.connect()
-                break
-            except Exception as ex:
-                log.error(f"failed to connect to socket. {ex}")
-                tries += 1
+        """Connect and handshake, raising ``DiscordNotOpened`` if no socket answers.
 
+        Makes a single pass over the candidate sockets; retrying with a
+        backoff is up to the caller (see ``ConnectionSupervisor``).
+        """
+        self.rpc.connect()
+        try:
+            self._handshake()
+        except Exception:
+            self.rpc.disconnect()
+            raise
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self.polling = True
+        self._poll_thread = threading.Thread(
+            target=self.poll_callback, args=[callback], name="discord-poll"
+        )
+        self._poll_thread.start()
+
+    def _handshake(self):
         self.rpc.send({"v": "1", "client_id": self.client_id}, OP_HANDSHAKE)
         code, resp = self.rpc.receive()
 
@@ -57,12 +124,8 @@ class AsyncDiscord:
             log.error("no response from discord client")
             raise RPCException
 
-        if code == SOCKET_BAD_BUFFER_SIZE:
-            log.error("bad buffer size when receiving data from socket")
-            raise RPCException
-
         try:
-            data = json.loads(resp)
+            data = codec.loads(resp)
         except Exception as ex:
             log.error(f"invalid response. {ex}")
             raise RPCException
@@ -70,109 +133,154 @@ class AsyncDiscord:
             raise InvalidID
         if data.get("cmd") != "DISPATCH" or data.get("evt") != "READY":
             raise RPCException
-        self.polling = True
-        threading.Thread(target=self.poll_callback, args=[callback]).start()
 
     def disconnect(self):
+        """Stop polling and close the connection.
+
+        Returns immediately; the poll thread notices the wakeup, closes the
+        socket and exits on its own.
+        """
         self.polling = False
+        if self._poll_thread is None or not self._poll_thread.is_alive():
+            self._close()
+            return
+        self._wake()
+
+    def _close(self):
+        self._outbox.clear()
         self.rpc.disconnect()
-        if self._session:
-            self._session.close()
+        self._pending.fail_all(RPCException("disconnected from discord"))
+        wake_fds = (self._wake_r, self._wake_w)
+        self._wake_r = self._wake_w = -1
+        for fd in wake_fds:
+            if fd < 0:
+                continue
+            try:
+                os.close(fd)
+            except OSError:
+                pass
 
     def poll_callback(self, callback: callable):
-        while self.polling:
+        # Never block on the socket here: a blocked write would stop us from
+        # reading the replies Discord is trying to send back.
+        self.rpc.socket.setblocking(False)
+        selector = selectors.DefaultSelector()
+        selector.register(self.rpc.fileno(), selectors.EVENT_READ, "socket")
+        selector.register(self._wake_r, selectors.EVENT_READ, "wake")
+        unsent = b""
+        watching_writes = False
+        try:
+            # Frames that arrived together with the handshake reply
+            self._handle_frames(self.rpc.buffered_frames(), callback)
+            while self.polling:
+                # Sleep until data arrives, we're woken, or a request expires
+                for key, mask in selector.select(self._pending.expire()):
+                    if key.data == "wake":
+                        self._drain_wake()
+                        unsent = self._flush_outbox(unsent)
+                        continue
+                    if mask & selectors.EVENT_WRITE:
+                        unsent = self._flush_outbox(unsent)
+                    if mask & selectors.EVENT_READ and not self._handle_frames(
+                        self.rpc.read_frames(), callback
+                    ):
+                        self.polling = False
+                        callback(SOCKET_DISCONNECTED, None)
+                        break
+                # Only watch for writability while the socket is backed up
+                if bool(unsent) != watching_writes:
+                    watching_writes = bool(unsent)
+                    events = selectors.EVENT_READ
+                    if watching_writes:
+                        events |= selectors.EVENT_WRITE
+                    selector.modify(self.rpc.fileno(), events, "socket")
+        except Exception as ex:
+            log.error(f"error on discord socket. {ex}")
+            self.polling = False
+            # The socket is unusable now, so the backend must reconnect
+            callback(SOCKET_DISCONNECTED, None)
+        finally:
+            selector.close()
+            self._close()
+
+    def _flush_outbox(self, unsent: bytes) -> bytes:
+        """Write leftover bytes plus every queued frame; returns what is still unsent."""
+        frames = [unsent] if unsent else []
+        while self._outbox:
+            frames.append(self._outbox.popleft())
+        if not frames:
+            return b""
+        return self.rpc.send_frames(frames)
+
+    def _drain_wake(self):
+        try:
+            while os.read(self._wake_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _handle_frames(self, frames: list, callback: callable) -> bool:
+        """Dispatch received frames; returns False once the socket is closed."""
+        for code, resp in frames:
+            if code == SOCKET_DISCONNECTED:
+                return False
+            frame = Frame(code, resp)
+            self.stats["frames_in"] += 1
+            self.stats["bytes_in"] += len(frame)
             try:
-                val = self.rpc.receive()
-            except timeout:
-                continue
-            except Exception as ex:
-                log.error(f"error receiving data from socket. {ex}")
-                self.disconnect()
-            if val[0] == SOCKET_BAD_BUFFER_SIZE:
-                log.debug("bad buffer size when receiving data from socket")
-            if val[0] == SOCKET_DISCONNECTED:
-                self.disconnect()
-            callback(val[0], val[1])
-
-    def authorize(self):
+                if self.frame_filter is not None and not self.frame_filter(frame):
+                    self.stats["frames_dropped"] += 1
+                    self.stats["bytes_dropped"] += len(frame)
+                    continue
+                nonce = frame.nonce
+                if nonce:
+                    self._pending.resolve(nonce, frame)
+                callback(code, frame)
+            except codec.DecodeError as ex:
+                self.stats["decode_errors"] += 1
+                log.error(f"failed to parse discord event: {ex}")
+            if frame.parsed:
+                self.stats["bytes_parsed"] += len(frame)
+        return True
+
+    def authorize(self) -> Future:
         payload = {"client_id": self.client_id, "scopes": ["rpc", "identify"]}
-        self._send_rpc_command(AUTHORIZE, payload)
+        # The user has to approve the request in Discord, so don't time out
+        return self._send_rpc_command(AUTHORIZE, payload, timeout=None)
 
-    def authenticate(self, access_token: str = None):
+    def authenticate(self, access_token: str = None) -> Future:
         if not access_token:
-            self.authorize()
-            return
+            return self.authorize()
         self.access_token = access_token
         payload = {"access_token": self.access_token}
-        self._send_rpc_command(AUTHENTICATE, payload)
-
-    def refresh(self, code: str):
-        token = self._session.post(
-            "https://discord.com/api/oauth2/token",
-            {
-                "grant_type": "refresh_token",
-                "refresh_token": code,
-                "client_id": self.client_id,
-                "client_secret": self.client_secret,
-            },
-            timeout=5,
-        )
-        resp = token.json()
-        if not "access_token" in resp:
-            raise Exception("refresh failed")
-        return resp
-
-    def get_access_token(self, code: str):
-        token = self._session.post(
-            "https://discord.com/api/oauth2/token",
-            {
-                "grant_type": "authorization_code",
-                "code": code,
-                "client_id": self.client_id,
-                "client_secret": self.client_secret,
-            },
-            timeout=5,
-        )
-        resp = token.json()
-        if not "access_token" in resp:
-            raise Exception("invalid oauth request")
-        return resp
-
-    def subscribe(self, event: str, args: dict = None):
-        self.rpc.send(
-            {"cmd": SUBSCRIBE, "evt": event, "nonce": str(uuid.uuid4()), "args": args},
-            OP_FRAME,
-        )
+        return self._send_rpc_command(AUTHENTICATE, payload)
 
-    def unsubscribe(self, event: str, args: dict = None):
-        self.rpc.send(
-            {
-                "cmd": UNSUBSCRIBE,
-                "evt": event,
-                "nonce": str(uuid.uuid4()),
-                "args": args,
-            },
-            OP_FRAME,
-        )
+    def subscribe(self, event: str, args: dict = None) -> Future:
+        return self._send_rpc_command(SUBSCRIBE, args, evt=event)
+
+    def unsubscribe(self, event: str, args: dict = None) -> Future:
+        return self._send_rpc_command(UNSUBSCRIBE, args, evt=event)
 
-    def set_voice_settings(self, settings):
-        self._send_rpc_command(SET_VOICE_SETTINGS, settings)
+    def set_voice_settings(self, settings) -> Future:
+        return self._send_rpc_command(SET_VOICE_SETTINGS, settings)
 
-    def get_voice_settings(self):
-        self._send_rpc_command(GET_VOICE_SETTINGS)
+    def get_voice_settings(self) -> Future:
+        return self._send_rpc_command(GET_VOICE_SETTINGS)
 
-    def select_voice_channel(self, channel_id: str, force: bool = False):
+    def select_voice_channel(self, channel_id: str, force: bool = False) -> Future:
         args = {"channel_id": channel_id, "force": force}
-        self._send_rpc_command(SELECT_VOICE_CHANNEL, args)
+        return self._send_rpc_command(SELECT_VOICE_CHANNEL, args)
 
-    def select_text_channel(self, channel_id: str):
+    def select_text_channel(self, channel_id: str) -> Future:
         args = {"channel_id": channel_id}
-        self._send_rpc_command(SELECT_TEXT_CHANNEL, args)
+        return self._send_rpc_command(SELECT_TEXT_CHANNEL, args)
 
-    def get_selected_voice_channel(self) -> str:
-        self._send_rpc_command(GET_SELECTED_VOICE_CHANNEL)
+    def get_selected_voice_channel(self) -> Future:
+        return self._send_rpc_command(GET_SELECTED_VOICE_CHANNEL)
 
-    def set_user_voice_settings(self, user_id: str, volume: int = None, mute: bool = None):
+    def set_user_voice_settings(
+        self, user_id: str, volume: int = None, mute: bool = None
+    ) -> Future:
         """Set voice settings for a specific user in the current voice channel.
 
         Args:
@@ -185,8 +293,8 @@ class AsyncDiscord:
             args["volume"] = max(0, min(200, volume))
         if mute is not None:
             args["mute"] = mute
-        self._send_rpc_command(SET_USER_VOICE_SETTINGS, args)
+        return self._send_rpc_command(SET_USER_VOICE_SETTINGS, args)
 
-    def get_channel(self, channel_id: str):
+    def get_channel(self, channel_id: str) -> Future:
         """Get channel information including voice states for voice channels."""
-        self._send_rpc_command(GET_CHANNEL, {"channel_id": channel_id})
+        return self._send_rpc_command(GET_CHANNEL, {"channel_id": channel_id})
@@ -0,0 +1,31 @@
+"""JSON codec for the Discord IPC wire.
+
+Uses orjson or msgspec when one of them is importable and falls back to
+the standard library otherwise. ``dumps`` always returns bytes and
+``loads`` accepts bytes directly, so frames never round-trip through str.
+"""
+
+try:
+    import orjson
+
+    BACKEND = "orjson"
+    DecodeError = orjson.JSONDecodeError
+    dumps = orjson.dumps
+    loads = orjson.loads
+except ImportError:
+    try:
+        import msgspec
+
+        BACKEND = "msgspec"
+        DecodeError = msgspec.DecodeError
+        dumps = msgspec.json.Encoder().encode
+        loads = msgspec.json.Decoder().decode
+    except ImportError:
+        import json
+
+        BACKEND = "json"
+        DecodeError = json.JSONDecodeError
+        loads = json.loads
+
+        def dumps(obj) -> bytes:
+            return json.dumps(obj, separators=(",", ":")).encode("UTF-8")
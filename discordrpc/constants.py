@@ -1,10 +1,19 @@
 """Constants for Discord RPC communication."""
 
 # Socket connection constants
-MAX_SOCKET_RETRY_ATTEMPTS = 5  # Maximum number of socket connection retry attempts
+RECONNECT_INITIAL_DELAY = 1  # Seconds before the first reconnect retry
+RECONNECT_MAX_DELAY = 60  # Cap for the exponential reconnect backoff
 MAX_IPC_SOCKET_RANGE = (
     10  # Number of IPC sockets to try (discord-ipc-0 through discord-ipc-9)
 )
-SOCKET_SELECT_TIMEOUT = 0.1  # Socket select timeout in seconds (reduced from 1.0s for 90% latency improvement)
-#SOCKET_BUFFER_SIZE = 1024  # Socket receive buffer size in bytes
-SOCKET_BUFFER_SIZE = 8
+SOCKET_BUFFER_SIZE = 65536  # Socket receive buffer size in bytes (frames may span several reads)
+# Largest frame accepted; a GET_CHANNEL reply for a full stage is a few hundred KB,
+# so anything near this is a corrupt header rather than a real payload
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+RPC_REQUEST_TIMEOUT = 5  # Seconds to wait for a command reply before failing its future
+TOKEN_REFRESH_MARGIN = 300  # Seconds before expiry to refresh the OAuth access token
+# Minimum seconds between SET_USER_VOICE_SETTINGS commands for one user while a
+# dial spins. Ticks arrive every few ms; 100 ms caps it at 10 commands a second,
+# well under Discord's RPC rate limit, and the last value lands before the lag is
+# noticeable.
+VOLUME_SEND_INTERVAL = 0.1
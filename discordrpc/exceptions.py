@@ -13,3 +13,14 @@ class DiscordNotOpened(RPCException):
 class InvalidID(RPCException):
     def __init__(self):
         super().__init__("Invalid ID, is the ID correct? Get Application ID on https://discord.com/developers/applications")
+
+
+class RPCTimeout(RPCException):
+    def __init__(self, command: str):
+        super().__init__(f"Timed out waiting for a reply to {command}")
+
+
+class RPCError(RPCException):
+    def __init__(self, code: int, message: str):
+        self.code = code
+        super().__init__(f"Discord returned error {code}: {message}")
@@ -0,0 +1,82 @@
+import re
+
+from . import codec
+
+# Top-level envelope fields are plain strings or null, so they can be found
+# without parsing the (possibly very large) data object. Any other value leaves
+# both groups empty.
+ENVELOPE_FIELD = re.compile(rb'"(cmd|evt|nonce)":\s*(?:"([^"\\]*)"|(null))?')
+ENVELOPE_NAMES = ("cmd", "evt", "nonce")
+
+
+class Frame:
+    """A received IPC frame, parsed lazily and at most once.
+
+    ``cmd``, ``evt`` and ``nonce`` come from a cheap scan of the raw bytes,
+    which is enough to route or drop most frames. The full JSON body is only
+    decoded the first time ``payload`` or ``data`` is read.
+    """
+
+    __slots__ = ("op", "raw", "_envelope", "_payload")
+
+    def __init__(self, op: int, raw: bytes):
+        self.op = op
+        self.raw = raw
+        self._envelope: dict = None
+        self._payload: dict = None
+
+    def __len__(self):
+        return len(self.raw)
+
+    @property
+    def parsed(self) -> bool:
+        return self._payload is not None
+
+    @property
+    def payload(self) -> dict:
+        if self._payload is None:
+            self._payload = codec.loads(self.raw) if self.raw else {}
+        return self._payload
+
+    @property
+    def data(self):
+        return self.payload.get("data")
+
+    @property
+    def envelope(self) -> dict:
+        if self._envelope is None:
+            if self._payload is not None:
+                self._envelope = self._from_payload()
+            else:
+                self._envelope = self._scan()
+        return self._envelope
+
+    def _scan(self) -> dict:
+        envelope = {}
+        for name, value, null in ENVELOPE_FIELD.findall(self.raw):
+            name = name.decode()
+            if name in envelope or not (value or null):
+                # Seen twice, so one of them is nested inside data, or not a
+                # plain string; only a full parse can tell which is top-level
+                return self._from_payload()
+            envelope[name] = None if null else value.decode()
+        if len(envelope) < len(ENVELOPE_NAMES):
+            # Discord always sends all three; one found alone may be nested
+            return self._from_payload()
+        return envelope
+
+    def _from_payload(self) -> dict:
+        payload = self.payload
+        return {name: payload.get(name) for name in ENVELOPE_NAMES}
+
+    @property
+    def cmd(self) -> str:
+        return self.envelope.get("cmd")
+
+    @property
+    def evt(self) -> str:
+        return self.envelope.get("evt")
+
+    @property
+    def nonce(self) -> str:
+        return self.envelope.get("nonce")
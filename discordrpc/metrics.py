@@ -0,0 +1,55 @@
+import threading
+from bisect import bisect_left
+
+# Upper bounds in seconds; replies slower than the last bound land in +Inf
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class CommandMetrics:
+    """Round-trip latency histograms per RPC command.
+
+    Each observation is a bisect and a few integer increments, cheap enough
+    to leave on all the time. Error replies are timed like any other reply
+    and also counted separately; timeouts are only counted, since they have
+    no reply to time.
+    """
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._commands: dict[str, dict] = {}
+
+    def _entry(self, command: str) -> dict:
+        entry = self._commands.get(command)
+        if entry is None:
+            entry = {
+                "counts": [0] * (len(self.buckets) + 1),
+                "count": 0,
+                "sum": 0.0,
+                "errors": 0,
+                "timeouts": 0,
+            }
+            self._commands[command] = entry
+        return entry
+
+    def observe(self, command: str, seconds: float, error: bool = False):
+        with self._lock:
+            entry = self._entry(command)
+            entry["counts"][bisect_left(self.buckets, seconds)] += 1
+            entry["count"] += 1
+            entry["sum"] += seconds
+            if error:
+                entry["errors"] += 1
+
+    def timeout(self, command: str):
+        with self._lock:
+            self._entry(command)["timeouts"] += 1
+
+    def snapshot(self) -> dict:
+        """Copy of every histogram; ``counts`` are per bucket, not cumulative."""
+        with self._lock:
+            commands = {
+                command: {**entry, "counts": list(entry["counts"])}
+                for command, entry in self._commands.items()
+            }
+        return {"buckets": list(self.buckets), "commands": commands}
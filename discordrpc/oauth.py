@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+from loguru import logger as log
+
+from .constants import TOKEN_REFRESH_MARGIN
+
+TOKEN_URL = "https://discord.com/api/oauth2/token"
+
+
+def exchange_token(
+    session: requests.Session,
+    client_id: str,
+    client_secret: str,
+    grant_type: str,
+    code: str,
+    token_url: str = TOKEN_URL,
+) -> dict:
+    """Exchange an authorization code or refresh token for an access token.
+
+    Raises if Discord's response does not contain an access token.
+    """
+    field = "refresh_token" if grant_type == "refresh_token" else "code"
+    token = session.post(
+        token_url,
+        {
+            "grant_type": grant_type,
+            field: code,
+            "client_id": client_id,
+            "client_secret": client_secret,
+        },
+        timeout=5,
+    )
+    resp = token.json()
+    if not "access_token" in resp:
+        raise Exception(f"{grant_type} exchange failed: {resp.get('error', 'no token')}")
+    return resp
+
+
+class TokenManager:
+    """Owns the OAuth tokens and keeps the access token fresh.
+
+    Token exchanges run on a dedicated worker thread and return futures, so
+    the HTTP round trip never blocks the caller. Once the expiry is known a
+    refresh is scheduled ``margin`` seconds before it. ``on_tokens`` is
+    called with ``(access_token, refresh_token, expires_at)`` whenever the
+    tokens change; ``expires_at`` is a ``time.time()`` timestamp, or 0 if
+    unknown.
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        on_tokens: callable,
+        token_url: str = TOKEN_URL,
+        margin: float = TOKEN_REFRESH_MARGIN,
+    ):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.token_url = token_url
+        self.margin = margin
+        self._on_tokens = on_tokens
+        self._session = requests.Session()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="discord-token")
+        self._lock = threading.Lock()
+        self._refreshing: Future = None
+        self._timer: threading.Timer = None
+        self.access_token: str = ""
+        self.refresh_token: str = ""
+        self.expires_at: float = 0
+        self.stats: Counter = Counter()
+
+    def set_tokens(self, access_token: str, refresh_token: str, expires_at: float = 0):
+        """Adopt tokens loaded from settings, without notifying ``on_tokens``."""
+        self.access_token = access_token or ""
+        self.refresh_token = refresh_token or ""
+        self.expires_at = expires_at or 0
+        self._schedule()
+
+    def set_expiry(self, expires_at: float):
+        """Record an expiry learnt elsewhere (e.g. from AUTHENTICATE)."""
+        if not expires_at or abs(expires_at - self.expires_at) < 1:
+            return
+        self.expires_at = expires_at
+        self._on_tokens(self.access_token, self.refresh_token, self.expires_at)
+        self._schedule()
+
+    def exchange_code(self, code: str) -> Future:
+        """Trade an AUTHORIZE code for tokens."""
+        return self._executor.submit(self._exchange, "authorization_code", code)
+
+    def refresh(self) -> Future:
+        """Refresh the access token; concurrent callers share one request."""
+        with self._lock:
+            if self._refreshing is not None and not self._refreshing.done():
+                return self._refreshing
+            if not self.refresh_token:
+                future = Future()
+                future.set_exception(Exception("no refresh token"))
+                return future
+            self._refreshing = self._executor.submit(
+                self._exchange, "refresh_token", self.refresh_token
+            )
+            return self._refreshing
+
+    def _exchange(self, grant_type: str, code: str) -> str:
+        kind = "token_refreshes" if grant_type == "refresh_token" else "token_exchanges"
+        try:
+            resp = exchange_token(
+                self._session,
+                self.client_id,
+                self.client_secret,
+                grant_type,
+                code,
+                self.token_url,
+            )
+        except Exception:
+            self.stats[f"{kind}_failed"] += 1
+            raise
+        self.stats[kind] += 1
+        self.access_token = resp["access_token"]
+        self.refresh_token = resp.get("refresh_token", self.refresh_token)
+        expires_in = resp.get("expires_in")
+        self.expires_at = time.time() + expires_in if expires_in else 0
+        self._on_tokens(self.access_token, self.refresh_token, self.expires_at)
+        self._schedule()
+        return self.access_token
+
+    def _schedule(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self.expires_at or not self.refresh_token:
+                return
+            delay = max(0, self.expires_at - self.margin - time.time())
+            self._timer = threading.Timer(delay, self._refresh_due)
+            self._timer.daemon = True
+            self._timer.start()
+        log.debug(f"Access token refresh scheduled in {delay:.0f}s")
+
+    def _refresh_due(self):
+        self.refresh().add_done_callback(self._log_refresh)
+
+    def _log_refresh(self, future: Future):
+        if future.exception() is not None:
+            log.error(f"Scheduled token refresh failed: {future.exception()}")
+
+    def close(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._session.close()
@@ -0,0 +1,97 @@
+import threading
+import time
+from concurrent.futures import Future
+
+from . import codec
+from .exceptions import RPCException, RPCError, RPCTimeout
+from .frame import Frame
+from .metrics import CommandMetrics
+
+
+class PendingRequests:
+    """In-flight RPC commands keyed by nonce.
+
+    Each command gets a future that resolves with the ``data`` of the reply
+    carrying the same nonce, fails with ``RPCError`` for an ERROR reply, or
+    fails with ``RPCTimeout`` once its deadline passes without a reply.
+    Round trips are recorded in ``metrics`` when one is given.
+    """
+
+    def __init__(self, metrics: CommandMetrics = None):
+        self._lock = threading.Lock()
+        # nonce -> (future, command, deadline, time sent)
+        self._requests: dict[str, tuple[Future, str, float, float]] = {}
+        self.metrics = metrics
+
+    def __len__(self):
+        return len(self._requests)
+
+    def add(self, nonce: str, command: str, timeout: float = None) -> Future:
+        future = Future()
+        # Replies are matched by nonce and cannot be withdrawn once sent
+        future.set_running_or_notify_cancel()
+        now = time.monotonic()
+        deadline = now + timeout if timeout is not None else None
+        with self._lock:
+            self._requests[nonce] = (future, command, deadline, now)
+        return future
+
+    def resolve(self, nonce: str, frame: Frame) -> bool:
+        with self._lock:
+            entry = self._requests.pop(nonce, None)
+        if entry is None:
+            return False
+        future, command, _, sent = entry
+        is_error = frame.evt == "ERROR"
+        if self.metrics is not None:
+            self.metrics.observe(command, time.monotonic() - sent, is_error)
+        try:
+            data = frame.data
+        except codec.DecodeError as ex:
+            future.set_exception(RPCException(f"invalid reply: {ex}"))
+            return True
+        if is_error:
+            data = data or {}
+            future.set_exception(RPCError(data.get("code"), data.get("message")))
+        else:
+            future.set_result(data)
+        return True
+
+    def fail(self, nonce: str, exc: Exception):
+        with self._lock:
+            entry = self._requests.pop(nonce, None)
+        if entry is None:
+            return
+        if self.metrics is not None and isinstance(exc, RPCTimeout):
+            self.metrics.timeout(entry[1])
+        entry[0].set_exception(exc)
+
+    def expire(self) -> float:
+        """Fail overdue requests and return seconds until the next deadline.
+
+        Returns None when no pending request has a deadline.
+        """
+        now = time.monotonic()
+        expired = []
+        next_deadline = None
+        with self._lock:
+            for nonce, (future, command, deadline, _) in list(self._requests.items()):
+                if deadline is None:
+                    continue
+                if deadline <= now:
+                    del self._requests[nonce]
+                    expired.append((future, command))
+                elif next_deadline is None or deadline < next_deadline:
+                    next_deadline = deadline
+        for future, command in expired:
+            if self.metrics is not None:
+                self.metrics.timeout(command)
+            future.set_exception(RPCTimeout(command))
+        return None if next_deadline is None else next_deadline - now
+
+    def fail_all(self, exc: Exception):
+        with self._lock:
+            requests = list(self._requests.values())
+            self._requests.clear()
+        for future, *_ in requests:
+            future.set_exception(exc)
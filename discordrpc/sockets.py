@@ -1,48 +1,145 @@
 import socket
 import os
 import struct
-import json
 import re
 import select
+from collections import deque
 
 from loguru import logger as log
 
+from . import codec
 from .exceptions import DiscordNotOpened
-from .constants import MAX_IPC_SOCKET_RANGE, SOCKET_SELECT_TIMEOUT, SOCKET_BUFFER_SIZE
+from .constants import MAX_FRAME_SIZE, MAX_IPC_SOCKET_RANGE, SOCKET_BUFFER_SIZE
 
 SOCKET_DISCONNECTED: int = -1
-SOCKET_BAD_BUFFER_SIZE: int = -2
 SOCKET_SEND_TIMEOUT: int = 5
 SOCKET_CONNECT_TIMEOUT: int = 2
 SOCKET_RECEIVE_TIMEOUT: int = 10
 
+SOCKET_MAX_IOV: int = 512  # Frames per sendmsg() call, well under IOV_MAX
+
+FRAME_HEADER = struct.Struct("<ii")
+
+
+def encode_frame(payload, op: int) -> bytes:
+    payload_bytes = codec.dumps(payload)
+    return FRAME_HEADER.pack(op, len(payload_bytes)) + payload_bytes
+
+
+# Socket path of the last successful connection, tried first next time
+_last_ipc_path: str = None
+
+
+def ipc_runtime_dir() -> str:
+    """Directory Discord creates its IPC sockets in."""
+    path = (
+        os.environ.get("XDG_RUNTIME_DIR")
+        or os.environ.get("TMPDIR")
+        or os.environ.get("TMP")
+        or os.environ.get("TEMP")
+        or "/tmp"
+    )
+    return re.sub(r"\/$", "", path)
+
+
+def ipc_paths() -> list[str]:
+    """Candidate Discord IPC socket paths, in the order they should be tried."""
+    base_path = ipc_runtime_dir() + "/discord-ipc-{0}"
+    paths = [base_path.format(i) for i in range(MAX_IPC_SOCKET_RANGE)]
+    if _last_ipc_path in paths:
+        paths.remove(_last_ipc_path)
+        paths.insert(0, _last_ipc_path)
+    return paths
+
+
+def remember_ipc_path(path: str):
+    global _last_ipc_path
+    _last_ipc_path = path
+
+
+def check_frame_length(length: int):
+    """Raise ``FrameError`` unless ``length`` is a plausible frame body size."""
+    if not 0 <= length <= MAX_FRAME_SIZE:
+        raise FrameError(f"invalid frame length {length}")
+
+
+class FrameError(ValueError):
+    """A frame header that can't be right; the stream is out of sync.
+
+    ``frames`` holds the frames completed before the bad header.
+    """
+
+    def __init__(self, message: str, frames: list = None):
+        super().__init__(message)
+        self.frames = frames or []
+
+
+class FrameDecoder:
+    """Incremental decoder for Discord IPC frames.
+
+    Bytes are fed in as they arrive from the socket, in chunks of any size.
+    Every complete frame is returned as an ``(op, payload)`` tuple and any
+    trailing partial frame is kept until the rest of it arrives. A header
+    with a negative or oversized length raises ``FrameError``; there is no
+    way to find the next frame after it, so the decoder is reset.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> list[tuple[int, bytes]]:
+        buffer = self._buffer
+        buffer += data
+        frames = []
+        offset = 0
+        available = len(buffer)
+        while available - offset >= FRAME_HEADER.size:
+            op, length = FRAME_HEADER.unpack_from(buffer, offset)
+            try:
+                check_frame_length(length)
+            except FrameError as ex:
+                self.reset()
+                ex.frames = frames
+                raise
+            start = offset + FRAME_HEADER.size
+            end = start + length
+            if end > available:
+                break
+            frames.append((op, bytes(buffer[start:end])))
+            offset = end
+        if offset:
+            del buffer[:offset]
+        return frames
+
+    def reset(self):
+        self._buffer.clear()
+
+    def pending(self) -> int:
+        """Number of buffered bytes belonging to an incomplete frame."""
+        return len(self._buffer)
+
+
 class UnixPipe:
     def __init__(self):
         self.socket: socket.socket = None
+        self._decoder = FrameDecoder()
+        self._frames: deque = deque()
 
     def connect(self):
         if self.socket is not None:
             log.debug("Socket already connected, disconnecting first.")
             self.disconnect()
+        self._decoder.reset()
+        self._frames.clear()
         self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         self.socket.settimeout(SOCKET_CONNECT_TIMEOUT)
-        base_path = path = (
-            os.environ.get("XDG_RUNTIME_DIR")
-            or os.environ.get("TMPDIR")
-            or os.environ.get("TMP")
-            or os.environ.get("TEMP")
-            or "/tmp"
-        )
-        base_path = re.sub(r"\/$", "", path) + "/discord-ipc-{0}"
-        for i in range(MAX_IPC_SOCKET_RANGE):
-            path = base_path.format(i)
+        for path in ipc_paths():
             try:
-                log.debug(f"Attempting to connect to socket at path: {path}")
                 self.socket.connect(path)
                 break
-            except FileNotFoundError:
-                log.warning(f"socket {path} not found, trying next socket.")
-                pass
+            except (FileNotFoundError, ConnectionRefusedError):
+                # Expected while Discord isn't running; not worth a warning
+                log.debug(f"socket {path} not available, trying next socket.")
             except Exception as ex:
                 log.error(
                     f"failed to connect to socket {path}, trying next socket. {ex}"
@@ -50,9 +147,14 @@ class UnixPipe:
                 # Skip all errors to try all sockets
                 pass
         else:
+            self.socket.close()
+            self.socket = None
             raise DiscordNotOpened
         log.debug(f"Connected to socket at path: {path}")
-        self.socket.setblocking(False)
+        remember_ipc_path(path)
+        # Bounds the blocking handshake; the poll loop switches the socket
+        # to non-blocking once it takes over.
+        self.socket.settimeout(SOCKET_SEND_TIMEOUT)
 
     def disconnect(self):
         if self.socket is None:
@@ -67,25 +169,73 @@ class UnixPipe:
         except OSError as ex:
             log.debug(f"Socket close error: {ex}")
         self.socket = None  # Reset so connect() creates a fresh socket
+        self._decoder.reset()
+        self._frames.clear()
 
     def send(self, payload, op):
-        payload_bytes = json.dumps(payload).encode("UTF-8")
-        header = struct.pack("<ii", op, len(payload_bytes))
-        message = header + payload_bytes
-        self.socket.settimeout(SOCKET_SEND_TIMEOUT)
-        self.socket.sendall(message)
+        self.socket.sendall(encode_frame(payload, op))
 
-    def receive(self) -> (int, str):
-        data = self.socket.recv(SOCKET_BUFFER_SIZE)
+    def send_frames(self, frames: list[bytes]) -> bytes:
+        """Write encoded frames back to back with as few syscalls as possible.
+
+        Meant for a non-blocking socket: returns the bytes the socket did
+        not accept, which the caller must send first once it is writable.
+        """
+        for i in range(0, len(frames), SOCKET_MAX_IOV):
+            batch = frames[i : i + SOCKET_MAX_IOV]
+            try:
+                sent = self.socket.sendmsg(batch)
+            except BlockingIOError:
+                sent = 0
+            if sent < sum(len(frame) for frame in batch):
+                return b"".join(frames[i:])[sent:]
+        return b""
+
+    def fileno(self) -> int:
+        return self.socket.fileno()
+
+    def buffered_frames(self) -> list[tuple[int, bytes]]:
+        """Frames already decoded by ``receive`` but not yet returned."""
+        frames = list(self._frames)
+        self._frames.clear()
+        return frames
+
+    def read_frames(self) -> list[tuple[int, bytes]]:
+        """Read once from the socket and return every frame it completed.
+
+        A closed connection is reported as a final ``SOCKET_DISCONNECTED``
+        entry, and so is a corrupt header: the stream can't be resynced, so
+        the caller must drop the connection.
+        """
+        frames = []
+        try:
+            data = self.socket.recv(SOCKET_BUFFER_SIZE)
+        except (BlockingIOError, socket.timeout):
+            return frames
         if len(data) == 0:
-            return SOCKET_DISCONNECTED, {}
-        header = data[:8]
-        code = int.from_bytes(header[:4], "little")
-        length = int.from_bytes(header[4:], "little")
-        all_data = b""
-        if length < 0:
-            return SOCKET_BAD_BUFFER_SIZE, {}
-        if length > 0:
-            data = self.socket.recv(length)
-            all_data += data
-        return code, all_data.decode("UTF-8")
+            return [(SOCKET_DISCONNECTED, b"")]
+        try:
+            frames.extend(self._decoder.feed(data))
+        except FrameError as ex:
+            log.error(f"dropping the connection: {ex}")
+            frames.extend(ex.frames)
+            frames.append((SOCKET_DISCONNECTED, b""))
+        return frames
+
+    def receive(self) -> (int, bytes):
+        """Return the next complete frame, blocking until one arrives.
+
+        Frames that arrived together in a previous read are returned first.
+        If the socket times out part way through a frame, the partial data
+        stays buffered and the next call picks up where this one left off.
+        """
+        while not self._frames:
+            data = self.socket.recv(SOCKET_BUFFER_SIZE)
+            if len(data) == 0:
+                return SOCKET_DISCONNECTED, b""
+            try:
+                self._frames.extend(self._decoder.feed(data))
+            except FrameError as ex:
+                log.error(f"dropping the connection: {ex}")
+                return SOCKET_DISCONNECTED, b""
+        return self._frames.popleft()
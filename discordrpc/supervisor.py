@@ -0,0 +1,170 @@
+import ctypes
+import ctypes.util
+import os
+import random
+import selectors
+import struct
+import threading
+
+from loguru import logger as log
+
+from .constants import RECONNECT_INITIAL_DELAY, RECONNECT_MAX_DELAY
+from .exceptions import DiscordNotOpened, InvalidID
+from .sockets import ipc_runtime_dir
+
+IN_CREATE = 0x00000100
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+INOTIFY_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len; name follows
+IPC_SOCKET_PREFIX = b"discord-ipc-"
+
+
+class SocketDirWatcher:
+    """Reports Discord IPC sockets appearing in the runtime directory.
+
+    Uses inotify through libc; where that is unavailable ``fileno()`` is
+    None and callers fall back to timed retries.
+    """
+
+    def __init__(self, path: str):
+        self._fd: int = None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+            if libc.inotify_add_watch(fd, os.fsencode(path), IN_CREATE | IN_MOVED_TO) < 0:
+                os.close(fd)
+                raise OSError(ctypes.get_errno(), f"cannot watch {path}")
+            self._fd = fd
+        except (OSError, AttributeError, TypeError) as ex:
+            log.debug(f"inotify unavailable, reconnecting on a timer only: {ex}")
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def socket_created(self) -> bool:
+        """Drain pending events; True if any was for a Discord IPC socket."""
+        created = False
+        while True:
+            try:
+                data = os.read(self._fd, 4096)
+            except BlockingIOError:
+                return created
+            if not data:
+                return created
+            offset = 0
+            while offset + INOTIFY_EVENT.size <= len(data):
+                _, _, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                name = data[offset:offset + length]
+                offset += length
+                if name.startswith(IPC_SOCKET_PREFIX):
+                    created = True
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class ConnectionSupervisor:
+    """Keeps calling ``connect`` in the background until it succeeds.
+
+    Retries back off exponentially with jitter, up to ``max_delay``. While
+    waiting, the runtime directory is watched so a retry happens as soon as
+    Discord creates its socket. ``kick`` starts the supervisor, or cuts the
+    current wait short if it is already running.
+    """
+
+    def __init__(
+        self,
+        connect: callable,
+        initial_delay: float = RECONNECT_INITIAL_DELAY,
+        max_delay: float = RECONNECT_MAX_DELAY,
+    ):
+        self._connect = connect
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._thread: threading.Thread = None
+        self._stopped = False
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self.attempts: int = 0
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def kick(self):
+        with self._lock:
+            if self._stopped:
+                return
+            if self.is_running():
+                self._wake()
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="discord-reconnect", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+            self._wake()
+
+    def _wake(self):
+        try:
+            os.write(self._wake_w, b"\0")
+        except (BlockingIOError, OSError):
+            pass
+
+    def _delay(self) -> float:
+        # Exponential backoff with "equal jitter": never shorter than half
+        # the step, so retries stay spread out without going back to zero.
+        step = min(self.max_delay, self.initial_delay * 2 ** (self.attempts - 1))
+        return step / 2 + random.uniform(0, step / 2)
+
+    def _run(self):
+        watcher = SocketDirWatcher(ipc_runtime_dir())
+        selector = selectors.DefaultSelector()
+        selector.register(self._wake_r, selectors.EVENT_READ, "wake")
+        if watcher.fileno() is not None:
+            selector.register(watcher.fileno(), selectors.EVENT_READ, "watch")
+        self.attempts = 0
+        try:
+            while not self._stopped:
+                self.attempts += 1
+                try:
+                    self._connect()
+                    log.info(f"Connected to Discord after {self.attempts} attempt(s)")
+                    return
+                except InvalidID as ex:
+                    # Retrying won't fix bad credentials
+                    log.error(f"Not reconnecting to Discord: {ex}")
+                    return
+                except DiscordNotOpened:
+                    log.debug("Discord socket not available")
+                except Exception as ex:
+                    log.warning(f"Failed to connect to Discord: {ex}")
+                delay = self._delay()
+                log.debug(f"Retrying Discord connection in {delay:.1f}s")
+                for key, _ in selector.select(delay):
+                    if key.data == "wake":
+                        self._drain_wake()
+                    elif watcher.socket_created():
+                        # Discord is starting; retry soon without backing off further
+                        self.attempts = 0
+        finally:
+            selector.close()
+            watcher.close()
+
+    def _drain_wake(self):
+        try:
+            while os.read(self._wake_r, 512):
+                pass
+        except (BlockingIOError, OSError):
+            pass
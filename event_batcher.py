@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import Counter
+
+from loguru import logger as log
+
+EVENT_BATCH_WINDOW = 1 / 60  # Seconds to collect events before shipping them (one display frame)
+
+
+class EventBatcher:
+    """Collects events for the frontend and ships them in one call per window.
+
+    Events added with the same collapse key supersede each other: only the
+    latest one is delivered, at the position of the latest arrival. Events
+    without a key are always delivered, in order.
+
+    One flusher thread does the delivering. An event arriving after a quiet
+    window goes out at once; events arriving within a window of the last
+    delivery are held until the window ends and go out together.
+    """
+
+    def __init__(self, deliver: callable, window: float = EVENT_BATCH_WINDOW):
+        self._deliver = deliver
+        self.window = window
+        self._changed = threading.Condition()
+        self._delivering = threading.Lock()  # Keeps batches in order between flush() and the flusher
+        self._events: dict = {}  # collapse key -> (event, payload)
+        self._sequence = 0
+        self._last_delivery = float("-inf")
+        self._closed = False
+        self.stats: Counter = Counter()
+        self._thread = threading.Thread(target=self._run, name="event-batcher", daemon=True)
+        self._thread.start()
+
+    def __len__(self):
+        return len(self._events)
+
+    def add(self, event: str, payload, key=None):
+        with self._changed:
+            if key is None:
+                self._sequence += 1
+                key = self._sequence
+            elif key in self._events:
+                # Re-insert so the surviving event keeps its arrival order
+                del self._events[key]
+                self.stats["events_collapsed"] += 1
+            self._events[key] = (event, payload)
+            self.stats["events_queued"] += 1
+            if len(self._events) == 1:
+                self._changed.notify()
+
+    def _run(self):
+        while True:
+            with self._changed:
+                self._changed.wait_for(lambda: self._events or self._closed)
+                if self._closed:
+                    return
+                # Hold events that follow a delivery until its window is over
+                deadline = self._last_delivery + self.window
+                while not self._closed and time.monotonic() < deadline:
+                    self._changed.wait(deadline - time.monotonic())
+            self.flush()
+
+    def flush(self):
+        """Deliver everything pending now, on the calling thread."""
+        with self._delivering:
+            with self._changed:
+                events = tuple(self._events.values())
+                self._events = {}
+                if not events:
+                    return
+                self._last_delivery = time.monotonic()
+                self.stats["batches_sent"] += 1
+            try:
+                self._deliver(events)
+            except Exception as ex:
+                log.error(f"failed to deliver {len(events)} events: {ex}")
+
+    def close(self):
+        with self._changed:
+            self._closed = True
+            self._changed.notify()
+        if threading.current_thread() is not self._thread:
+            self._thread.join()
+        self.flush()
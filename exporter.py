@@ -0,0 +1,114 @@
+import os
+import tempfile
+import threading
+
+from loguru import logger as log
+
+METRIC_PREFIX = "discord_plugin"
+DEFAULT_EXPORT_INTERVAL = 15  # Seconds between metric file writes
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_openmetrics(counters: dict, gauges: dict, latency: dict) -> str:
+    """Format backend statistics in the OpenMetrics text format.
+
+    ``counters`` and ``gauges`` map names to numbers; ``latency`` is a
+    ``CommandMetrics.snapshot()``.
+    """
+    lines = []
+    for name in sorted(counters):
+        metric = f"{METRIC_PREFIX}_{name}"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric}_total {counters[name]}")
+    for name in sorted(gauges):
+        metric = f"{METRIC_PREFIX}_{name}"
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric} {gauges[name]}")
+
+    commands = latency.get("commands", {})
+    if commands:
+        bounds = [str(bound) for bound in latency["buckets"]] + ["+Inf"]
+        metric = f"{METRIC_PREFIX}_command_latency_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        lines.append(f"# UNIT {metric} seconds")
+        for command, entry in sorted(commands.items()):
+            label = f'command="{_escape(command)}"'
+            cumulative = 0
+            for bound, count in zip(bounds, entry["counts"]):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f"{metric}_count{{{label}}} {entry['count']}")
+            lines.append(f"{metric}_sum{{{label}}} {entry['sum']}")
+        for field in ("errors", "timeouts"):
+            metric = f"{METRIC_PREFIX}_command_{field}"
+            lines.append(f"# TYPE {metric} counter")
+            for command, entry in sorted(commands.items()):
+                lines.append(f'{metric}_total{{command="{_escape(command)}"}} {entry[field]}')
+
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """Periodically writes backend metrics to a file, e.g. for node_exporter.
+
+    Nothing listens on the network: a background thread renders
+    ``collect()`` every ``interval`` seconds and atomically replaces
+    ``path``. An empty path turns the exporter off.
+    """
+
+    def __init__(self, collect: callable):
+        self._collect = collect
+        self.path: str = ""
+        self.interval: float = DEFAULT_EXPORT_INTERVAL
+        self._lock = threading.Lock()
+        self._stop = threading.Event()  # Belongs to the current run; each run gets its own
+        self._thread: threading.Thread = None
+
+    def configure(self, path: str, interval: float = DEFAULT_EXPORT_INTERVAL):
+        with self._lock:
+            self.path = os.path.expanduser(path or "")
+            self.interval = max(1, interval or DEFAULT_EXPORT_INTERVAL)
+            # A stopped run may still be finishing a write; it is left to exit
+            running = self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+            if self.path and not running:
+                self._stop = threading.Event()
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._stop,), name="discord-metrics", daemon=True
+                )
+                self._thread.start()
+            elif not self.path and running:
+                self._stop.set()
+
+    def _run(self, stop: threading.Event):
+        while not stop.is_set():
+            self.write()
+            stop.wait(self.interval)
+
+    def write(self):
+        path = self.path
+        if not path:
+            return
+        try:
+            counters, gauges, latency = self._collect()
+            text = render_openmetrics(counters, gauges, latency)
+            directory = os.path.dirname(path) or "."
+            # Write beside the target and rename, so readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".discord-metrics-")
+            try:
+                with os.fdopen(fd, "w", encoding="UTF-8") as f:
+                    f.write(text)
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except Exception as ex:
+            log.error(f"failed to write metrics to {path}: {ex}")
+
+    def close(self):
+        with self._lock:
+            self._stop.set()
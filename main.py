@@ -1,5 +1,6 @@
 import os
 import json
+import threading
 from concurrent.futures import ThreadPoolExecutor
 
 from loguru import logger as log
@@ -14,16 +15,35 @@ from src.backend.DeckManagement.ImageHelpers import image2pixbuf
 from src.backend.PluginManager.EventHolder import EventHolder
 
 # Import actions
-from .settings import PluginSettings
+from .settings import (
+    PluginSettings,
+    KEY_METRICS_PATH,
+    KEY_METRICS_INTERVAL,
+    DEFAULT_METRICS_INTERVAL,
+)
+from .warm_state import WarmState
+from .callbacks import CallbackRegistry, EventRouter
 from .actions.Mute import Mute
 from .actions.Deafen import Deafen
 from .actions.ChangeVoiceChannel import ChangeVoiceChannel
 from .actions.ChangeTextChannel import ChangeTextChannel
 from .actions.TogglePTT import TogglePTT
 from .actions.UserVolume import UserVolume
+from .actions.DuckOthers import DuckOthers
 
 # Import event IDs
 from .discordrpc.commands import VOICE_CHANNEL_SELECT, VOICE_SETTINGS_UPDATE, GET_CHANNEL
+from .discordrpc import codec
+from .roster import ROSTER_UPDATE
+
+# Events delivered through the router, and where each one keeps its scope
+EVENT_SCOPES = {
+    GET_CHANNEL: lambda data: data.get("id"),
+    ROSTER_UPDATE: lambda data: data.get("channel_id"),
+}
+
+# Key of the callbacks waiting for the backend to start
+BACKEND_READY = "backend-ready"
 
 
 class PluginTemplate(PluginBase):
@@ -33,24 +53,42 @@ class PluginTemplate(PluginBase):
 
     def __init__(self):
         super().__init__(use_legacy_locale=False)
-        self.callbacks = {}
+        # The backend starts on a thread; until it is up, event interest is
+        # collected here and actions needing it wait in ``_ready_callbacks``
+        self._backend_lock = threading.Lock()
+        self._backend_ready = False
+        self._early_interest: set[str] = set()
+        self._ready_callbacks = CallbackRegistry()
+        self.callbacks = CallbackRegistry(
+            on_first=self._on_first_callback, on_empty=self._on_last_callback
+        )
+        self.router = EventRouter(
+            EVENT_SCOPES,
+            on_first=self._on_first_callback,
+            on_empty=self._on_last_callback,
+        )
         self.auth_callback_fn: callable = None
         self.lm = self.locale_manager
         self.lm.set_to_os_default()
         self._settings_manager = PluginSettings(self)
+        # Last known state, so keys render before Discord is reachable
+        self.warm_state = WarmState(self)
         self.has_plugin_settings = True
-        self._thread_pool = ThreadPoolExecutor(
-            max_workers=4, thread_name_prefix="discord-"
-        )
+        self._thread_pool: ThreadPoolExecutor = None
+        # Starting the backend process is the slowest part of loading, so it
+        # runs while the actions and icons are registered
+        threading.Thread(
+            target=self._launch_backend, name="discord-backend-launch", daemon=True
+        ).start()
+        # Rendered icons shared by every action: {(key, revision, size): image}
+        self._icon_cache: dict = {}
+        self._icon_revisions: dict[str, int] = {}
+        # Actions render from the GTK thread and from backend callbacks
+        self._icon_lock = threading.Lock()
+        self.asset_manager.icons.add_listener(self._on_icon_asset_changed)
         self._add_icons()
         self._register_actions()
         self._create_event_holders()
-        backend_path = os.path.join(self.PATH, "backend.py")
-        self.launch_backend(
-            backend_path=backend_path,
-            open_in_terminal=False,
-            venv_path=os.path.join(self.PATH, ".venv"),
-        )
 
         try:
             with open(
@@ -73,7 +111,55 @@ class PluginTemplate(PluginBase):
         )
 
         self.add_css_stylesheet(os.path.join(self.PATH, "style.css"))
+
+    def _launch_backend(self):
+        backend_path = os.path.join(self.PATH, "backend.py")
+        self.launch_backend(
+            backend_path=backend_path,
+            open_in_terminal=False,
+            venv_path=os.path.join(self.PATH, ".venv"),
+        )
+        with self._backend_lock:
+            if not self.backend:
+                log.error("Discord backend failed to start")
+                return
+            # Only keys added while it was starting; later ones announce themselves
+            for key in self._early_interest:
+                self.backend.add_event_interest(key)
+            self._early_interest.clear()
+            self._backend_ready = True
+            waiting = self._ready_callbacks.get(BACKEND_READY)
+            for callback in waiting:
+                self._ready_callbacks.remove(BACKEND_READY, callback)
         self.setup_backend()
+        for callback in waiting:
+            try:
+                callback()
+            except Exception as ex:
+                log.error(f"backend ready callback failed: {ex}")
+
+    @property
+    def backend_ready(self) -> bool:
+        return self._backend_ready
+
+    def when_backend_ready(self, callback: callable):
+        """Call ``callback()`` now if the backend is up, otherwise once it is.
+
+        Bound methods are held weakly, as with ``add_callback``.
+        """
+        with self._backend_lock:
+            if not self._backend_ready:
+                self._ready_callbacks.add(BACKEND_READY, callback)
+                return
+        callback()
+
+    @property
+    def thread_pool(self) -> ThreadPoolExecutor:
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=4, thread_name_prefix="discord-"
+            )
+        return self._thread_pool
 
     def _create_event_holders(self):
         voice_channel_select = EventHolder(
@@ -86,15 +172,9 @@ class PluginTemplate(PluginBase):
             event_id_suffix=VOICE_SETTINGS_UPDATE,
         )
 
-        get_channel = EventHolder(
-            plugin_base=self,
-            event_id_suffix=GET_CHANNEL,
-        )
-
         self.add_event_holders([
             voice_channel_select,
             voice_settings_update,
-            get_channel,
         ])
 
 
@@ -109,6 +189,33 @@ class PluginTemplate(PluginBase):
         self.add_icon("voice-inactive", self.get_asset_path("voice-inactive.png"))
         self.add_icon("voice-active", self.get_asset_path("voice-active.png"))
 
+    def _on_icon_asset_changed(self, event: str, key: str, asset):
+        # Bumping the revision makes every cached render of ``key`` stale
+        with self._icon_lock:
+            self._icon_revisions[key] = self._icon_revisions.get(key, 0) + 1
+            for cache_key in [k for k in self._icon_cache if k[0] == key]:
+                del self._icon_cache[cache_key]
+
+    def get_rendered_icon(self, key: str, icon, size: tuple[int, int] = None):
+        """Return the ready-to-push image for icon ``key`` at ``size``, rendering it once."""
+        with self._icon_lock:
+            revision = self._icon_revisions.get(key, 0)
+            rendered = self._icon_cache.get((key, revision, size))
+        if rendered is not None:
+            return rendered
+        # Rendering is slow, so it happens outside the lock; two threads may
+        # both render a cold icon, which is harmless
+        _, rendered = icon.get_values()
+        if rendered is None:
+            return None
+        if size is not None:
+            rendered = rendered.resize(size)
+        with self._icon_lock:
+            # Don't cache a render the asset changed under
+            if self._icon_revisions.get(key, 0) == revision:
+                self._icon_cache[(key, revision, size)] = rendered
+        return rendered
+
     def _register_actions(self):
         change_text = ActionHolder(
             plugin_base=self,
@@ -188,6 +295,19 @@ class PluginTemplate(PluginBase):
         )
         self.add_action_holder(user_volume)
 
+        duck_others = ActionHolder(
+            plugin_base=self,
+            action_base=DuckOthers,
+            action_id="com_imdevinc_StreamControllerDiscordPlugin::DuckOthers",
+            action_name="Duck Others",
+            action_support={
+                Input.Key: ActionInputSupport.SUPPORTED,
+                Input.Dial: ActionInputSupport.UNTESTED,
+                Input.Touchscreen: ActionInputSupport.UNTESTED,
+            },
+        )
+        self.add_action_holder(duck_others)
+
     def setup_backend(self):
         if self.backend and self.backend.is_authed():
             return
@@ -196,12 +316,18 @@ class PluginTemplate(PluginBase):
         client_secret = settings.get("client_secret", "")
         access_token = settings.get("access_token", "")
         refresh_token = settings.get("refresh_token", "")
-        self._thread_pool.submit(
+        token_expires_at = settings.get("token_expires_at", 0)
+        self.backend.configure_metrics(
+            settings.get(KEY_METRICS_PATH, ""),
+            settings.get(KEY_METRICS_INTERVAL, DEFAULT_METRICS_INTERVAL),
+        )
+        self.thread_pool.submit(
             self.backend.update_client_credentials,
             client_id,
             client_secret,
             access_token,
             refresh_token,
+            token_expires_at,
         )
 
     def save_access_token(self, access_token: str):
@@ -214,16 +340,40 @@ class PluginTemplate(PluginBase):
         settings["refresh_token"] = refresh_token
         self.set_settings(settings)
 
+    def save_token_expiry(self, expires_at: float):
+        settings = self.get_settings()
+        settings["token_expires_at"] = expires_at
+        self.set_settings(settings)
+
     def add_callback(self, key: str, callback: callable):
-        callbacks = self.callbacks.get(key, [])
-        callbacks.append(callback)
-        self.callbacks[key] = callbacks
+        """Call ``callback(data)`` for ``key`` events; adding it again is a no-op.
+
+        Bound methods are held weakly, so a registration never keeps an
+        action alive.
+        """
+        self.callbacks.add(key, callback)
+
+    def _on_first_callback(self, key: str):
+        with self._backend_lock:
+            if not self._backend_ready:
+                self._early_interest.add(key)
+                return
+            # Let the backend start forwarding this event
+            self.backend.add_event_interest(key)
+
+    def _on_last_callback(self, key: str):
+        with self._backend_lock:
+            if not self._backend_ready:
+                self._early_interest.discard(key)
+                return
+            self.backend.remove_event_interest(key)
 
     def handle_callback(self, key: str, data: any):
-        if key not in self.callbacks:
+        callbacks = self.callbacks.get(key)
+        if not callbacks:
             log.warning(f"No callbacks registered for key: {key}")
             return
-        for callback in self.callbacks.get(key):
+        for callback in callbacks:
             callback(data)
 
     def on_auth_callback(self, success: bool, message: str = None):
@@ -233,18 +383,46 @@ class PluginTemplate(PluginBase):
     def get_settings_area(self):
         return self._settings_manager.get_settings_area()
 
+    def add_routed_callback(self, event: str, scope, callback: callable):
+        """Call ``callback(data)`` for ``event`` only when its scope is ``scope``."""
+        self.router.add(event, scope, callback)
+
+    def remove_routed_callback(self, event: str, scope, callback: callable):
+        self.router.remove(event, scope, callback)
+
     def clear_callbacks(self, key: str, callback: callable):
-        callbacks = self.callbacks.get(key, [])
-        if callback in callbacks:
-            callbacks.remove(callback)
-            if callbacks:
-                self.callbacks[key] = callbacks
-            else:
-                del self.callbacks[key]
-
-    def trigger_event(self, event_id_suffix: str, data: any):
+        self.callbacks.remove(key, callback)
+
+    remove_callback = clear_callbacks
+
+    def trigger_events(self, events: tuple):
+        """Deliver a batch of ``(event_id_suffix, frame)`` pairs from the backend."""
+        for event_id_suffix, frame in events:
+            self.trigger_event(event_id_suffix, frame)
+
+    def trigger_event(self, event_id_suffix: str, frame: bytes):
+        """Deliver a raw Discord frame forwarded by the backend.
+
+        The frame is decoded exactly once here and its ``data`` handed to the
+        callbacks routed for its scope, the matching event holder or, failing
+        that, to registered callbacks.
+        """
+        try:
+            data = codec.loads(frame).get("data")
+        except codec.DecodeError as ex:
+            log.error(f"failed to decode {event_id_suffix} event: {ex}")
+            return
+        if event_id_suffix in (VOICE_SETTINGS_UPDATE, VOICE_CHANNEL_SELECT):
+            self.warm_state.update(event_id_suffix, data)
+        if self.router.routes(event_id_suffix):
+            # Events outside every registered scope are simply not needed
+            self.router.dispatch(event_id_suffix, data)
+            return
         event_id = f"{self.get_plugin_id()}::{event_id_suffix}"
-        if not event_id in self.event_holders:
-            log.warning(f"Event ID {event_id} not registered.")
+        if event_id in self.event_holders:
+            self.event_holders[event_id].trigger_event(data)
+            return
+        if event_id_suffix in self.callbacks:
+            self.handle_callback(event_id_suffix, data)
             return
-        self.event_holders[event_id].trigger_event(data)
+        log.warning(f"Event ID {event_id} not registered.")
@@ -0,0 +1,83 @@
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+REQUEST_CACHE_TTL = 2  # Seconds a reply answers identical requests without asking Discord
+
+
+class RequestCoalescer:
+    """Single-flight RPC requests with a short-lived cache of their replies.
+
+    Requests are keyed by (command, args). While one is in flight, identical
+    requests join it instead of being sent again: its reply reaches every
+    consumer anyway. Replies passed to ``store`` answer identical requests
+    for ``ttl`` seconds, until ``invalidate`` drops them.
+    """
+
+    def __init__(self, ttl: float = REQUEST_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._in_flight: dict[tuple, Future] = {}
+        self._replies: dict[tuple, tuple] = {}  # key -> (reply, time stored)
+        self.stats: Counter = Counter()
+
+    @staticmethod
+    def _key(command: str, args: dict) -> tuple:
+        return (command, tuple(sorted(args.items())) if args else ())
+
+    def request(self, command: str, args: dict, send: callable):
+        """Call ``send()`` unless an identical request is in flight or cached.
+
+        ``send`` must return the request's future. Returns the cached reply
+        on a hit, otherwise None.
+        """
+        key = self._key(command, args)
+        with self._lock:
+            cached = self._replies.get(key)
+            if cached is not None:
+                if time.monotonic() - cached[1] < self.ttl:
+                    self.stats["requests_cached"] += 1
+                    return cached[0]
+                del self._replies[key]
+            if key in self._in_flight:
+                self.stats["requests_coalesced"] += 1
+                return None
+            # Claimed before sending, so concurrent callers join this request
+            claim = self._in_flight[key] = Future()
+        try:
+            future = send()
+        except BaseException:
+            self._finish(key, claim)
+            raise
+        with self._lock:
+            if self._in_flight.get(key) is claim:
+                self._in_flight[key] = future
+        self.stats["requests_sent"] += 1
+        # Replies, errors and timeouts all end the flight
+        future.add_done_callback(lambda done: self._finish(key, done))
+        return None
+
+    def _finish(self, key: tuple, future: Future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def store(self, command: str, args: dict, reply):
+        with self._lock:
+            self._replies[self._key(command, args)] = (reply, time.monotonic())
+
+    def invalidate(self, command: str = None):
+        """Drop cached replies for ``command``, or all of them."""
+        with self._lock:
+            if command is None:
+                self._replies.clear()
+            else:
+                for key in [key for key in self._replies if key[0] == command]:
+                    del self._replies[key]
+
+    def reset(self):
+        """Forget everything; replies from an old connection never arrive."""
+        with self._lock:
+            self._replies.clear()
+            self._in_flight.clear()
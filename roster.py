@@ -0,0 +1,112 @@
+import threading
+from collections import deque
+from itertools import islice
+
+# Synthetic event the backend sends to the frontend with roster deltas
+ROSTER_UPDATE = "ROSTER_UPDATE"
+# Synthetic event the backend sends when ducking starts or stops: {"ducking": bool}
+DUCK_STATE = "DUCK_STATE"
+
+ROSTER_ADD = "add"
+ROSTER_UPDATE_USER = "update"
+ROSTER_REMOVE = "remove"
+ROSTER_RESET = "reset"
+
+
+class VoiceRoster:
+    """Members of the current voice channel, keyed by user id.
+
+    Insertion order is the display order, so adds, updates and removals are
+    all O(1). Every change bumps ``version`` and is kept in a bounded change
+    log, which lets consumers catch up with ``delta`` instead of copying the
+    whole roster.
+    """
+
+    def __init__(self, history: int = 512):
+        self._lock = threading.Lock()
+        self._users: dict[str, dict] = {}
+        self._changes: deque = deque(maxlen=history)  # (version, op, user_id, entry)
+        self.channel_id: str = None
+        self.version: int = 0
+
+    def __len__(self):
+        return len(self._users)
+
+    def __contains__(self, user_id: str):
+        return user_id in self._users
+
+    def _record(self, op: str, user_id: str, entry: dict):
+        self.version += 1
+        self._changes.append((self.version, op, user_id, entry))
+
+    def reset(self, channel_id: str = None):
+        """Forget every member and start tracking ``channel_id``."""
+        with self._lock:
+            self._users.clear()
+            self.channel_id = channel_id
+            self._record(ROSTER_RESET, None, None)
+
+    def upsert(self, user_id: str, **fields) -> bool:
+        """Add a member or update the given fields; returns True if anything changed."""
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                entry = {
+                    "id": user_id,
+                    "username": "Unknown",
+                    "nick": None,
+                    "volume": 100,
+                    "muted": False,
+                }
+                entry.update(fields)
+                self._users[user_id] = entry
+                self._record(ROSTER_ADD, user_id, dict(entry))
+                return True
+            changed = {k: v for k, v in fields.items() if entry.get(k) != v}
+            if not changed:
+                return False
+            entry.update(changed)
+            self._record(ROSTER_UPDATE_USER, user_id, dict(entry))
+            return True
+
+    def remove(self, user_id: str) -> bool:
+        with self._lock:
+            if self._users.pop(user_id, None) is None:
+                return False
+            self._record(ROSTER_REMOVE, user_id, None)
+            return True
+
+    def get(self, user_id: str) -> dict:
+        entry = self._users.get(user_id)
+        return dict(entry) if entry is not None else None
+
+    def users(self) -> dict[str, dict]:
+        with self._lock:
+            return {user_id: dict(entry) for user_id, entry in self._users.items()}
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "version": self.version,
+                "channel_id": self.channel_id,
+                "users": [dict(entry) for entry in self._users.values()],
+            }
+
+    def delta(self, since: int) -> dict:
+        """Changes after version ``since``, or None if they are no longer logged."""
+        with self._lock:
+            # Versions are consecutive, so the changes since ``since`` are
+            # simply the newest ``version - since`` entries of the log.
+            start = len(self._changes) - (self.version - since)
+            if start < 0 or since > self.version:
+                return None
+            changes = [
+                [op, user_id, entry]
+                for _, op, user_id, entry in islice(self._changes, start, None)
+            ]
+            return {
+                "since": since,
+                "version": self.version,
+                "channel_id": self.channel_id,
+                "changes": changes,
+            }
@@ -1,3 +1,5 @@
+import os
+
 from gi.repository import Gtk, Adw
 import gi
 
@@ -10,6 +12,9 @@ gi.require_version("Adw", "1")
 
 KEY_CLIENT_SECRET = "client_secret"
 KEY_CLIENT_ID = "client_id"
+KEY_METRICS_PATH = "metrics_path"
+KEY_METRICS_INTERVAL = "metrics_interval"
+DEFAULT_METRICS_INTERVAL = 15
 
 
 class PluginSettings:
@@ -17,13 +22,16 @@ class PluginSettings:
     _client_id: Adw.EntryRow
     _client_secret: Adw.PasswordEntryRow
     _auth_button: Gtk.Button
+    _metrics_path: Adw.EntryRow
+    _metrics_interval: Adw.SpinRow
 
     def __init__(self, plugin_base: PluginBase):
         self._plugin_base = plugin_base
         self._settings_cache = None
 
     def get_settings_area(self) -> Adw.PreferencesGroup:
-        if not self._plugin_base.backend.is_authed():
+        backend = self._plugin_base.backend
+        if not backend or not backend.is_authed():
             self._status_label = Gtk.Label(
                 label=self._plugin_base.lm.get("actions.base.credentials.failed"),
                 css_classes=["discord-controller-red"],
@@ -49,6 +57,15 @@ class PluginSettings:
         self._client_id.connect("notify::text", self._on_change_client_id)
         self._client_secret.connect("notify::text", self._on_change_client_secret)
         self._auth_button.connect("clicked", self._on_auth_clicked)
+        self._metrics_path = Adw.EntryRow(
+            title=self._plugin_base.lm.get("actions.base.metrics_path")
+        )
+        # Applied on Enter or the apply button, not on every keystroke
+        self._metrics_path.set_show_apply_button(True)
+        self._metrics_interval = Adw.SpinRow.new_with_range(1, 3600, 1)
+        self._metrics_interval.set_title(
+            self._plugin_base.lm.get("actions.base.metrics_interval")
+        )
 
         gh_link_label = self._plugin_base.lm.get("actions.info.link.label")
         gh_link_text = self._plugin_base.lm.get("actions.info.link.text")
@@ -59,6 +76,9 @@ class PluginSettings:
 
         self._load_settings()
         self._enable_auth()
+        # Connected after loading so restoring the values doesn't re-save them
+        self._metrics_path.connect("apply", self._on_apply_metrics_path)
+        self._metrics_interval.connect("notify::value", self._on_change_metrics_interval)
 
         pref_group = Adw.PreferencesGroup()
         pref_group.set_title(self._plugin_base.lm.get("actions.base.credentials.title"))
@@ -66,6 +86,8 @@ class PluginSettings:
         pref_group.add(self._client_id)
         pref_group.add(self._client_secret)
         pref_group.add(self._auth_button)
+        pref_group.add(self._metrics_path)
+        pref_group.add(self._metrics_interval)
         pref_group.add(gh_label)
         return pref_group
 
@@ -85,6 +107,10 @@ class PluginSettings:
         client_secret = settings.get(KEY_CLIENT_SECRET, "")
         self._client_id.set_text(client_id)
         self._client_secret.set_text(client_secret)
+        self._metrics_path.set_text(settings.get(KEY_METRICS_PATH, ""))
+        self._metrics_interval.set_value(
+            settings.get(KEY_METRICS_INTERVAL, DEFAULT_METRICS_INTERVAL)
+        )
 
     def _update_status(self, message: str, is_error: bool):
         style = "discord-controller-red" if is_error else "discord-controller-green"
@@ -107,6 +133,30 @@ class PluginSettings:
         self._update_settings(KEY_CLIENT_SECRET, val)
         self._enable_auth()
 
+    def _on_apply_metrics_path(self, entry):
+        path = entry.get_text().strip()
+        directory = os.path.dirname(os.path.expanduser(path))
+        if path and directory and not os.path.isdir(directory):
+            self._update_status(
+                self._plugin_base.lm.get("actions.base.metrics_path.invalid"), True
+            )
+            return
+        self._update_settings(KEY_METRICS_PATH, path)
+        self._configure_metrics()
+
+    def _on_change_metrics_interval(self, row, _):
+        self._update_settings(KEY_METRICS_INTERVAL, int(row.get_value()))
+        self._configure_metrics()
+
+    def _configure_metrics(self):
+        if not self._plugin_base.backend:
+            return
+        settings = self._get_cached_settings()
+        self._plugin_base.backend.configure_metrics(
+            settings.get(KEY_METRICS_PATH, ""),
+            settings.get(KEY_METRICS_INTERVAL, DEFAULT_METRICS_INTERVAL),
+        )
+
     def _on_auth_clicked(self, _):
         if not self._plugin_base.backend:
             self._update_status("Failed to load backend", True)
@@ -0,0 +1,50 @@
+import threading
+
+
+class SubscriptionRegistry:
+    """Reference-counted Discord event subscriptions, keyed by (event, args).
+
+    ``acquire`` and ``release`` report whether the caller has to actually
+    send SUBSCRIBE or UNSUBSCRIBE: only the first holder of a subscription
+    subscribes and only the last one to let go unsubscribes. The live set
+    can be replayed after reconnecting.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: dict[tuple, int] = {}
+        self._args: dict[tuple, dict] = {}
+
+    def __len__(self):
+        return len(self._counts)
+
+    @staticmethod
+    def _key(event: str, args: dict) -> tuple:
+        return (event, tuple(sorted(args.items())) if args else ())
+
+    def acquire(self, event: str, args: dict = None) -> bool:
+        """Take a reference; True if this is the first one."""
+        key = self._key(event, args)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+            if count == 0:
+                self._args[key] = args
+            return count == 0
+
+    def release(self, event: str, args: dict = None) -> bool:
+        """Drop a reference; True if it was the last one."""
+        key = self._key(event, args)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            if count <= 1:
+                self._counts.pop(key, None)
+                self._args.pop(key, None)
+                return count == 1
+            self._counts[key] = count - 1
+            return False
+
+    def active(self) -> list[tuple[str, dict]]:
+        """Every subscription with at least one holder, as (event, args)."""
+        with self._lock:
+            return [(key[0], self._args[key]) for key in self._counts]
@@ -0,0 +1,96 @@
+"""Load the plugin backend outside StreamController.
+
+``backend.py`` derives from ``streamcontroller_plugin_tools.BackendBase``,
+which connects to the StreamController frontend over rpyc as soon as it is
+constructed. Here it is replaced by a bare base class, and the frontend by
+``StubFrontend``, which implements the hooks the backend calls.
+"""
+
+import sys
+import threading
+import types
+from collections import defaultdict
+
+from discordrpc import codec
+
+
+class StubFrontend:
+    """The frontend hooks the backend calls, minus StreamController.
+
+    ``trigger_events`` decodes each frame once, as ``PluginTemplate`` does,
+    records its ``data`` in ``events`` and hands it to the listeners
+    registered with ``on``.
+    """
+
+    def __init__(self):
+        self._listeners: dict[str, list] = defaultdict(list)
+        self._changed = threading.Condition()
+        self.events: list[tuple[str, object]] = []
+        self.record = True
+        self.authed = threading.Event()
+        self.settings: dict = {}
+
+    def on(self, event: str, callback: callable):
+        self._listeners[event].append(callback)
+
+    def trigger_events(self, events: tuple):
+        for event, frame in events:
+            listeners = self._listeners.get(event)
+            if not listeners and not self.record:
+                continue
+            data = codec.loads(frame).get("data")
+            for callback in listeners or ():
+                callback(data)
+            if self.record:
+                with self._changed:
+                    self.events.append((event, data))
+                    self._changed.notify_all()
+
+    def wait_for(self, event: str, predicate: callable = None, timeout: float = 5):
+        """The data of the first recorded ``event`` matching ``predicate``."""
+
+        def find():
+            for name, data in self.events:
+                if name == event and (predicate is None or predicate(data)):
+                    return data
+            return None
+
+        with self._changed:
+            self._changed.wait_for(lambda: find() is not None, timeout)
+            return find()
+
+    def on_auth_callback(self, success: bool, message: str = None):
+        if success:
+            self.authed.set()
+
+    def save_access_token(self, access_token: str):
+        self.settings["access_token"] = access_token
+
+    def save_refresh_token(self, refresh_token: str):
+        self.settings["refresh_token"] = refresh_token
+
+    def save_token_expiry(self, expires_at: float):
+        self.settings["token_expires_at"] = expires_at
+
+
+def import_backend() -> types.ModuleType:
+    """Import backend.py with the rpyc link to StreamController stubbed out."""
+    if "backend" not in sys.modules:
+        stub = types.ModuleType("streamcontroller_plugin_tools")
+
+        class BackendBase:
+            def __init__(self):
+                self.frontend = None
+
+        stub.BackendBase = BackendBase
+        sys.modules["streamcontroller_plugin_tools"] = stub
+    import backend
+
+    return backend
+
+
+def make_backend(frontend: StubFrontend):
+    """A fresh ``Backend`` wired to ``frontend``."""
+    backend = import_backend().Backend()
+    backend.frontend = frontend
+    return backend
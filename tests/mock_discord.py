@@ -0,0 +1,547 @@
+"""A stand-in for the Discord client's IPC socket.
+
+``MockDiscord`` listens on ``discord-ipc-<N>`` inside a temporary
+``XDG_RUNTIME_DIR`` and speaks the same framing as Discord: the
+handshake/READY exchange, ``OP_FRAME`` commands, ``OP_PING``/``OP_PONG`` and
+``OP_CLOSE``. Commands the plugin uses are answered with payloads shaped
+like Discord's own, and DISPATCH events can be pushed one at a time or as
+scripted streams at a fixed rate, so ``discordrpc`` and the backend can be
+exercised without a running Discord client.
+"""
+
+import itertools
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from discordrpc import codec, commands
+from discordrpc.asyncdiscord import OP_CLOSE, OP_FRAME, OP_HANDSHAKE, OP_PING, OP_PONG
+from discordrpc.sockets import FrameDecoder, encode_frame
+
+# Discord's RPC error codes
+ERROR_UNKNOWN = 1000
+ERROR_INVALID_COMMAND = 4002
+ERROR_INVALID_CHANNEL = 4005
+ERROR_NOT_AUTHENTICATED = 4006
+ERROR_INVALID_TOKEN = 4009
+CLOSE_INVALID_CLIENT_ID = 4000
+
+APPLICATION = {
+    "id": "1100000000000000001",
+    "name": "StreamController",
+    "description": "",
+    "icon": None,
+    "rpc_origins": ["http://localhost:9000"],
+}
+
+
+def make_user(user_id: str, username: str) -> dict:
+    return {
+        "id": user_id,
+        "username": username,
+        "discriminator": "0",
+        "global_name": username.title(),
+        "avatar": None,
+        "bot": False,
+        "flags": 0,
+        "premium_type": 0,
+    }
+
+
+def make_voice_state(user: dict, volume: int = 100, mute: bool = False, nick: str = None) -> dict:
+    """A member entry as found in a channel's ``voice_states``."""
+    return {
+        "nick": nick or user["global_name"],
+        "mute": mute,
+        "volume": volume,
+        "pan": {"left": 1.0, "right": 1.0},
+        "voice_state": {
+            "mute": False,
+            "deaf": False,
+            "self_mute": False,
+            "self_deaf": False,
+            "suppress": False,
+        },
+        "user": user,
+    }
+
+
+def make_channel(
+    channel_id: str, name: str, guild_id: str = "1200000000000000001", members: int = 0
+) -> dict:
+    """A voice channel with ``members`` generated users in it."""
+    voice_states = [
+        make_voice_state(make_user(str(1300000000000000000 + i), f"member{i}"))
+        for i in range(members)
+    ]
+    return {
+        "id": channel_id,
+        "guild_id": guild_id,
+        "name": name,
+        "type": 2,
+        "topic": "",
+        "bitrate": 64000,
+        "user_limit": 0,
+        "position": 0,
+        "messages": [],
+        "voice_states": voice_states,
+    }
+
+
+def default_voice_settings() -> dict:
+    device = {"id": "default", "name": "Default"}
+    return {
+        "input": {"available_devices": [device], "device_id": "default", "volume": 100.0},
+        "output": {"available_devices": [device], "device_id": "default", "volume": 100.0},
+        "mode": {
+            "type": "VOICE_ACTIVITY",
+            "auto_threshold": True,
+            "threshold": -60,
+            "shortcut": [],
+            "delay": 20,
+        },
+        "automatic_gain_control": True,
+        "echo_cancellation": True,
+        "noise_suppression": True,
+        "qos": False,
+        "silence_warning": True,
+        "deaf": False,
+        "mute": False,
+    }
+
+
+class ClientConnection:
+    """One connected client: its socket, decoder and subscriptions."""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.decoder = FrameDecoder()
+        self.lock = threading.Lock()
+        self.handshaken = False
+        self.authenticated = False
+        self.subscriptions: set[tuple] = set()  # (evt, channel_id or None)
+        self.closed = False
+
+    def send(self, op: int, payload) -> bool:
+        return self.send_raw(encode_frame(payload, op))
+
+    def send_raw(self, data: bytes) -> bool:
+        with self.lock:
+            if self.closed:
+                return False
+            try:
+                self.sock.sendall(data)
+                return True
+            except OSError:
+                self.closed = True
+                return False
+
+    def wants(self, evt: str, channel_id: str = None) -> bool:
+        return (evt, None) in self.subscriptions or (evt, channel_id) in self.subscriptions
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class EventStream:
+    """A scripted DISPATCH stream running on its own thread."""
+
+    def __init__(self, server: "MockDiscord", events, rate: float, count: int, force: bool):
+        self._server = server
+        self._events = events
+        self.rate = rate
+        self.count = count
+        self.force = force
+        self.sent = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="mock-discord-stream", daemon=True)
+
+    def _next_event(self, index: int):
+        if callable(self._events):
+            return self._events(index)
+        return self._events[index % len(self._events)]
+
+    def _run(self):
+        start = time.perf_counter()
+        while not self._stop.is_set() and self.sent < self.count:
+            if self.rate:
+                # Send whatever is due by now in one write, then sleep until the next one
+                due = min(self.count, int((time.perf_counter() - start) * self.rate) + 1)
+            else:
+                due = min(self.count, self.sent + 64)
+            frames = []
+            for index in range(self.sent, due):
+                evt, data = self._next_event(index)
+                frames.append((evt, data))
+            self._server.dispatch_many(frames, force=self.force)
+            self.sent = due
+            if self.rate and self.sent < self.count:
+                next_at = start + self.sent / self.rate
+                self._stop.wait(max(0, next_at - time.perf_counter()))
+
+    def start(self) -> "EventStream":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def join(self, timeout: float = None):
+        self._thread.join(timeout)
+
+
+class MockDiscord:
+    """Discord IPC server stand-in for tests and benchmarks.
+
+    Every frame a client sends is recorded in ``received`` as ``(op,
+    payload)``. ``voice_settings``, ``channels`` and ``selected_channel_id``
+    hold the state commands read and change; setting voice or per-user
+    settings, or selecting a channel, emits the matching DISPATCH event to
+    subscribed clients just like Discord does. ``replies`` overrides the
+    answer to a command with a fixed ``data`` or a callable taking the
+    request's args. Use it as a context manager, or call ``start`` and
+    ``stop``.
+    """
+
+    def __init__(self, index: int = 0, runtime_dir: str = None, reply_delay: float = 0):
+        self.index = index
+        self._own_dir = runtime_dir is None
+        self.runtime_dir = runtime_dir or tempfile.mkdtemp(prefix="mock-discord-")
+        self.path = os.path.join(self.runtime_dir, f"discord-ipc-{index}")
+        self.reply_delay = reply_delay
+        self.user = make_user("1000000000000000001", "streamer")
+        self.voice_settings = default_voice_settings()
+        self.channels: dict[str, dict] = {}
+        self.selected_channel_id: str = None
+        self.valid_tokens: set[str] = None  # None accepts any access token
+        self.replies: dict[str, object] = {}
+        self.received: list[tuple[int, dict]] = []
+        self.pongs = 0
+        self._clients: list[ClientConnection] = []
+        self._lock = threading.Lock()
+        self._server: socket.socket = None
+        self._threads: list[threading.Thread] = []
+        self._previous_env: str = None
+        self._codes = itertools.count(1)
+
+    # Lifecycle
+
+    def start(self) -> "MockDiscord":
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.path)
+        self._server.listen(8)
+        self._previous_env = os.environ.get("XDG_RUNTIME_DIR")
+        os.environ["XDG_RUNTIME_DIR"] = self.runtime_dir
+        self._spawn(self._accept_loop, "mock-discord-accept")
+        return self
+
+    def stop(self):
+        """Close every connection and remove the socket."""
+        if self._server is not None:
+            try:
+                self._server.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._server.close()
+            self._server = None
+        for client in self.clients():
+            client.close()
+        for thread in self._threads:
+            thread.join(1)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        if self._previous_env is None:
+            os.environ.pop("XDG_RUNTIME_DIR", None)
+        else:
+            os.environ["XDG_RUNTIME_DIR"] = self._previous_env
+        if self._own_dir:
+            shutil.rmtree(self.runtime_dir, ignore_errors=True)
+
+    def __enter__(self) -> "MockDiscord":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _spawn(self, target, name: str, *args):
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def clients(self) -> list[ClientConnection]:
+        with self._lock:
+            return [client for client in self._clients if not client.closed]
+
+    def wait_for_client(self, timeout: float = 5, authenticated: bool = False) -> ClientConnection:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            for client in self.clients():
+                if client.handshaken and (client.authenticated or not authenticated):
+                    return client
+            time.sleep(0.005)
+        raise TimeoutError("no client connected to the mock Discord server")
+
+    def commands(self, cmd: str) -> list[dict]:
+        """Every OP_FRAME payload received for ``cmd``, in order."""
+        return [payload for op, payload in list(self.received) if op == OP_FRAME and payload.get("cmd") == cmd]
+
+    def wait_for_command(self, cmd: str, count: int = 1, timeout: float = 5) -> list[dict]:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            received = self.commands(cmd)
+            if len(received) >= count:
+                return received
+            time.sleep(0.005)
+        raise TimeoutError(f"expected {count} {cmd} command(s), got {len(self.commands(cmd))}")
+
+    # Voice channel state
+
+    def add_channel(self, channel: dict) -> dict:
+        self.channels[channel["id"]] = channel
+        return channel
+
+    def select_channel(self, channel_id: str = None):
+        """Move the user to ``channel_id`` (None leaves) and dispatch VOICE_CHANNEL_SELECT."""
+        self.selected_channel_id = channel_id
+        guild_id = self.channels[channel_id]["guild_id"] if channel_id else None
+        self.dispatch(
+            commands.VOICE_CHANNEL_SELECT, {"channel_id": channel_id, "guild_id": guild_id}
+        )
+
+    def join(self, channel_id: str, voice_state: dict):
+        """Add a member to a channel and dispatch VOICE_STATE_CREATE."""
+        self.channels[channel_id]["voice_states"].append(voice_state)
+        self.dispatch(commands.VOICE_STATE_CREATE, voice_state, channel_id)
+
+    def leave(self, channel_id: str, user_id: str):
+        """Remove a member from a channel and dispatch VOICE_STATE_DELETE."""
+        channel = self.channels[channel_id]
+        for voice_state in channel["voice_states"]:
+            if voice_state["user"]["id"] == user_id:
+                channel["voice_states"].remove(voice_state)
+                self.dispatch(commands.VOICE_STATE_DELETE, voice_state, channel_id)
+                return
+
+    def _find_voice_state(self, user_id: str) -> tuple[str, dict]:
+        for channel_id, channel in self.channels.items():
+            for voice_state in channel["voice_states"]:
+                if voice_state["user"]["id"] == user_id:
+                    return channel_id, voice_state
+        return None, None
+
+    # Outgoing frames
+
+    def dispatch(self, evt: str, data, channel_id: str = None, force: bool = False) -> int:
+        """Send one DISPATCH event; returns the number of clients it reached."""
+        return self.dispatch_many([(evt, data)], channel_id, force)
+
+    def dispatch_many(self, events: list, channel_id: str = None, force: bool = False) -> int:
+        """Send several DISPATCH events in a single write per client.
+
+        Only clients subscribed to an event receive it unless ``force`` is
+        set. ``channel_id`` scopes per-channel subscriptions.
+        """
+        reached = 0
+        for client in self.clients():
+            frames = [
+                encode_frame({"cmd": commands.DISPATCH, "evt": evt, "data": data, "nonce": None}, OP_FRAME)
+                for evt, data in events
+                if force or client.wants(evt, channel_id)
+            ]
+            if frames and client.send_raw(b"".join(frames)):
+                reached += 1
+        return reached
+
+    def stream(self, events, rate: float = None, count: int = 1000, force: bool = False) -> EventStream:
+        """Emit ``count`` DISPATCH events at ``rate`` per second (None: as fast as possible).
+
+        ``events`` is a list of ``(evt, data)`` pairs used round robin, or a
+        callable returning the pair for a given index.
+        """
+        return EventStream(self, events, rate, count, force).start()
+
+    def ping(self, payload: dict = None):
+        for client in self.clients():
+            client.send(OP_PING, payload or {})
+
+    def close_clients(self, code: int = ERROR_UNKNOWN, message: str = "Closed by mock server"):
+        """Send OP_CLOSE to every client and drop the connections."""
+        for client in self.clients():
+            client.send(OP_CLOSE, {"code": code, "message": message})
+            client.close()
+
+    def drop_clients(self):
+        """Drop every connection without a word, like a crashing Discord."""
+        for client in self.clients():
+            client.close()
+
+    # Incoming frames
+
+    def _accept_loop(self):
+        while True:
+            try:
+                sock, _ = self._server.accept()
+            except OSError:
+                return
+            client = ClientConnection(sock)
+            with self._lock:
+                self._clients.append(client)
+            self._spawn(self._client_loop, "mock-discord-client", client)
+
+    def _client_loop(self, client: ClientConnection):
+        try:
+            while not client.closed:
+                data = client.sock.recv(65536)
+                if not data:
+                    break
+                for op, body in client.decoder.feed(data):
+                    payload = codec.loads(body) if body else {}
+                    self.received.append((op, payload))
+                    if not self._handle(client, op, payload):
+                        return
+        except OSError:
+            pass
+        finally:
+            client.close()
+
+    def _handle(self, client: ClientConnection, op: int, payload: dict) -> bool:
+        if op == OP_HANDSHAKE:
+            if not payload.get("client_id"):
+                client.send(OP_CLOSE, {"code": CLOSE_INVALID_CLIENT_ID, "message": "Invalid Client ID"})
+                return False
+            client.handshaken = True
+            client.send(OP_FRAME, {
+                "cmd": commands.DISPATCH,
+                "evt": "READY",
+                "data": {
+                    "v": 1,
+                    "config": {
+                        "cdn_host": "cdn.discordapp.com",
+                        "api_endpoint": "//discord.com/api",
+                        "environment": "production",
+                    },
+                    "user": self.user,
+                },
+                "nonce": None,
+            })
+        elif op == OP_PING:
+            client.send(OP_PONG, payload)
+        elif op == OP_PONG:
+            self.pongs += 1
+        elif op == OP_CLOSE:
+            return False
+        elif op == OP_FRAME:
+            if self.reply_delay:
+                threading.Timer(self.reply_delay, self._reply, (client, payload)).start()
+            else:
+                self._reply(client, payload)
+        return True
+
+    def _reply(self, client: ClientConnection, payload: dict):
+        cmd = payload.get("cmd")
+        args = payload.get("args") or {}
+        reply = {"cmd": cmd, "evt": None, "nonce": payload.get("nonce")}
+        followups = []
+        try:
+            if cmd in self.replies:
+                override = self.replies[cmd]
+                data = override(args) if callable(override) else override
+            else:
+                data, followups = self._answer(client, cmd, args, payload.get("evt"))
+        except RPCFailure as failure:
+            reply["evt"] = "ERROR"
+            data = {"code": failure.code, "message": failure.message}
+        reply["data"] = data
+        client.send(OP_FRAME, reply)
+        for evt, event_data, channel_id in followups:
+            self.dispatch(evt, event_data, channel_id)
+
+    def _answer(self, client: ClientConnection, cmd: str, args: dict, evt: str):
+        """Discord's answer to ``cmd``: the reply data plus events it causes."""
+        if cmd == commands.AUTHORIZE:
+            return {"code": f"mock-code-{next(self._codes)}"}, []
+        if cmd == commands.AUTHENTICATE:
+            token = args.get("access_token")
+            if not token or (self.valid_tokens is not None and token not in self.valid_tokens):
+                raise RPCFailure(ERROR_INVALID_TOKEN, "Invalid access token")
+            client.authenticated = True
+            expires = datetime.now(timezone.utc) + timedelta(days=7)
+            return {
+                "application": APPLICATION,
+                "expires": expires.isoformat(),
+                "user": self.user,
+                "scopes": ["rpc", "identify"],
+            }, []
+        if not client.authenticated:
+            raise RPCFailure(ERROR_NOT_AUTHENTICATED, "Not authenticated or invalid scope")
+
+        if cmd == commands.SUBSCRIBE:
+            client.subscriptions.add((evt, (args or {}).get("channel_id")))
+            return {"evt": evt}, []
+        if cmd == commands.UNSUBSCRIBE:
+            client.subscriptions.discard((evt, (args or {}).get("channel_id")))
+            return {"evt": evt}, []
+        if cmd == commands.GET_VOICE_SETTINGS:
+            return self.voice_settings, []
+        if cmd == commands.SET_VOICE_SETTINGS:
+            for key, value in args.items():
+                if isinstance(value, dict) and isinstance(self.voice_settings.get(key), dict):
+                    self.voice_settings[key].update(value)
+                else:
+                    self.voice_settings[key] = value
+            return self.voice_settings, [(commands.VOICE_SETTINGS_UPDATE, self.voice_settings, None)]
+        if cmd == commands.GET_SELECTED_VOICE_CHANNEL:
+            return self.channels.get(self.selected_channel_id), []
+        if cmd == commands.GET_CHANNEL:
+            channel = self.channels.get(args.get("channel_id"))
+            if channel is None:
+                raise RPCFailure(ERROR_INVALID_CHANNEL, f"Invalid channel id: {args.get('channel_id')}")
+            return channel, []
+        if cmd == commands.SELECT_VOICE_CHANNEL:
+            channel_id = args.get("channel_id")
+            if channel_id is not None and channel_id not in self.channels:
+                raise RPCFailure(ERROR_INVALID_CHANNEL, f"Invalid channel id: {channel_id}")
+            self.selected_channel_id = channel_id
+            guild_id = self.channels[channel_id]["guild_id"] if channel_id else None
+            return self.channels.get(channel_id), [
+                (commands.VOICE_CHANNEL_SELECT, {"channel_id": channel_id, "guild_id": guild_id}, None)
+            ]
+        if cmd == commands.SELECT_TEXT_CHANNEL:
+            return {"id": args.get("channel_id"), "name": "general", "type": 0}, []
+        if cmd == commands.SET_USER_VOICE_SETTINGS:
+            channel_id, voice_state = self._find_voice_state(args.get("user_id"))
+            settings = {
+                "user_id": args.get("user_id"),
+                "pan": {"left": 1.0, "right": 1.0},
+                "volume": 100,
+                "mute": False,
+            }
+            if voice_state is not None:
+                for key in ("volume", "mute", "pan"):
+                    if key in args:
+                        voice_state[key] = args[key]
+                settings.update({key: voice_state[key] for key in ("volume", "mute", "pan")})
+                return settings, [(commands.VOICE_STATE_UPDATE, voice_state, channel_id)]
+            settings.update({key: args[key] for key in ("volume", "mute", "pan") if key in args})
+            return settings, []
+        raise RPCFailure(ERROR_INVALID_COMMAND, f"Invalid command: {cmd}")
+
+
+class RPCFailure(Exception):
+    """Raised while answering a command to reply with an ERROR frame."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
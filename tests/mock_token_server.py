@@ -0,0 +1,125 @@
+"""A stand-in for Discord's OAuth2 token endpoint.
+
+``MockTokenServer`` serves ``POST /api/oauth2/token`` on a local port and
+answers ``authorization_code`` and ``refresh_token`` grants the way Discord
+does. Issued access tokens are added to ``discord.valid_tokens`` when a
+``MockDiscord`` is given, so they pass AUTHENTICATE there. Point the backend
+at it through ``DISCORD_RPC_TOKEN_URL``, or hand ``url`` to ``TokenManager``.
+"""
+
+import itertools
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from discordrpc import codec
+
+from .mock_discord import MockDiscord
+
+TOKEN_PATH = "/api/oauth2/token"
+
+
+class MockTokenServer:
+    """Issues ``access-<n>``/``refresh-<n>`` token pairs.
+
+    Only the latest refresh token is accepted. Set ``fail`` to answer every
+    grant with ``invalid_grant``, and ``expires_in`` to change the lifetime
+    reported. ``requests`` records each grant's form fields, in order.
+    """
+
+    def __init__(self, discord: MockDiscord = None, expires_in: int = 604800):
+        self.discord = discord
+        self.expires_in = expires_in
+        self.fail = False
+        self.refresh_token: str = None
+        self.requests: list[dict] = []
+        self._serial = itertools.count(1)
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._server: ThreadingHTTPServer = None
+        self._thread: threading.Thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{TOKEN_PATH}"
+
+    def start(self) -> "MockTokenServer":
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                form = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode()).items()}
+                status, body = server._grant(self.path, form)
+                payload = codec.dumps(body)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="mock-token-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._thread is not None:
+            self._thread.join(1)
+
+    def __enter__(self) -> "MockTokenServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def issue(self) -> dict:
+        """A new token pair, as the endpoint would return it."""
+        serial = next(self._serial)
+        self.refresh_token = f"refresh-{serial}"
+        if self.discord is not None and self.discord.valid_tokens is not None:
+            self.discord.valid_tokens.add(f"access-{serial}")
+        return {
+            "access_token": f"access-{serial}",
+            "token_type": "Bearer",
+            "expires_in": self.expires_in,
+            "refresh_token": self.refresh_token,
+            "scope": "rpc identify",
+        }
+
+    def grants(self, grant_type: str) -> list[dict]:
+        with self._lock:
+            return [form for form in self.requests if form.get("grant_type") == grant_type]
+
+    def wait_for_grant(self, grant_type: str, count: int = 1, timeout: float = 5) -> list[dict]:
+        with self._changed:
+            self._changed.wait_for(
+                lambda: sum(form.get("grant_type") == grant_type for form in self.requests) >= count,
+                timeout,
+            )
+        return self.grants(grant_type)
+
+    def _grant(self, path: str, form: dict) -> tuple[int, dict]:
+        with self._changed:
+            self.requests.append(form)
+            self._changed.notify_all()
+            if path != TOKEN_PATH:
+                return 404, {"message": "404: Not Found"}
+            grant_type = form.get("grant_type")
+            if self.fail:
+                return 400, {"error": "invalid_grant"}
+            if grant_type == "authorization_code" and form.get("code"):
+                return 200, self.issue()
+            if grant_type == "refresh_token" and form.get("refresh_token") == self.refresh_token:
+                return 200, self.issue()
+            return 400, {"error": "invalid_grant"}
@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+from discordrpc import DiscordNotOpened
+from discordrpc.aiodiscord import AioDiscordClient
+from discordrpc.exceptions import RPCException
+
+from .mock_discord import MockDiscord
+
+
+def open_fds() -> int:
+    return len(os.listdir("/proc/self/fd"))
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc")
+def test_failed_connects_do_not_leak_loops(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    before = open_fds()
+    for _ in range(50):
+        client = AioDiscordClient("client-id", "secret")
+        with pytest.raises(DiscordNotOpened):
+            client.connect(lambda code, frame: None)
+        client.disconnect()
+        assert client._loop.is_closed()
+    assert open_fds() <= before + 2
+
+
+def test_commands_fail_while_disconnected():
+    client = AioDiscordClient("client-id", "secret")
+    try:
+        with pytest.raises(RPCException, match="not connected"):
+            client.get_selected_voice_channel().result(5)
+    finally:
+        client.disconnect()
+    with pytest.raises(RPCException, match="not connected"):
+        client.get_selected_voice_channel().result(5)
+
+
+def test_disconnect_closes_the_loop():
+    with MockDiscord():
+        client = AioDiscordClient("client-id", "secret")
+        client.connect(lambda code, frame: None)
+        client.disconnect()
+    assert not client._thread.is_alive()
+    assert client._loop.is_closed()
@@ -0,0 +1,161 @@
+import time
+
+import pytest
+
+from discordrpc import commands
+from roster import DUCK_STATE
+
+from .backend_stub import StubFrontend, make_backend
+from .mock_discord import MockDiscord, make_channel, make_user, make_voice_state
+
+MEMBERS = [str(1300000000000000000 + i) for i in range(3)]
+
+
+@pytest.fixture
+def discord():
+    with MockDiscord() as server:
+        server.add_channel(make_channel("2000", "Lounge", members=3))
+        yield server
+
+
+def connect(discord: MockDiscord):
+    frontend = StubFrontend()
+    backend = make_backend(frontend)
+    backend.update_client_credentials("client-id", "secret", "token")
+    assert frontend.authed.wait(5)
+    discord.wait_for_client(authenticated=True)
+    return backend, frontend
+
+
+@pytest.fixture
+def connected(discord):
+    backend, frontend = connect(discord)
+    yield backend, frontend
+    backend.close()
+
+
+@pytest.fixture
+def in_channel(discord):
+    discord.selected_channel_id = "2000"
+    backend, frontend = connect(discord)
+    frontend.wait_for(commands.VOICE_CHANNEL_SELECT)
+    yield backend, frontend
+    backend.close()
+
+
+def volumes(discord: MockDiscord, channel_id: str = "2000") -> dict[str, int]:
+    return {
+        voice_state["user"]["id"]: voice_state["volume"]
+        for voice_state in discord.channels[channel_id]["voice_states"]
+    }
+
+
+def wait_for_volumes(discord: MockDiscord, expected: dict[str, int], timeout: float = 5) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        current = volumes(discord)
+        if all(current.get(user_id) == volume for user_id, volume in expected.items()):
+            break
+        time.sleep(0.01)
+    return volumes(discord)
+
+
+def wait_for_subscription(discord: MockDiscord, evt: str, channel_id: str, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        for payload in discord.commands(commands.SUBSCRIBE):
+            if payload.get("evt") == evt and (payload.get("args") or {}).get("channel_id") == channel_id:
+                return
+        time.sleep(0.01)
+    raise AssertionError(f"never subscribed to {evt} for {channel_id}")
+
+
+def test_selected_channel_at_startup_loads_the_roster(discord):
+    discord.selected_channel_id = "2000"
+    backend, frontend = connect(discord)
+    try:
+        selected = frontend.wait_for(commands.VOICE_CHANNEL_SELECT)
+        assert selected == {"channel_id": "2000", "guild_id": "1200000000000000001", "name": "Lounge"}
+        assert backend.current_voice_channel == "2000"
+        assert len(backend.get_voice_channel_users()) == 3
+    finally:
+        backend.close()
+
+
+def test_not_in_a_channel_at_startup(connected):
+    backend, frontend = connected
+    selected = frontend.wait_for(commands.VOICE_CHANNEL_SELECT)
+    assert selected["channel_id"] is None
+    assert backend.get_voice_channel_users() == {}
+
+
+def test_voice_settings_are_fetched_after_authenticating(discord):
+    discord.voice_settings["mute"] = True
+    backend, frontend = connect(discord)
+    try:
+        settings = frontend.wait_for(commands.VOICE_SETTINGS_UPDATE)
+        assert settings["mute"] is True
+        assert len(discord.commands(commands.GET_VOICE_SETTINGS)) == 1
+    finally:
+        backend.close()
+
+
+def test_duck_without_a_channel(connected):
+    backend, frontend = connected
+    frontend.wait_for(commands.VOICE_CHANNEL_SELECT)
+    assert backend.duck_users(20) is False
+    assert not backend.is_ducking()
+
+
+def test_duck_fetches_the_channel_members(discord, in_channel):
+    backend, _ = in_channel
+    # Nothing asked for GET_CHANNEL yet, so only the reply knows who is here
+    assert backend.duck_users(20, exclude=[MEMBERS[2]])
+    assert backend.is_ducking()
+    expected = {MEMBERS[0]: 20, MEMBERS[1]: 20, MEMBERS[2]: 100}
+    assert wait_for_volumes(discord, expected) == expected
+
+    assert backend.restore_ducked()
+    assert not backend.is_ducking()
+    expected = dict.fromkeys(MEMBERS, 100)
+    assert wait_for_volumes(discord, expected) == expected
+
+
+def test_duck_state_changes_are_published(in_channel):
+    backend, frontend = in_channel
+    backend.add_event_interest(DUCK_STATE)
+    assert backend.duck_users(20)
+    assert frontend.wait_for(DUCK_STATE) == {"ducking": True}
+    # Ducking again changes nothing, so nothing is sent
+    assert backend.duck_users(30)
+    assert backend.restore_ducked()
+    assert frontend.wait_for(DUCK_STATE, lambda data: not data["ducking"]) == {"ducking": False}
+    assert [data for event, data in frontend.events if event == DUCK_STATE] == [
+        {"ducking": True},
+        {"ducking": False},
+    ]
+
+
+def test_duck_with_everyone_excluded_is_not_ducking(in_channel):
+    backend, _ = in_channel
+    assert backend.duck_users(20, exclude=MEMBERS)
+    assert not backend.is_ducking()
+
+
+def test_volume_set_while_ducked_is_kept(discord, in_channel):
+    backend, _ = in_channel
+    assert backend.duck_users(20)
+    wait_for_volumes(discord, dict.fromkeys(MEMBERS, 20))
+    assert backend.set_user_volume(MEMBERS[0], 80)
+    wait_for_volumes(discord, {MEMBERS[0]: 80})
+
+    # A newcomer is ducked, without ducking the hand-set user again
+    wait_for_subscription(discord, commands.VOICE_STATE_CREATE, "2000")
+    newcomer = make_user("1400000000000000001", "newcomer")
+    discord.join("2000", make_voice_state(newcomer))
+    expected = {MEMBERS[0]: 80, MEMBERS[1]: 20, MEMBERS[2]: 20, newcomer["id"]: 20}
+    assert wait_for_volumes(discord, expected) == expected
+
+    assert backend.restore_ducked()
+    expected = {MEMBERS[0]: 80, MEMBERS[1]: 100, MEMBERS[2]: 100, newcomer["id"]: 100}
+    assert wait_for_volumes(discord, expected) == expected
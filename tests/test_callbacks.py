@@ -0,0 +1,138 @@
+import gc
+import tracemalloc
+import weakref
+from collections import Counter
+
+from callbacks import CallbackRegistry, EventRouter
+
+ROSTER_UPDATE = "ROSTER_UPDATE"
+VOICE_CHANNEL_SELECT = "VOICE_CHANNEL_SELECT"
+
+
+class Interest:
+    """Counts on_first/on_empty calls per key, as the backend's interest does."""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.emptied = Counter()
+
+    def first(self, key):
+        self.counts[key] += 1
+
+    def empty(self, key):
+        self.emptied[key] += 1
+        self.counts[key] -= 1
+        if not self.counts[key]:
+            del self.counts[key]
+
+
+class Action:
+    """Moves its routed callback to each channel it joins, like UserVolume."""
+
+    def __init__(self, callbacks: CallbackRegistry, router: EventRouter):
+        self.callbacks = callbacks
+        self.router = router
+        self.channel_id = None
+        self.received = 0
+        callbacks.add(VOICE_CHANNEL_SELECT, self.on_select)
+
+    def on_select(self, data):
+        self.join(data["channel_id"])
+
+    def on_roster(self, data):
+        self.received += 1
+
+    def join(self, channel_id: str):
+        # Added before the old route goes, as DiscordCore.set_event_scope does
+        self.router.add(ROSTER_UPDATE, channel_id, self.on_roster)
+        if self.channel_id is not None:
+            self.router.remove(ROSTER_UPDATE, self.channel_id, self.on_roster)
+        self.channel_id = channel_id
+
+
+def make_registries(interest: Interest) -> tuple[CallbackRegistry, EventRouter]:
+    callbacks = CallbackRegistry(on_first=interest.first, on_empty=interest.empty)
+    router = EventRouter(
+        {ROSTER_UPDATE: lambda data: data.get("channel_id")},
+        on_first=interest.first,
+        on_empty=interest.empty,
+    )
+    return callbacks, router
+
+
+def join_channels(callbacks: CallbackRegistry, router: EventRouter, start: int, count: int):
+    for channel in range(start, start + count):
+        for callback in callbacks.get(VOICE_CHANNEL_SELECT):
+            callback({"channel_id": str(channel)})
+        router.dispatch(ROSTER_UPDATE, {"channel_id": str(channel)})
+
+
+def test_joining_channels_keeps_one_handler_per_action():
+    interest = Interest()
+    callbacks, router = make_registries(interest)
+    actions = [Action(callbacks, router) for _ in range(4)]
+
+    join_channels(callbacks, router, 0, 1000)
+
+    assert callbacks.count(VOICE_CHANNEL_SELECT) == 4
+    assert router.events() == [ROSTER_UPDATE]
+    assert router._scope_counts == {ROSTER_UPDATE: 1}
+    assert list(router._callbacks) == [(ROSTER_UPDATE, "999")]
+    assert interest.counts == {VOICE_CHANNEL_SELECT: 1, ROSTER_UPDATE: 1}
+    assert all(action.received == 1000 for action in actions)
+
+
+def test_moving_channels_keeps_interest():
+    interest = Interest()
+    callbacks, router = make_registries(interest)
+    action = Action(callbacks, router)
+    action.join("1")
+
+    join_channels(callbacks, router, 2, 100)
+
+    # Interest never dropped to zero, so the backend never unsubscribed
+    assert not interest.emptied
+    assert interest.counts[ROSTER_UPDATE] == 1
+    assert action.received == 100
+
+
+def test_joining_channels_does_not_grow_memory():
+    interest = Interest()
+    callbacks, router = make_registries(interest)
+    actions = [Action(callbacks, router) for _ in range(4)]
+    # Warm up so interned strings and dict resizes aren't counted
+    join_channels(callbacks, router, 0, 100)
+    gc.collect()
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        join_channels(callbacks, router, 100, 1000)
+        gc.collect()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    growth = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    assert growth < 16 * 1024, f"{growth} bytes retained after 1,000 channel joins"
+    assert len(actions) == 4
+
+
+def test_dropped_actions_release_their_handlers():
+    interest = Interest()
+    callbacks, router = make_registries(interest)
+    actions = [Action(callbacks, router) for _ in range(4)]
+    join_channels(callbacks, router, 0, 1000)
+    refs = [weakref.ref(action) for action in actions]
+
+    # Actions going away without unregistering must not be kept alive
+    del actions
+    gc.collect()
+    assert all(ref() is None for ref in refs)
+
+    assert callbacks.get(VOICE_CHANNEL_SELECT) == []
+    router.dispatch(ROSTER_UPDATE, {"channel_id": "999"})
+    assert list(callbacks) == []
+    assert list(router._callbacks) == []
+    assert router.events() == []
+    assert not interest.counts
@@ -0,0 +1,60 @@
+import threading
+import time
+
+from event_batcher import EventBatcher
+
+
+class Sink:
+    def __init__(self):
+        self.batches = []
+        self._changed = threading.Condition()
+
+    def __call__(self, events):
+        with self._changed:
+            self.batches.append(events)
+            self._changed.notify_all()
+
+    def wait_for(self, count: int, timeout: float = 5) -> list:
+        with self._changed:
+            self._changed.wait_for(lambda: len(self.batches) >= count, timeout)
+        return self.batches
+
+
+def test_event_after_idle_is_delivered_at_once():
+    sink = Sink()
+    batcher = EventBatcher(sink, window=1)
+    try:
+        start = time.monotonic()
+        batcher.add("A", b"1")
+        assert sink.wait_for(1) == [(("A", b"1"),)]
+        assert time.monotonic() - start < 0.5
+    finally:
+        batcher.close()
+
+
+def test_events_within_a_window_share_a_batch():
+    sink = Sink()
+    batcher = EventBatcher(sink, window=0.2)
+    try:
+        batcher.add("A", b"1")
+        sink.wait_for(1)
+        batcher.add("B", b"1", key="b")
+        batcher.add("C", b"1")
+        batcher.add("B", b"2", key="b")
+        batches = sink.wait_for(2)
+        assert batches[1] == (("C", b"1"), ("B", b"2"))
+        assert batcher.stats["events_collapsed"] == 1
+        assert batcher.stats["batches_sent"] == 2
+    finally:
+        batcher.close()
+
+
+def test_close_delivers_pending_events():
+    sink = Sink()
+    batcher = EventBatcher(sink, window=10)
+    batcher.add("A", b"1")
+    sink.wait_for(1)
+    batcher.add("B", b"1")
+    batcher.close()
+    assert sink.batches == [(("A", b"1"),), (("B", b"1"),)]
+    assert not batcher._thread.is_alive()
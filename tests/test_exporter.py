@@ -0,0 +1,43 @@
+import os
+import time
+
+from exporter import MetricsExporter
+
+
+def collect():
+    return {"frames_in": 3}, {"connected": 1}, {}
+
+
+def wait_for_file(path: str, timeout: float = 5) -> str:
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    with open(path, encoding="UTF-8") as f:
+        return f.read()
+
+
+def test_writes_metrics_file(tmp_path):
+    exporter = MetricsExporter(collect)
+    path = tmp_path / "discord.prom"
+    try:
+        exporter.configure(str(path))
+        text = wait_for_file(str(path))
+    finally:
+        exporter.close()
+    assert "discord_plugin_frames_in_total 3\n" in text
+    assert text.endswith("# EOF\n")
+
+
+def test_restart_right_after_stopping(tmp_path):
+    exporter = MetricsExporter(collect)
+    first, second = tmp_path / "first.prom", tmp_path / "second.prom"
+    try:
+        exporter.configure(str(first))
+        wait_for_file(str(first))
+        for _ in range(20):
+            exporter.configure("")
+            exporter.configure(str(second))
+        assert "# EOF" in wait_for_file(str(second))
+        assert exporter._thread.is_alive()
+    finally:
+        exporter.close()
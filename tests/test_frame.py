@@ -0,0 +1,33 @@
+import pytest
+
+from discordrpc import codec
+from discordrpc.frame import Frame
+
+OP_FRAME = 1
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        # A SUBSCRIBE reply echoes the event inside data, after a null evt
+        {"cmd": "SUBSCRIBE", "data": {"evt": "VOICE_STATE_CREATE"}, "evt": None, "nonce": "1"},
+        {"cmd": "SUBSCRIBE", "evt": None, "nonce": "1", "data": {"evt": "VOICE_STATE_CREATE"}},
+        # Only the nested key is there at all
+        {"cmd": "DISPATCH", "data": {"evt": "X"}},
+        {"cmd": "DISPATCH", "evt": 'quoted "name"', "nonce": None, "data": {"evt": "X"}},
+    ],
+)
+def test_envelope_ignores_nested_fields(payload):
+    frame = Frame(OP_FRAME, codec.dumps(payload))
+    assert frame.cmd == payload["cmd"]
+    assert frame.evt == payload.get("evt")
+    assert frame.nonce == payload.get("nonce")
+
+
+def test_envelope_is_scanned_without_parsing():
+    raw = codec.dumps(
+        {"cmd": "DISPATCH", "evt": "VOICE_STATE_UPDATE", "nonce": None, "data": {"user": {"id": "1"}}}
+    )
+    frame = Frame(OP_FRAME, raw)
+    assert (frame.cmd, frame.evt, frame.nonce) == ("DISPATCH", "VOICE_STATE_UPDATE", None)
+    assert not frame.parsed
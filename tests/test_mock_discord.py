@@ -0,0 +1,161 @@
+import struct
+import threading
+
+import pytest
+
+from discordrpc import AsyncDiscord, DiscordNotOpened, codec, commands
+from discordrpc.asyncdiscord import OP_FRAME, OP_HANDSHAKE, OP_PING, OP_PONG
+from discordrpc.exceptions import RPCError
+from discordrpc.sockets import SOCKET_DISCONNECTED, UnixPipe
+
+from .mock_discord import (
+    ERROR_NOT_AUTHENTICATED,
+    MockDiscord,
+    make_channel,
+    make_user,
+    make_voice_state,
+)
+
+
+class Recorder:
+    """Connection callback that collects frames and waits for them."""
+
+    def __init__(self):
+        self.frames = []
+        self.disconnected = threading.Event()
+        self._changed = threading.Condition()
+
+    def __call__(self, code, frame):
+        if code == SOCKET_DISCONNECTED:
+            self.disconnected.set()
+            return
+        with self._changed:
+            self.frames.append(frame)
+            self._changed.notify_all()
+
+    def events(self, evt: str) -> list:
+        return [frame for frame in self.frames if frame.cmd == commands.DISPATCH and frame.evt == evt]
+
+    def wait_for(self, evt: str, count: int = 1, timeout: float = 5) -> list:
+        with self._changed:
+            self._changed.wait_for(lambda: len(self.events(evt)) >= count, timeout)
+        return self.events(evt)
+
+
+@pytest.fixture
+def discord():
+    with MockDiscord() as server:
+        server.add_channel(make_channel("2000", "Lounge", members=3))
+        yield server
+
+
+@pytest.fixture
+def client(discord):
+    recorder = Recorder()
+    client = AsyncDiscord("client-id", "secret")
+    client.connect(recorder)
+    client.authenticate("token").result(5)
+    client.recorder = recorder
+    yield client
+    client.disconnect()
+
+
+def test_handshake_and_authenticate(discord, client):
+    handshake = discord.received[0]
+    assert handshake == (0, {"v": "1", "client_id": "client-id"})
+    assert discord.wait_for_client(authenticated=True)
+
+
+def test_commands_need_authentication(discord):
+    client = AsyncDiscord("client-id", "secret")
+    client.connect(Recorder())
+    try:
+        with pytest.raises(RPCError) as error:
+            client.get_selected_voice_channel().result(5)
+        assert str(ERROR_NOT_AUTHENTICATED) in str(error.value)
+    finally:
+        client.disconnect()
+
+
+def test_channel_replies(discord, client):
+    assert client.get_selected_voice_channel().result(5) is None
+    channel = client.get_channel("2000").result(5)
+    assert channel["name"] == "Lounge"
+    assert len(channel["voice_states"]) == 3
+    with pytest.raises(RPCError):
+        client.get_channel("404").result(5)
+
+
+def test_settings_changes_are_dispatched_to_subscribers(discord, client):
+    client.subscribe(commands.VOICE_SETTINGS_UPDATE).result(5)
+    settings = client.set_voice_settings({"mute": True}).result(5)
+    assert settings["mute"] is True
+    update = client.recorder.wait_for(commands.VOICE_SETTINGS_UPDATE)
+    assert update[0].data["mute"] is True
+
+
+def test_voice_state_events_are_scoped_by_channel(discord, client):
+    discord.add_channel(make_channel("3000", "Other"))
+    client.subscribe(commands.VOICE_STATE_CREATE, {"channel_id": "2000"}).result(5)
+    discord.join("3000", make_voice_state(make_user("9", "elsewhere")))
+    discord.join("2000", make_voice_state(make_user("8", "here")))
+    created = client.recorder.wait_for(commands.VOICE_STATE_CREATE)
+    assert [frame.data["user"]["id"] for frame in created] == ["8"]
+
+
+def test_user_volume_updates_the_member(discord, client):
+    member = discord.channels["2000"]["voice_states"][0]["user"]["id"]
+    reply = client.set_user_voice_settings(member, volume=40).result(5)
+    assert reply["volume"] == 40
+    assert discord.channels["2000"]["voice_states"][0]["volume"] == 40
+
+
+def test_scripted_stream(discord, client):
+    client.subscribe(commands.SPEAKING_START).result(5)
+    stream = discord.stream(
+        lambda i: (commands.SPEAKING_START, {"user_id": str(i)}), rate=2000, count=200
+    )
+    stream.join(5)
+    assert len(client.recorder.wait_for(commands.SPEAKING_START, 200)) == 200
+
+
+def test_ping_is_answered_with_pong(discord):
+    pipe = UnixPipe()
+    pipe.connect()
+    try:
+        pipe.send({"v": "1", "client_id": "client-id"}, OP_HANDSHAKE)
+        assert pipe.receive()[0] == OP_FRAME
+        pipe.send({"n": 1}, OP_PING)
+        op, body = pipe.receive()
+        assert (op, codec.loads(body)) == (OP_PONG, {"n": 1})
+    finally:
+        pipe.disconnect()
+
+
+def test_close_disconnects_the_client(discord, client):
+    discord.close_clients()
+    assert client.recorder.disconnected.wait(5)
+    assert not client.is_connected()
+
+
+def test_poll_loop_error_disconnects_the_client(discord, client):
+    def broken_filter(frame):
+        raise RuntimeError("boom")
+
+    client.frame_filter = broken_filter
+    discord.dispatch(commands.VOICE_SETTINGS_UPDATE, {}, force=True)
+    assert client.recorder.disconnected.wait(5)
+    assert not client.is_connected()
+
+
+def test_no_server(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    with pytest.raises(DiscordNotOpened):
+        AsyncDiscord("client-id", "secret").connect(Recorder())
+
+
+def test_corrupt_header_disconnects_the_client(discord, client):
+    for connection in discord.clients():
+        connection.send_raw(struct.pack("<ii", OP_FRAME, -1))
+    assert client.recorder.disconnected.wait(5)
+    assert not client.is_connected()
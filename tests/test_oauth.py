@@ -0,0 +1,129 @@
+import threading
+import time
+
+import pytest
+
+from discordrpc import commands
+from discordrpc.oauth import TokenManager
+
+from .backend_stub import StubFrontend, make_backend
+from .mock_discord import MockDiscord
+from .mock_token_server import MockTokenServer
+
+
+class TokenSink:
+    """``on_tokens`` callback that remembers the latest tokens."""
+
+    def __init__(self):
+        self.tokens = None
+        self.changed = threading.Event()
+
+    def __call__(self, access_token, refresh_token, expires_at):
+        self.tokens = (access_token, refresh_token, expires_at)
+        self.changed.set()
+
+
+@pytest.fixture
+def token_server():
+    with MockTokenServer() as server:
+        server.refresh_token = "refresh-0"
+        yield server
+
+
+@pytest.fixture
+def discord(token_server):
+    with MockDiscord() as server:
+        server.valid_tokens = {"good"}
+        token_server.discord = server
+        yield server
+
+
+def make_manager(token_server: MockTokenServer, sink: TokenSink, margin: float = 300) -> TokenManager:
+    return TokenManager("client-id", "secret", sink, token_url=token_server.url, margin=margin)
+
+
+def test_refresh_is_scheduled_before_expiry(token_server):
+    sink = TokenSink()
+    manager = make_manager(token_server, sink, margin=60)
+    try:
+        manager.set_tokens("access-0", "refresh-0", time.time() + 60.2)
+        assert token_server.wait_for_grant("refresh_token") == [
+            {"grant_type": "refresh_token", "refresh_token": "refresh-0", "client_id": "client-id", "client_secret": "secret"}
+        ]
+        assert sink.changed.wait(5)
+        access_token, refresh_token, expires_at = sink.tokens
+        assert (access_token, refresh_token) == ("access-1", "refresh-1")
+        assert expires_at > time.time() + token_server.expires_in - 60
+        assert manager.stats["token_refreshes"] == 1
+    finally:
+        manager.close()
+
+
+def test_failed_refresh_keeps_the_tokens(token_server):
+    token_server.fail = True
+    sink = TokenSink()
+    manager = make_manager(token_server, sink)
+    try:
+        manager.set_tokens("access-0", "refresh-0")
+        with pytest.raises(Exception, match="invalid_grant"):
+            manager.refresh().result(5)
+        assert manager.stats["token_refreshes_failed"] == 1
+        assert (manager.access_token, manager.refresh_token) == ("access-0", "refresh-0")
+        assert sink.tokens is None
+    finally:
+        manager.close()
+
+
+def connect(token_server: MockTokenServer, monkeypatch, access_token: str, refresh_token: str):
+    monkeypatch.setenv("DISCORD_RPC_TOKEN_URL", token_server.url)
+    frontend = StubFrontend()
+    backend = make_backend(frontend)
+    backend.update_client_credentials("client-id", "secret", access_token, refresh_token)
+    return backend, frontend
+
+
+def test_rejected_token_is_refreshed(discord, token_server, monkeypatch):
+    backend, frontend = connect(token_server, monkeypatch, "stale", "refresh-0")
+    try:
+        assert frontend.authed.wait(5)
+        assert [form["refresh_token"] for form in token_server.grants("refresh_token")] == ["refresh-0"]
+        assert [args["args"]["access_token"] for args in discord.commands(commands.AUTHENTICATE)] == [
+            "stale",
+            "access-1",
+        ]
+        assert frontend.settings["access_token"] == "access-1"
+        assert frontend.settings["refresh_token"] == "refresh-1"
+        assert discord.commands(commands.AUTHORIZE) == []
+    finally:
+        backend.close()
+
+
+def test_rejected_token_without_refresh_token_authorizes(discord, token_server, monkeypatch):
+    backend, frontend = connect(token_server, monkeypatch, "stale", "")
+    try:
+        assert frontend.authed.wait(5)
+        assert len(discord.commands(commands.AUTHORIZE)) == 1
+        assert token_server.grants("refresh_token") == []
+        assert [form["code"] for form in token_server.grants("authorization_code")] == ["mock-code-1"]
+        assert frontend.settings["access_token"] == "access-1"
+        time.sleep(0.5)
+        assert len(discord.commands(commands.AUTHENTICATE)) == 2
+    finally:
+        backend.close()
+
+
+def test_failed_refresh_authorizes_once(discord, token_server, monkeypatch):
+    token_server.fail = True
+    backend, frontend = connect(token_server, monkeypatch, "stale", "refresh-0")
+    try:
+        discord.wait_for_command(commands.AUTHORIZE)
+        token_server.wait_for_grant("authorization_code")
+        time.sleep(0.5)
+        # The code exchange fails too; that is reported, not retried in a loop
+        assert len(discord.commands(commands.AUTHENTICATE)) == 1
+        assert len(discord.commands(commands.AUTHORIZE)) == 1
+        assert len(token_server.requests) == 2
+        assert frontend.settings["access_token"] == ""
+        assert not frontend.authed.is_set()
+    finally:
+        backend.close()
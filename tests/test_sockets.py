@@ -0,0 +1,77 @@
+import socket
+import struct
+
+import pytest
+
+from discordrpc.constants import MAX_FRAME_SIZE
+from discordrpc.sockets import (
+    FRAME_HEADER,
+    SOCKET_DISCONNECTED,
+    FrameDecoder,
+    FrameError,
+    UnixPipe,
+    encode_frame,
+)
+
+OP_FRAME = 1
+
+
+def frame(index: int) -> bytes:
+    return encode_frame({"cmd": "DISPATCH", "nonce": str(index)}, OP_FRAME)
+
+
+def body(index: int) -> bytes:
+    return frame(index)[FRAME_HEADER.size :]
+
+
+def test_header_split_across_reads():
+    decoder = FrameDecoder()
+    data = frame(1)
+    assert decoder.feed(data[:3]) == []
+    assert decoder.feed(data[3:6]) == []
+    assert decoder.feed(data[6:]) == [(OP_FRAME, body(1))]
+    assert decoder.pending() == 0
+
+
+def test_body_split_across_reads():
+    decoder = FrameDecoder()
+    data = frame(1)
+    assert decoder.feed(data[: FRAME_HEADER.size + 4]) == []
+    assert decoder.pending() == FRAME_HEADER.size + 4
+    assert decoder.feed(data[FRAME_HEADER.size + 4 :]) == [(OP_FRAME, body(1))]
+    assert decoder.pending() == 0
+
+
+def test_several_frames_in_one_read():
+    decoder = FrameDecoder()
+    data = frame(1) + frame(2) + frame(3)
+    # The fourth frame's header is only half there
+    assert decoder.feed(data + frame(4)[:5]) == [(OP_FRAME, body(i)) for i in (1, 2, 3)]
+    assert decoder.feed(frame(4)[5:]) == [(OP_FRAME, body(4))]
+
+
+def test_empty_body():
+    decoder = FrameDecoder()
+    assert decoder.feed(FRAME_HEADER.pack(OP_FRAME, 0)) == [(OP_FRAME, b"")]
+
+
+@pytest.mark.parametrize("length", [-1, MAX_FRAME_SIZE + 1])
+def test_bad_length(length):
+    decoder = FrameDecoder()
+    with pytest.raises(FrameError) as error:
+        decoder.feed(frame(1) + struct.pack("<ii", OP_FRAME, length) + b"garbage")
+    # Frames ahead of the bad header still count; nothing is kept after it
+    assert error.value.frames == [(OP_FRAME, body(1))]
+    assert decoder.pending() == 0
+
+
+def test_bad_length_drops_the_connection():
+    writer, reader = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+    pipe = UnixPipe()
+    pipe.socket = reader
+    try:
+        writer.sendall(frame(1) + struct.pack("<ii", OP_FRAME, -5))
+        assert pipe.read_frames() == [(OP_FRAME, body(1)), (SOCKET_DISCONNECTED, b"")]
+    finally:
+        writer.close()
+        reader.close()
@@ -0,0 +1,63 @@
+import threading
+
+from loguru import logger as log
+
+from .discordrpc.commands import VOICE_CHANNEL_SELECT, VOICE_SETTINGS_UPDATE
+from .roster import ROSTER_UPDATE
+
+SETTINGS_KEY = "warm_state"
+SAVE_DELAY = 2  # Seconds to wait for more changes before writing settings
+
+# Fields worth keeping per state, enough for the actions to render
+FIELDS = {
+    VOICE_SETTINGS_UPDATE: ("mute", "deaf", "mode"),
+    VOICE_CHANNEL_SELECT: ("channel_id", "guild_id", "id", "name"),
+    ROSTER_UPDATE: ("channel_id", "users"),
+}
+
+
+class WarmState:
+    """Last known Discord state, persisted so keys can render at load.
+
+    Everything loaded from settings starts out stale and is replaced piece
+    by piece as live state arrives from the backend. Writes to the plugin
+    settings are debounced, so bursts of events cost a single save.
+    """
+
+    def __init__(self, plugin_base):
+        self._plugin_base = plugin_base
+        self._lock = threading.Lock()
+        self._timer: threading.Timer = None
+        stored = plugin_base.get_settings().get(SETTINGS_KEY) or {}
+        self._state: dict = {name: stored[name] for name in FIELDS if stored.get(name)}
+        self._stale: set = set(self._state)
+
+    def get(self, name: str) -> dict:
+        return self._state.get(name)
+
+    def is_stale(self, name: str) -> bool:
+        return name in self._stale
+
+    def update(self, name: str, data: dict):
+        """Record live state for ``name`` and schedule a save if it changed."""
+        compact = {key: data[key] for key in FIELDS[name] if key in data} if data else {}
+        with self._lock:
+            self._stale.discard(name)
+            if self._state.get(name) == compact:
+                return
+            self._state[name] = compact
+            if self._timer is None:
+                self._timer = threading.Timer(SAVE_DELAY, self.save)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def save(self):
+        with self._lock:
+            self._timer = None
+            state = dict(self._state)
+        try:
+            settings = self._plugin_base.get_settings()
+            settings[SETTINGS_KEY] = state
+            self._plugin_base.set_settings(settings)
+        except Exception as ex:
+            log.error(f"failed to save warm state: {ex}")